@@ -44,6 +44,48 @@ class Settings(BaseSettings):
     auth_redis_db: int = 0
     cache_redis_db: int = 1
 
+    # 营养计划缓存（进程内 LRU）
+    nutrition_plan_cache_size: int = 10_000
+    nutrition_plan_cache_ttl_seconds: int = 300
+    # 食品目录（推荐用）后台整体刷新周期，写入时已增量维护
+    food_catalog_ttl_seconds: int = 600
+    # 已保存营养计划的后台重新计算（写入时唤醒，间隔为兜底周期）
+    nutrition_replan_interval_seconds: int = 300
+    nutrition_replan_batch_size: int = 200
+
+    # weight_records 月度分区：提前创建的月份数与后台维护周期
+    weight_partition_months_ahead: int = 3
+    weight_partition_maintenance_interval_seconds: int = 86_400
+    # 体重趋势（时间衰减加权回归）的半衰期（天）；修改后需对已有汇总执行 refresh_summaries
+    weight_trend_half_life_days: float = 14.0
+    # 体重异常检测（滚动中位数 + MAD）：窗口大小、修正 Z 分数阈值、最少样本数；
+    # exclude 为 True 时异常读数不计入汇总（最新体重、极值、均值、趋势）
+    weight_anomaly_window: int = 15
+    weight_anomaly_threshold: float = 3.5
+    weight_anomaly_min_samples: int = 5
+    weight_anomaly_exclude: bool = False
+    # 体重批量导入每块（一次 COPY + 合并 + 提交）的行数
+    weight_import_chunk_size: int = 5_000
+    # 体重高频写入微批：攒满 max_batch 条或等待 max_delay_ms 毫秒后合并为一次写入
+    weight_ingest_max_batch: int = 500
+    weight_ingest_max_delay_ms: float = 5.0
+    # 旧读数压缩：早于 retention_days 天的原始读数按 UTC 日合并为日汇总行；
+    # 每个事务处理 chunk_profiles 个宠物，事务之间暂停 throttle_ms 毫秒
+    weight_compaction_retention_days: int = 90
+    weight_compaction_chunk_profiles: int = 200
+    weight_compaction_throttle_ms: int = 50
+    weight_compaction_interval_seconds: int = 86_400
+    # 提醒派发：每次加载未来 window 秒内到期的提醒（至多 batch_size 条）到内存最小堆
+    reminder_dispatch_window_seconds: int = 60
+    reminder_dispatch_batch_size: int = 500
+    # 处理器失败的提醒按 retry_seconds·2^(n-1) 退避重试，失败 max_attempts 次后不再派发
+    reminder_dispatch_retry_seconds: float = 30.0
+    reminder_dispatch_max_attempts: int = 5
+    # 品种生长百分位表：后台重算周期、每个（品种, 月龄）最少宠物数、统计的最大月龄
+    growth_percentile_refresh_interval_seconds: int = 86_400
+    growth_percentile_min_samples: int = 5
+    growth_percentile_max_age_months: int = 240
+
     @computed_field
     @property
     def database_url(self) -> str:
@@ -1,12 +1,20 @@
 import asyncio
 import signal
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from loguru import logger
 
 from app.core.config import settings
 from app.core.database import db
+from app.nutrition.catalog import refresh_food_catalog_forever
+from app.nutrition.replanner import nutrition_replanner
+from app.reminders.dispatcher import reminder_dispatcher
+from app.reminders.search import backfill_search_tokens
+from app.weights.compaction import compact_weight_records_forever
+from app.weights.growth import refresh_growth_percentiles_forever
+from app.weights.ingest import weight_ingest_buffer
+from app.weights.partitions import maintain_partitions_forever
 
 
 @asynccontextmanager
@@ -45,11 +53,30 @@ async def lifespan(app: FastAPI):
 
     register_shutdown_signals()
 
+    # 后台任务：预加载并定期刷新食品目录、重新计算已保存的营养计划、
+    # 提前创建 weight_records 分区、重算品种生长百分位表、压缩旧体重读数、
+    # 派发到期提醒、补建提醒搜索 token
+    background_tasks = [
+        asyncio.create_task(refresh_food_catalog_forever(db)),
+        asyncio.create_task(nutrition_replanner.run_forever(db)),
+        asyncio.create_task(maintain_partitions_forever(db)),
+        asyncio.create_task(refresh_growth_percentiles_forever(db)),
+        asyncio.create_task(compact_weight_records_forever(db)),
+        asyncio.create_task(reminder_dispatcher.run_forever(db)),
+        asyncio.create_task(backfill_search_tokens(db)),
+    ]
+
     try:
         yield
 
     # 应用关闭阶段（无论是否异常，必执行）
     finally:
+        for task in background_tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        # 写入缓冲区中尚未提交的体重读数
+        await weight_ingest_buffer.drain()
         logger.info("应用开始关闭, 清理数据库引擎资源...")
         await db.dispose()
         logger.success("数据库引擎已销毁, 连接池资源释放完成")
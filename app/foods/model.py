@@ -29,7 +29,23 @@ class Food(DateTimeMixin, SQLModel, table=True):
         default=None, ge=0, index=True, description="重量(千克)"
     )
 
+    # 营养成分（每克食品所含克数），供营养计划与推荐直接使用
+    protein_g_per_g: float | None = Field(
+        default=None, ge=0, le=1, description="蛋白质密度(g/g)"
+    )
+    fat_g_per_g: float | None = Field(
+        default=None, ge=0, le=1, description="脂肪密度(g/g)"
+    )
+    carb_g_per_g: float | None = Field(
+        default=None, ge=0, le=1, description="碳水密度(g/g)"
+    )
+
     description: str | None = Field(default=None, max_length=255, description="描述")
+    version: int = Field(
+        default=0,
+        sa_column_kwargs={"server_default": "0"},
+        description="版本号（每次修改递增，已保存的营养计划据此判断是否过期）",
+    )
 
     def __repr__(self) -> str:  # pragma: no cover - simple representation
         return f"<Food(id={self.id}, name={self.name})>"
@@ -1,4 +1,4 @@
-from typing import Any, Mapping
+from typing import Any, Mapping, Sequence
 
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import asc, col, desc, or_, select
@@ -20,6 +20,25 @@ class FoodRepository:
 
         return food
 
+    async def get_by_ids(self, food_ids: Sequence[int]) -> list[Food]:
+        """按 ID 批量获取（单条 IN 查询，不保证顺序，缺失的 ID 直接忽略）"""
+        if not food_ids:
+            return []
+
+        statement = select(Food).where(col(Food.id).in_(set(food_ids)))
+        result = await self.session.exec(statement)
+        return list(result.all())
+
+    async def get_catalog_rows(self) -> list[Food]:
+        """获取可用于成本计算的食品（价格、包装重量、热量密度齐全）"""
+        statement = select(Food).where(
+            col(Food.price).is_not(None),
+            col(Food.weight) > 0,
+            col(Food.metabolic_energy) > 0,
+        )
+        result = await self.session.exec(statement)
+        return list(result.all())
+
     async def get_by_name(self, food_name: str) -> Food | None:
         statement = select(Food).where(Food.name == food_name)
         result = await self.session.exec(statement)
@@ -90,6 +109,8 @@ class FoodRepository:
 
         for key, value in food_data.items():
             setattr(food, key, value)
+        # 在数据库端递增，并发修改各自 +1，不会相互覆盖
+        food.version = col(Food.version) + 1  # type: ignore[assignment]
         await self.session.commit()
         await self.session.refresh(food)
         return food
@@ -9,6 +9,11 @@ class FoodCreate(SQLModel):
     )
     price: float | None = Field(None, ge=0, description="价格")
     weight: float | None = Field(None, ge=0, description="重量(千克)")
+    protein_g_per_g: float | None = Field(
+        None, ge=0, le=1, description="蛋白质密度(g/g)"
+    )
+    fat_g_per_g: float | None = Field(None, ge=0, le=1, description="脂肪密度(g/g)")
+    carb_g_per_g: float | None = Field(None, ge=0, le=1, description="碳水密度(g/g)")
     description: str | None = Field(None, max_length=255, description="描述")
 
 
@@ -20,6 +25,11 @@ class FoodUpdate(SQLModel):
     )
     price: float | None = Field(None, ge=0, description="价格")
     weight: float | None = Field(None, ge=0, description="重量(千克)")
+    protein_g_per_g: float | None = Field(
+        None, ge=0, le=1, description="蛋白质密度(g/g)"
+    )
+    fat_g_per_g: float | None = Field(None, ge=0, le=1, description="脂肪密度(g/g)")
+    carb_g_per_g: float | None = Field(None, ge=0, le=1, description="碳水密度(g/g)")
     description: str | None = Field(None, max_length=255, description="描述")
 
 
@@ -32,4 +42,9 @@ class FoodResponse(SQLModel):
     )
     price: float | None = Field(None, ge=0, description="价格")
     weight: float | None = Field(None, ge=0, description="重量(千克)")
+    protein_g_per_g: float | None = Field(
+        None, ge=0, le=1, description="蛋白质密度(g/g)"
+    )
+    fat_g_per_g: float | None = Field(None, ge=0, le=1, description="脂肪密度(g/g)")
+    carb_g_per_g: float | None = Field(None, ge=0, le=1, description="碳水密度(g/g)")
     description: str | None = Field(None, max_length=255, description="描述")
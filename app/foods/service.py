@@ -3,6 +3,9 @@ from sqlalchemy.exc import IntegrityError
 from app.core.exception import AlreadyExistsException, NotFoundException
 from app.foods.repository import FoodRepository
 from app.foods.schema import FoodCreate, FoodResponse, FoodUpdate
+from app.nutrition.cache import plan_cache
+from app.nutrition.catalog import food_catalog
+from app.nutrition.replanner import nutrition_replanner
 
 
 class FoodService:
@@ -46,6 +49,7 @@ class FoodService:
         data = food_data.model_dump()
         try:
             food = await self.repository.create(data)
+            food_catalog.upsert(food)
             return FoodResponse.model_validate(food)
         except IntegrityError as e:
             raise AlreadyExistsException("Food with this name already exists") from e
@@ -60,6 +64,9 @@ class FoodService:
             updated = await self.repository.update(food_id, update_data)
             if not updated:
                 raise NotFoundException("Food not found")
+            plan_cache.invalidate_food(food_id)
+            food_catalog.upsert(updated)
+            nutrition_replanner.notify()
             return FoodResponse.model_validate(updated)
         except IntegrityError as e:
             raise AlreadyExistsException("Food with this name already exists") from e
@@ -68,4 +75,7 @@ class FoodService:
         deleted = await self.repository.delete(id)
         if not deleted:
             raise NotFoundException("Food not found")
+        plan_cache.invalidate_food(id)
+        food_catalog.remove(id)
+        nutrition_replanner.notify()
         return True
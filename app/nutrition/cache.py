@@ -0,0 +1,137 @@
+import hashlib
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+
+from app.core.config import settings
+from app.nutrition.schema import NutritionPlanCreate, NutritionPlanResponse
+
+
+@dataclass
+class _CacheEntry:
+    plan: NutritionPlanResponse
+    profile_id: int
+    food_ids: frozenset[int]
+    expires_at: float
+
+
+class NutritionPlanCache:
+    """营养计划的进程内 LRU 缓存
+
+    缓存键 = 请求体规范化 JSON 的哈希 + 档案/食品的版本戳 + 当天日期（月龄随日期变化）。
+    体重、档案、食品写入时调用 invalidate_* 递增版本并立即剔除相关条目；
+    计算期间若发生失效，版本戳不一致的结果不会写入缓存。
+    版本按 id 取模存放在固定数量的槽中（与缓存容量同量级），内存不随失效过的 id 数增长；
+    同槽的其它 id 会被一并失效，只影响命中率，不会返回旧结果。
+    多进程部署时各 worker 独立缓存，TTL 作为跨进程失效的兜底。
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._version_slots = max(maxsize, 1024)
+        self._profile_versions = array("Q", bytes(8 * self._version_slots))
+        self._food_versions = array("Q", bytes(8 * self._version_slots))
+        # 按版本槽索引缓存键，失效时剔除该槽内全部条目（其键已不可能再命中）
+        self._keys_by_profile_slot: dict[int, set[str]] = {}
+        self._keys_by_food_slot: dict[int, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key_for(self, payload: NutritionPlanCreate) -> str:
+        food_ids = sorted({item.food_id for item in payload.foods})
+        stamps = [
+            date.today().isoformat(),
+            str(self._profile_versions[self._slot(payload.profile_id)]),
+            *(f"{fid}:{self._food_versions[self._slot(fid)]}" for fid in food_ids),
+        ]
+        # model_dump_json 的字段顺序由 schema 定义决定，可作为规范化表示
+        canonical = payload.model_dump_json() + "|" + ",".join(stamps)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key: str) -> NutritionPlanResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return entry.plan.model_copy(deep=True)
+
+    def put(
+        self,
+        key: str,
+        payload: NutritionPlanCreate,
+        plan: NutritionPlanResponse,
+    ) -> None:
+        # 计算期间发生过失效（版本已变化）时丢弃结果，避免缓存脏数据
+        if key != self.key_for(payload) or self.maxsize <= 0:
+            return
+
+        self._remove(key)
+        entry = _CacheEntry(
+            plan=plan.model_copy(deep=True),
+            profile_id=payload.profile_id,
+            food_ids=frozenset(item.food_id for item in payload.foods),
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        self._entries[key] = entry
+        self._keys_by_profile_slot.setdefault(self._slot(entry.profile_id), set()).add(
+            key
+        )
+        for slot in {self._slot(food_id) for food_id in entry.food_ids}:
+            self._keys_by_food_slot.setdefault(slot, set()).add(key)
+
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_profile(self, profile_id: int) -> None:
+        slot = self._slot(profile_id)
+        self._profile_versions[slot] += 1
+        for key in list(self._keys_by_profile_slot.get(slot, ())):
+            self._remove(key)
+
+    def invalidate_food(self, food_id: int) -> None:
+        slot = self._slot(food_id)
+        self._food_versions[slot] += 1
+        for key in list(self._keys_by_food_slot.get(slot, ())):
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_profile_slot.clear()
+        self._keys_by_food_slot.clear()
+
+    def _slot(self, ref_id: int) -> int:
+        return ref_id % self._version_slots
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self._discard_ref(self._keys_by_profile_slot, self._slot(entry.profile_id), key)
+        for slot in {self._slot(food_id) for food_id in entry.food_ids}:
+            self._discard_ref(self._keys_by_food_slot, slot, key)
+
+    @staticmethod
+    def _discard_ref(index: dict[int, set[str]], ref_id: int, key: str) -> None:
+        keys = index.get(ref_id)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del index[ref_id]
+
+
+# 单例，供 nutrition 服务读取、各写服务失效
+plan_cache = NutritionPlanCache(
+    maxsize=settings.nutrition_plan_cache_size,
+    ttl_seconds=settings.nutrition_plan_cache_ttl_seconds,
+)
@@ -0,0 +1,367 @@
+import asyncio
+import heapq
+import math
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Callable, Iterator, NamedTuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import Database
+from app.foods.model import Food
+from app.foods.repository import FoodRepository
+
+_COLUMNS = (
+    "cost_per_kcal",
+    "kcals_per_g",
+    "protein_g_per_g",
+    "fat_g_per_g",
+    "carb_g_per_g",
+)
+_MACROS = ("protein_g_per_g", "fat_g_per_g", "carb_g_per_g")
+
+
+class CatalogFood(NamedTuple):
+    food_id: int
+    name: str
+    cost_per_kcal: float
+    kcals_per_g: float
+    protein_g_per_g: float | None
+    fat_g_per_g: float | None
+    carb_g_per_g: float | None
+
+
+class CatalogBasket(NamedTuple):
+    """推荐组合：各食品及其提供的热量占比（合计为 1）"""
+
+    cost_per_kcal: float
+    foods: list[tuple[CatalogFood, float]]
+
+
+# 两种食品组合的候选池：每千卡成本最低的若干食品 + 每个受约束营养素含量最高的若干食品
+_PAIR_POOL = 24
+# 最窄的宏量下限仍有超过 1/8 的食品可行时，按成本顺序扫描很快就能遇到可行行，不走宏量索引
+_INDEX_SELECTIVITY = 8
+
+
+def _to_float(value: float | None) -> float:
+    return math.nan if value is None else value
+
+
+def _per_kcal(macro: str) -> Callable[[CatalogFood], float]:
+    """每千卡所含营养素 = 密度 / 热量密度"""
+    return lambda row: getattr(row, macro) / row.kcals_per_g
+
+
+class _SortedColumns:
+    """按 key 升序排列、彼此对齐的列式数组（keys 为排序键，不含 NaN）"""
+
+    def __init__(
+        self, rows: list[CatalogFood], key: Callable[[CatalogFood], float]
+    ) -> None:
+        self._key = key
+        rows = sorted(rows, key=key)
+        self.keys = array("d", (key(row) for row in rows))
+        self.ids = array("q", (row.food_id for row in rows))
+        self.columns = {
+            name: array("d", (_to_float(getattr(row, name)) for row in rows))
+            for name in _COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def insert(self, row: CatalogFood) -> None:
+        key = self._key(row)
+        index = bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.ids.insert(index, row.food_id)
+        for name in _COLUMNS:
+            self.columns[name].insert(index, _to_float(getattr(row, name)))
+
+    def discard(self, row: CatalogFood) -> None:
+        # 先按排序键二分定位，再在键相同的行中找到该食品
+        index = bisect_left(self.keys, self._key(row))
+        while self.ids[index] != row.food_id:
+            index += 1
+        del self.keys[index]
+        del self.ids[index]
+        for column in self.columns.values():
+            del column[index]
+
+
+class _Snapshot(NamedTuple):
+    by_cost: _SortedColumns
+    by_macro: dict[str, _SortedColumns]
+    rows: dict[int, CatalogFood]
+
+
+class FoodCatalog:
+    """预加载的食品目录（按每千卡成本升序的列式数组 + 按宏量含量排序的索引）
+
+    只收录价格、包装重量、热量密度齐全的食品。成本、热量密度与蛋白/脂肪/碳水密度
+    以对齐的 array 列保存（未知密度记为 NaN），加载时按成本排好序，
+    查询最便宜的组合只需顺序读取，请求路径上不会扫描 foods 表。
+    另为每种宏量维护一份按“每千卡含量”升序的副本（只含该密度已知的食品），
+    宏量下限对应其中一段后缀，二分即可得到可行食品，下限苛刻时不必扫描整个目录。
+    食品写入时通过 upsert/remove 增量维护，并递增 version。
+    启动时由 lifespan 预加载，之后每隔 TTL 在后台整体刷新（兜底多 worker 间的增量维护），
+    排序与建列在线程中完成，不阻塞事件循环。
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._by_cost, self._by_macro, self._rows = self._build([])
+        # 刷新期间的增量写入（food_id -> 食品，删除为 None），新快照换入后重放
+        self._pending: dict[int, Food | None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._by_cost)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    async def ensure_loaded(self, repository: FoodRepository) -> None:
+        """仅在预加载尚未完成时（如刚启动）加载一次；过期刷新由后台任务负责"""
+        if self.is_loaded:
+            return
+
+        async with self._lock:
+            if self.is_loaded:
+                return
+            await self._reload(repository)
+
+    async def refresh(self, database: Database) -> None:
+        """从数据库整体重新加载目录"""
+        async with self._lock:
+            async with database.session_factory() as session:
+                await self._reload(FoodRepository(session))
+
+    async def _reload(self, repository: FoodRepository) -> None:
+        self._pending = {}
+        try:
+            foods = await repository.get_catalog_rows()
+            self._swap(await asyncio.to_thread(self._build, foods))
+            pending = self._pending
+        finally:
+            self._pending = None
+        for food_id, food in pending.items():
+            if food is None:
+                self.remove(food_id)
+            else:
+                self.upsert(food)
+
+    def load(self, foods: list[Food]) -> None:
+        self._swap(self._build(foods))
+
+    @classmethod
+    def _build(cls, foods: list[Food]) -> _Snapshot:
+        rows = [row for food in foods if (row := cls._row_of(food)) is not None]
+        return _Snapshot(
+            by_cost=_SortedColumns(rows, key=lambda row: row.cost_per_kcal),
+            by_macro={
+                macro: _SortedColumns(
+                    [row for row in rows if getattr(row, macro) is not None],
+                    key=_per_kcal(macro),
+                )
+                for macro in _MACROS
+            },
+            rows={row.food_id: row for row in rows},
+        )
+
+    def _swap(self, snapshot: _Snapshot) -> None:
+        self._by_cost, self._by_macro, self._rows = snapshot
+        self._loaded_at = time.monotonic()
+        self.version += 1
+
+    def upsert(self, food: Food) -> None:
+        if self._pending is not None and food.id is not None:
+            self._pending[food.id] = food
+        if self._loaded_at is None or food.id is None:
+            return
+
+        self._discard(food.id)
+        row = self._row_of(food)
+        if row is not None:
+            self._by_cost.insert(row)
+            for macro, table in self._by_macro.items():
+                if getattr(row, macro) is not None:
+                    table.insert(row)
+            self._rows[row.food_id] = row
+        self.version += 1
+
+    def remove(self, food_id: int) -> None:
+        if self._pending is not None:
+            self._pending[food_id] = None
+        if self._loaded_at is None:
+            return
+
+        self._discard(food_id)
+        self.version += 1
+
+    def cheapest(
+        self,
+        *,
+        daily_kcals: float,
+        protein_g: float | None = None,
+        fat_g: float | None = None,
+        carb_g: float | None = None,
+    ) -> Iterator[CatalogFood]:
+        """按每千卡成本升序迭代：单独喂食即可满足热量与宏量下限的食品"""
+        minimums = [
+            (macro, target / daily_kcals)
+            for macro, target in zip(_MACROS, (protein_g, fat_g, carb_g))
+            if target is not None and daily_kcals > 0
+        ]
+        table, positions, checks = self._by_cost, range(len(self._by_cost)), minimums
+        if minimums:
+            # 每个下限在对应宏量索引中的可行行是一段后缀，取最短的一段
+            macro, start = min(
+                (
+                    (macro, bisect_left(self._by_macro[macro].keys, per_kcal))
+                    for macro, per_kcal in minimums
+                ),
+                key=lambda item: len(self._by_macro[item[0]]) - item[1],
+            )
+            feasible = len(self._by_macro[macro]) - start
+            if feasible * _INDEX_SELECTIVITY < len(self._by_cost):
+                # 可行行稀少：只取索引后缀，按成本排序后再检查其余下限（无可行行时直接结束）
+                table = self._by_macro[macro]
+                cost = table.columns["cost_per_kcal"]
+                positions = sorted(range(start, len(table)), key=cost.__getitem__)
+                checks = [item for item in minimums if item[0] != macro]
+
+        kcals = table.columns["kcals_per_g"]
+        for index in positions:
+            # 与 NaN 的比较恒为 False，未知密度被排除
+            if all(
+                table.columns[macro][index] / kcals[index] >= per_kcal
+                for macro, per_kcal in checks
+            ):
+                yield self._rows[table.ids[index]]
+
+    def cheapest_baskets(
+        self,
+        *,
+        daily_kcals: float,
+        limit: int,
+        max_foods: int = 2,
+        protein_g: float | None = None,
+        fat_g: float | None = None,
+        carb_g: float | None = None,
+    ) -> list[CatalogBasket]:
+        """每千卡成本最低的前 limit 个组合（单一食品或两种食品按热量占比混合）
+
+        没有宏量下限时混合不会比其中较便宜的食品更省，只返回单一食品；
+        有下限时在候选池内枚举两两组合，每对按约束求出可行的热量占比区间，
+        成本随占比线性变化，取区间端点即为该对的最低成本。
+        """
+        singles = self.cheapest(
+            daily_kcals=daily_kcals, protein_g=protein_g, fat_g=fat_g, carb_g=carb_g
+        )
+        baskets = [
+            CatalogBasket(food.cost_per_kcal, [(food, 1.0)])
+            for food in islice(singles, limit)
+        ]
+        minimums = {
+            macro: target / daily_kcals
+            for macro, target in zip(_MACROS, (protein_g, fat_g, carb_g))
+            if target is not None and daily_kcals > 0
+        }
+        if max_foods >= 2 and minimums:
+            baskets.extend(self._cheapest_pairs(minimums, limit))
+        return heapq.nsmallest(limit, baskets, key=lambda basket: basket.cost_per_kcal)
+
+    def _cheapest_pairs(
+        self, minimums: dict[str, float], limit: int
+    ) -> list[CatalogBasket]:
+        pool_ids = set(islice(self._by_cost.ids, _PAIR_POOL))
+        for macro in minimums:
+            # 宏量索引的末尾即每千卡含量最高的食品
+            table = self._by_macro[macro]
+            pool_ids.update(table.ids[max(len(table) - _PAIR_POOL, 0) :])
+        pool = sorted(
+            (self._rows[food_id] for food_id in pool_ids),
+            key=lambda row: row.cost_per_kcal,
+        )
+        # 每千卡所含营养素；未知密度按 0 计（保守估计）
+        per_kcal = [
+            ([(getattr(row, macro) or 0.0) / row.kcals_per_g for row in pool], minimum)
+            for macro, minimum in minimums.items()
+        ]
+
+        pairs: list[tuple[float, int, int, float]] = []
+        for a in range(len(pool)):
+            for b in range(a + 1, len(pool)):
+                # x 为食品 a 提供的热量占比，约束 x·ra + (1-x)·rb ≥ 下限
+                lo, hi = 0.0, 1.0
+                for ratios, minimum in per_kcal:
+                    slope, need = ratios[a] - ratios[b], minimum - ratios[b]
+                    if slope > 0:
+                        lo = max(lo, need / slope)
+                    elif slope < 0:
+                        hi = min(hi, need / slope)
+                    elif need > 0:
+                        lo, hi = 1.0, 0.0
+                if lo > hi:
+                    continue
+                cost_a, cost_b = pool[a].cost_per_kcal, pool[b].cost_per_kcal
+                share = hi if cost_a < cost_b else lo
+                # 端点即单一食品，已由 cheapest 覆盖
+                if share <= 1e-9 or share >= 1 - 1e-9:
+                    continue
+                pairs.append((share * cost_a + (1 - share) * cost_b, a, b, share))
+
+        return [
+            CatalogBasket(pair_cost, [(pool[a], share), (pool[b], 1 - share)])
+            for pair_cost, a, b, share in heapq.nsmallest(limit, pairs)
+        ]
+
+    def _discard(self, food_id: int) -> None:
+        row = self._rows.pop(food_id, None)
+        if row is None:
+            return
+
+        self._by_cost.discard(row)
+        for macro, table in self._by_macro.items():
+            if getattr(row, macro) is not None:
+                table.discard(row)
+
+    @staticmethod
+    def _row_of(food: Food) -> CatalogFood | None:
+        # price 为整包价格，weight 为整包重量(千克)，metabolic_energy 为 kcal/g
+        if food.id is None or food.price is None:
+            return None
+        if not food.weight or not food.metabolic_energy:
+            return None
+        return CatalogFood(
+            food_id=food.id,
+            name=food.name,
+            cost_per_kcal=food.price / (food.weight * 1000) / food.metabolic_energy,
+            kcals_per_g=food.metabolic_energy,
+            protein_g_per_g=food.protein_g_per_g,
+            fat_g_per_g=food.fat_g_per_g,
+            carb_g_per_g=food.carb_g_per_g,
+        )
+
+
+# 单例，供 nutrition 推荐读取、FoodService 写入时增量维护
+food_catalog = FoodCatalog(ttl_seconds=settings.food_catalog_ttl_seconds)
+
+
+async def refresh_food_catalog_forever(database: Database) -> None:
+    """启动时预加载食品目录，之后每隔 TTL 在后台整体刷新"""
+    while True:
+        try:
+            await food_catalog.refresh(database)
+            logger.info(f"食品目录已加载: {len(food_catalog)} 个食品")
+        except Exception as e:
+            logger.error(f"食品目录加载失败: {str(e)}")
+        await asyncio.sleep(food_catalog.ttl_seconds)
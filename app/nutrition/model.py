@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from typing import Any
+
+import sqlalchemy.dialects.postgresql as pg
+from sqlalchemy import ForeignKey
+from sqlmodel import Column, Field, SQLModel
+
+from app.core.base_model import DateTimeMixin
+
+
+class NutritionPlan(DateTimeMixin, SQLModel, table=True):
+    """已保存的营养计划（每个宠物一份），由后台任务在体重/档案变化后重新计算"""
+
+    __tablename__ = "nutrition_plans"  # type: ignore[assignment]
+
+    id: int | None = Field(default=None, primary_key=True, description="计划ID")
+    profile_id: int = Field(
+        sa_column=Column(
+            ForeignKey("profiles.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,  # 兼作 keyset 游标与按宠物查询的索引
+        ),
+        description="宠物ID",
+    )
+    request: dict[str, Any] = Field(
+        sa_column=Column(pg.JSONB, nullable=False), description="计划请求"
+    )
+    plan: dict[str, Any] = Field(
+        sa_column=Column(pg.JSONB, nullable=False), description="计算结果"
+    )
+    weight_g: int = Field(..., description="计算时使用的体重(克)")
+    profile_version: int = Field(
+        default=0, description="计算时读取到的档案版本号（与输入在同一次查询中读取）"
+    )
+    food_versions: dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(pg.JSONB, nullable=False, server_default="{}"),
+        description="计算时读取到的各食品版本号（food_id -> version）",
+    )
+    error: str | None = Field(
+        default=None, max_length=255, description="最近一次重新计算失败的原因"
+    )
+    computed_at: datetime = Field(
+        default_factory=lambda: datetime.now(tz=timezone.utc),
+        sa_type=pg.TIMESTAMP(timezone=True),  # type: ignore[arg-type]
+        description="计算时间",
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover - simple representation
+        return f"<NutritionPlan(id={self.id}, profile_id={self.profile_id})>"
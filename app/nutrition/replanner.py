@@ -0,0 +1,75 @@
+import asyncio
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import Database
+from app.foods.repository import FoodRepository
+from app.nutrition.repository import NutritionPlanRepository
+from app.nutrition.service import NutritionService
+from app.profiles.repository import ProfileRepository
+from app.weights.repository import WeightRecordRepository
+
+
+class NutritionReplanner:
+    """已保存营养计划的后台重新计算任务
+
+    体重/档案/食品写入后调用 notify() 唤醒；未被唤醒时按固定间隔兜底执行。
+    每批使用独立会话并单独提交，批量写入后推进 profile_id 游标，
+    过期状态由数据本身判定，因此进程崩溃后下一次执行会自然从剩余的过期计划继续。
+    """
+
+    def __init__(self, *, batch_size: int, interval_seconds: float) -> None:
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def run_once(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+    ) -> int:
+        """遍历全部过期计划并重新计算，返回重新计算的数量"""
+        cursor, total = 0, 0
+        while True:
+            async with session_factory() as session:
+                service = NutritionService(
+                    food_repository=FoodRepository(session),
+                    profile_repository=ProfileRepository(session),
+                    weight_repository=WeightRecordRepository(session),
+                    plan_repository=NutritionPlanRepository(session),
+                )
+                next_cursor, count = await service.replan_stale(
+                    after_profile_id=cursor, limit=self.batch_size
+                )
+            if next_cursor is None:
+                return total
+            cursor, total = next_cursor, total + count
+
+    async def run_forever(self, database: Database) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.interval_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            # 先清除再执行：执行期间的新写入会触发下一轮
+            self._wakeup.clear()
+            try:
+                count = await self.run_once(database.session_factory)
+                if count:
+                    logger.info(f"已重新计算 {count} 份营养计划")
+            except Exception as e:
+                logger.error(f"营养计划重新计算失败: {str(e)}")
+
+
+# 单例，lifespan 中启动，体重/档案/食品写服务调用 notify()
+nutrition_replanner = NutritionReplanner(
+    batch_size=settings.nutrition_replan_batch_size,
+    interval_seconds=settings.nutrition_replan_interval_seconds,
+)
@@ -0,0 +1,136 @@
+from typing import Any, Mapping, Sequence
+
+from sqlalchemy import Integer, case, cast, exists, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import and_, col, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.foods.model import Food
+from app.nutrition.model import NutritionPlan
+from app.profiles.model import Profile
+from app.weights.model import ProfileWeightSummary
+
+
+class NutritionPlanRepository:
+    """NutritionPlan CRUD（每个宠物一份已保存的计划）"""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get_by_profile_id(self, profile_id: int) -> NutritionPlan | None:
+        statement = (
+            select(NutritionPlan)
+            .where(col(NutritionPlan.profile_id) == profile_id)
+            # upsert 走 Core 语句，不会刷新会话中已加载的对象
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.exec(statement)
+        return result.one_or_none()
+
+    async def get_stale(
+        self,
+        *,
+        after_profile_id: int = 0,
+        limit: int = 200,
+    ) -> list[NutritionPlan]:
+        """按 profile_id keyset 分页获取过期的计划
+
+        过期条件：未覆盖体重且保存的体重与最新体重不同，或档案/任一食品的版本号与
+        计算时读取的不同（食品被删除也算）。版本号与输入在同一次查询中读取，
+        计算期间提交的档案或食品修改一定会被判定为过期。
+        已标记失败的计划不再重试，重新保存（PUT）后恢复。
+        返回的计划加行锁（SKIP LOCKED），直到本批写回提交；并发执行的其它实例跳过这些行。
+        """
+        saved = func.jsonb_each_text(col(NutritionPlan.food_versions)).table_valued(
+            "key", "value"
+        )
+        food_changed = exists(
+            select(1)
+            .select_from(saved)
+            .outerjoin(Food, col(Food.id) == cast(saved.c.key, Integer))
+            .where(col(Food.version).is_distinct_from(cast(saved.c.value, Integer)))
+        )
+        statement = (
+            select(NutritionPlan)
+            .join(Profile, col(Profile.id) == NutritionPlan.profile_id)
+            .outerjoin(
+                ProfileWeightSummary,
+                col(ProfileWeightSummary.profile_id) == NutritionPlan.profile_id,
+            )
+            .where(
+                col(NutritionPlan.profile_id) > after_profile_id,
+                col(NutritionPlan.error).is_(None),
+                or_(
+                    and_(
+                        col(NutritionPlan.request)["weight_g_override"].astext.is_(
+                            None
+                        ),
+                        col(NutritionPlan.weight_g).is_distinct_from(
+                            ProfileWeightSummary.latest_weight_g
+                        ),
+                    ),
+                    col(Profile.version) != NutritionPlan.profile_version,
+                    food_changed,
+                ),
+            )
+            .order_by(col(NutritionPlan.profile_id))
+            .limit(min(limit, 500))
+            .with_for_update(of=NutritionPlan, skip_locked=True)
+        )
+        result = await self.session.exec(statement)
+        return list(result.all())
+
+    async def upsert_many(self, rows: Sequence[Mapping[str, Any]]) -> None:
+        """按 profile_id 批量插入或覆盖（单条 INSERT ... ON CONFLICT DO UPDATE）并提交"""
+        await self._upsert(rows)
+        await self.session.commit()
+
+    async def save_replanned(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        errors: Mapping[int, str],
+    ) -> None:
+        """写回一批重新计算的计划并标记失败项，同一事务提交（随之释放 get_stale 的行锁）"""
+        await self._upsert(rows)
+        await self._mark_failed(errors)
+        await self.session.commit()
+
+    async def _upsert(self, rows: Sequence[Mapping[str, Any]]) -> None:
+        if not rows:
+            return
+
+        statement = insert(NutritionPlan).values(
+            [{**row, "computed_at": func.now()} for row in rows]
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[NutritionPlan.__table__.c.profile_id],  # type: ignore[attr-defined]
+            set_={
+                "request": statement.excluded.request,
+                "plan": statement.excluded.plan,
+                "weight_g": statement.excluded.weight_g,
+                "profile_version": statement.excluded.profile_version,
+                "food_versions": statement.excluded.food_versions,
+                "error": None,
+                "computed_at": statement.excluded.computed_at,
+                "updated_at": func.now(),
+            },
+        )
+        await self.session.exec(statement)
+
+    async def _mark_failed(self, errors: Mapping[int, str]) -> None:
+        """将无法重新计算的计划标记为失败（单条 UPDATE，按 profile_id 用 CASE 取各自原因）"""
+        if not errors:
+            return
+
+        statement = (
+            update(NutritionPlan)
+            .where(col(NutritionPlan.profile_id).in_(errors))
+            .values(
+                error=case(
+                    {profile_id: error[:255] for profile_id, error in errors.items()},
+                    value=NutritionPlan.profile_id,
+                ),
+                updated_at=func.now(),
+            )
+        )
+        await self.session.exec(statement)  # type: ignore[call-overload]
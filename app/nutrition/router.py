@@ -1,11 +1,24 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Path
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.database import get_session
 from app.foods.repository import FoodRepository
-from app.nutrition.schema import NutritionPlanCreate, NutritionPlanResponse
+from app.nutrition.repository import NutritionPlanRepository
+from app.nutrition.schema import (
+    NutritionPlanBatchCreate,
+    NutritionPlanBatchItem,
+    NutritionPlanCreate,
+    NutritionPlanResponse,
+    NutritionRecommendationResponse,
+    NutritionRecommendCreate,
+    NutritionScheduleCreate,
+    NutritionStoredPlanResponse,
+    NutritionSweepCreate,
+    NutritionSweepResponse,
+)
 from app.nutrition.service import NutritionService
 from app.profiles.repository import ProfileRepository
 from app.weights.repository import WeightRecordRepository
@@ -20,6 +33,7 @@ async def get_nutrition_service(
         food_repository=FoodRepository(session),
         profile_repository=ProfileRepository(session),
         weight_repository=WeightRecordRepository(session),
+        plan_repository=NutritionPlanRepository(session),
     )
 
 
@@ -30,3 +44,63 @@ async def create_nutrition_plan(
 ):
     """根据宠物信息和食品组合计算每日喂食方案"""
     return await service.plan_daily_intake(payload)
+
+
+@router.post("/plans:batch", response_model=list[NutritionPlanBatchItem])
+async def create_nutrition_plans_batch(
+    payload: NutritionPlanBatchCreate,
+    service: Annotated[NutritionService, Depends(get_nutrition_service)],
+):
+    """批量计算多个宠物的每日喂食方案（按请求顺序返回，单项失败记录在该项的 error 中）"""
+    return await service.plan_daily_intake_batch(payload.plans)
+
+
+@router.put("/profiles/{profile_id}/plan", response_model=NutritionStoredPlanResponse)
+async def save_nutrition_plan(
+    profile_id: Annotated[int, Path(..., description="宠物ID")],
+    payload: NutritionPlanCreate,
+    service: Annotated[NutritionService, Depends(get_nutrition_service)],
+):
+    """计算并保存宠物的营养计划，体重/档案变化后由后台任务自动重新计算"""
+    payload = payload.model_copy(update={"profile_id": profile_id})
+    return await service.save_plan(payload)
+
+
+@router.get("/profiles/{profile_id}/plan", response_model=NutritionStoredPlanResponse)
+async def get_saved_nutrition_plan(
+    profile_id: Annotated[int, Path(..., description="宠物ID")],
+    service: Annotated[NutritionService, Depends(get_nutrition_service)],
+):
+    """读取已保存的营养计划（按 profile_id 索引读取，不做计算）"""
+    return await service.get_saved_plan(profile_id)
+
+
+@router.post("/schedules")
+async def stream_meal_schedule(
+    payload: NutritionScheduleCreate,
+    service: Annotated[NutritionService, Depends(get_nutrition_service)],
+):
+    """将每日计划展开为多日按餐日程，以 NDJSON 逐行流式返回（每行一个 NutritionMeal）"""
+    meals = await service.plan_meal_schedule(payload)
+    return StreamingResponse(
+        (meal.model_dump_json() + "\n" for meal in meals),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post("/recommendations", response_model=NutritionRecommendationResponse)
+async def recommend_foods(
+    payload: NutritionRecommendCreate,
+    service: Annotated[NutritionService, Depends(get_nutrition_service)],
+):
+    """从全部食品目录中推荐每日花费最低的喂食组合"""
+    return await service.recommend_foods(payload)
+
+
+@router.post("/sweeps", response_model=NutritionSweepResponse)
+async def sweep_nutrition_plan(
+    payload: NutritionSweepCreate,
+    service: Annotated[NutritionService, Depends(get_nutrition_service)],
+):
+    """在体重 × 绝育/月龄（或活动系数）网格上批量评估每日热量与喂食克数"""
+    return await service.sweep(payload)
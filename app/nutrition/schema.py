@@ -1,3 +1,6 @@
+from datetime import date, datetime
+from typing import Annotated, Literal
+
 from sqlmodel import Field, SQLModel
 
 
@@ -12,9 +15,15 @@ class NutritionFoodItem(SQLModel):
     kcals_per_g_override: float | None = Field(
         None, gt=0, description="覆盖的卡路里密度(kcal/g)"
     )
-    protein_g_per_g: float | None = Field(None, ge=0, description="蛋白质密度(g/g)")
-    fat_g_per_g: float | None = Field(None, ge=0, description="脂肪密度(g/g)")
-    carb_g_per_g: float | None = Field(None, ge=0, description="碳水密度(g/g)")
+    protein_g_per_g: float | None = Field(
+        None, ge=0, description="覆盖蛋白质密度(g/g)，为空时使用食品档案中的值"
+    )
+    fat_g_per_g: float | None = Field(
+        None, ge=0, description="覆盖脂肪密度(g/g)，为空时使用食品档案中的值"
+    )
+    carb_g_per_g: float | None = Field(
+        None, ge=0, description="覆盖碳水密度(g/g)，为空时使用食品档案中的值"
+    )
 
 
 class NutritionGoal(SQLModel):
@@ -28,11 +37,10 @@ class NutritionGoal(SQLModel):
     carb_g: float | None = Field(None, ge=0, description="碳水目标(g)")
 
 
-class NutritionPlanCreate(SQLModel):
-    """营养计划计算请求"""
+class NutritionPlanBase(SQLModel):
+    """营养计算公共输入：宠物、目标与状态覆盖"""
 
     profile_id: int = Field(..., description="宠物ID")
-    foods: list[NutritionFoodItem] = Field(..., min_length=1, description="候选食品")
     goal: NutritionGoal
     weight_g_override: int | None = Field(None, gt=0, description="覆盖体重(克)")
     age_months_override: int | None = Field(
@@ -53,6 +61,77 @@ class NutritionPlanCreate(SQLModel):
     )
 
 
+class NutritionPlanCreate(NutritionPlanBase):
+    """营养计划计算请求"""
+
+    foods: list[NutritionFoodItem] = Field(..., min_length=1, description="候选食品")
+    mode: Literal["ratio", "macro"] = Field(
+        "ratio",
+        description="分配模式: ratio(按配比分配热量)/macro(满足热量并逼近宏量目标)",
+    )
+
+
+class NutritionRecommendCreate(NutritionPlanBase):
+    """从全部食品目录中推荐成本最低的喂食组合"""
+
+    top_k: int = Field(5, ge=1, le=50, description="返回的组合数量")
+    max_foods: int = Field(
+        2,
+        ge=1,
+        le=2,
+        description="每个组合最多包含的食品数（2 时可用两种食品混合满足宏量下限）",
+    )
+
+
+class NutritionPlanBatchCreate(SQLModel):
+    """批量营养计划计算请求"""
+
+    plans: list[NutritionPlanCreate] = Field(
+        ..., min_length=1, max_length=500, description="各宠物的计划请求"
+    )
+
+
+class NutritionScheduleCreate(SQLModel):
+    """多日喂食日程请求：在每日计划基础上按餐展开"""
+
+    plan: NutritionPlanCreate
+    days: int = Field(7, ge=1, le=366, description="天数")
+    start_date: date | None = Field(None, description="开始日期，默认今天")
+    meals_per_day_override: int | None = Field(
+        None, ge=1, le=12, description="覆盖每日餐数（优先使用）"
+    )
+    rotate_foods: bool = Field(
+        False,
+        description="按天轮换食品：非固定克数的食品每天只供应一种，"
+        "按各自热量占比轮流出现（至少两种时生效）",
+    )
+
+
+class NutritionSweepCreate(SQLModel):
+    """敏感性扫描请求：在体重 × 状态（或活动系数）网格上批量评估计划"""
+
+    plan: NutritionPlanCreate
+    weights_g: list[Annotated[int, Field(gt=0)]] | None = Field(
+        None,
+        min_length=1,
+        max_length=100,
+        description="体重网格(克)，为空时使用当前体重",
+    )
+    # 与 NutritionPlanCreate.activity_factor_override 的取值范围一致
+    activity_factors: list[Annotated[float, Field(ge=0.8, le=8.0)]] | None = Field(
+        None,
+        min_length=1,
+        max_length=50,
+        description="活动系数网格，给出时忽略绝育/月龄网格",
+    )
+    neutered: list[bool] | None = Field(
+        None, min_length=1, max_length=2, description="绝育状态网格"
+    )
+    age_months: list[int] | None = Field(
+        None, min_length=1, max_length=50, description="月龄网格"
+    )
+
+
 class NutritionFoodPlan(SQLModel):
     food_id: int
     food_name: str
@@ -76,3 +155,71 @@ class NutritionPlanResponse(SQLModel):
     foods: list[NutritionFoodPlan]
     achieved: NutritionAchieved
     notes: list[str]
+
+
+class NutritionPlanBatchItem(SQLModel):
+    """批量计划中的单项结果：成功时 plan 有值，失败时 error 给出原因，各项互不影响"""
+
+    profile_id: int
+    plan: NutritionPlanResponse | None = None
+    error: str | None = Field(
+        None, description="计算失败原因（如 Profile not found），成功时为空"
+    )
+
+
+class NutritionStoredPlanResponse(SQLModel):
+    """已保存的营养计划（体重/档案变化后由后台任务重新计算）"""
+
+    profile_id: int
+    computed_at: datetime = Field(..., description="计算时间")
+    plan: NutritionPlanResponse
+    error: str | None = Field(
+        None,
+        description="后台重新计算失败的原因（为空表示计划是最新的），重新保存后清除",
+    )
+
+
+class NutritionMealFood(SQLModel):
+    food_id: int
+    food_name: str
+    grams: float
+    kcals: float
+
+
+class NutritionMeal(SQLModel):
+    """日程中的一餐（流式接口逐行输出）"""
+
+    date: date
+    day_index: int
+    meal_index: int
+    total_grams: float
+    total_kcals: float
+    foods: list[NutritionMealFood]
+
+
+class NutritionBasket(SQLModel):
+    foods: list[NutritionFoodPlan]
+    achieved: NutritionAchieved
+    daily_cost: float = Field(..., description="每日花费（按食品价格/包装重量折算）")
+
+
+class NutritionRecommendationResponse(SQLModel):
+    profile_id: int
+    weight_g: int
+    daily_kcals_target: float
+    baskets: list[NutritionBasket]
+
+
+class NutritionSweepResponse(SQLModel):
+    """列式扫描结果：同一下标对应网格中的一个点"""
+
+    profile_id: int
+    food_ids: list[int]
+    weight_g: list[int]
+    neutered: list[bool | None]
+    age_months: list[int | None]
+    activity_factor: list[float]
+    daily_kcals_target: list[float]
+    grams: list[list[float]] = Field(
+        ..., description="每个食品一列（与 food_ids 对齐），列内与网格点对齐"
+    )
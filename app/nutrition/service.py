@@ -1,17 +1,44 @@
+import asyncio
 from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterator, Mapping
+
+from fastapi import HTTPException
+from loguru import logger
 
 from app.core.exception import NotFoundException
+from app.foods.model import Food
 from app.foods.repository import FoodRepository
+from app.nutrition.cache import plan_cache
+from app.nutrition.catalog import food_catalog
+from app.nutrition.repository import NutritionPlanRepository
 from app.nutrition.schema import (
     NutritionAchieved,
+    NutritionBasket,
     NutritionFoodItem,
     NutritionFoodPlan,
+    NutritionGoal,
+    NutritionMeal,
+    NutritionMealFood,
+    NutritionPlanBase,
+    NutritionPlanBatchItem,
     NutritionPlanCreate,
     NutritionPlanResponse,
+    NutritionRecommendationResponse,
+    NutritionRecommendCreate,
+    NutritionScheduleCreate,
+    NutritionStoredPlanResponse,
+    NutritionSweepCreate,
+    NutritionSweepResponse,
 )
+from app.nutrition.solver import solve_macro_allocation
+from app.profiles.model import Profile
 from app.profiles.repository import ProfileRepository
 from app.weights.repository import WeightRecordRepository
 
+# 宏量求解器单次时间预算（秒），典型 3–8 个食品的求解远低于 1ms
+MACRO_SOLVER_TIME_BUDGET_S = 0.005
+
 
 @dataclass
 class _ResolvedFood:
@@ -23,6 +50,14 @@ class _ResolvedFood:
     protein_g_per_g: float | None
     fat_g_per_g: float | None
     carb_g_per_g: float | None
+    version: int = 0  # 读取到的食品版本号，推荐组合来自内存目录时为 0
+
+
+@dataclass
+class _PlanInputs:
+    profile: Profile
+    weight_g: int
+    foods: list[_ResolvedFood]
 
 
 class NutritionService:
@@ -33,42 +68,491 @@ class NutritionService:
         food_repository: FoodRepository,
         profile_repository: ProfileRepository,
         weight_repository: WeightRecordRepository,
+        plan_repository: NutritionPlanRepository,
     ) -> None:
         self.food_repository = food_repository
         self.profile_repository = profile_repository
         self.weight_repository = weight_repository
+        self.plan_repository = plan_repository
 
     async def plan_daily_intake(
         self,
         payload: NutritionPlanCreate,
     ) -> NutritionPlanResponse:
-        profile = await self.profile_repository.get_by_id(payload.profile_id)
-        if not profile:
-            raise NotFoundException("Profile not found")
+        plan, _ = await self._plan_with_inputs(payload)
+        return plan
 
-        weight_g = await self._resolve_weight_g(payload)
-        resolved_foods = await self._resolve_foods(payload.foods)
+    async def _plan_with_inputs(
+        self,
+        payload: NutritionPlanCreate,
+        *,
+        use_cache: bool = True,
+    ) -> tuple[NutritionPlanResponse, _PlanInputs | None]:
+        """计算（或命中缓存）单个计划；未命中缓存时一并返回预取到的输入，命中时为 None"""
+        cache_key = plan_cache.key_for(payload)
+        cached = plan_cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            return cached, None
+
+        inputs = await self._prefetch_inputs(payload)
+        plan = self._build_plan(payload, inputs)
+        plan_cache.put(cache_key, payload, plan)
+        return plan, inputs
+
+    async def plan_daily_intake_batch(
+        self,
+        payloads: list[NutritionPlanCreate],
+    ) -> list[NutritionPlanBatchItem]:
+        """批量计算多个宠物的喂食方案
 
-        # 自动判断或使用覆盖的活动系数
-        activity_factor = self._determine_activity_factor(
-            payload=payload,
-            profile=profile,
-        )
+        先命中计划缓存，未命中的档案+最新体重与食品各用一条 SQL 预取（共 2 次往返），
+        之后逐个在内存中计算，按请求顺序返回。
+        单项失败（宠物不存在、没有体重记录、食品缺失等）只记录在该项的 error 中，不影响其它项。
+        """
+        return [item for item, _ in await self._plan_batch(payloads)]
+
+    async def _plan_batch(
+        self,
+        payloads: list[NutritionPlanCreate],
+        *,
+        use_cache: bool = True,
+    ) -> list[tuple[NutritionPlanBatchItem, _PlanInputs | None]]:
+        """批量计算，同时返回各项计算时读取的输入（命中缓存或失败时为 None）"""
+        cache_keys = [plan_cache.key_for(payload) for payload in payloads]
+        results: list[tuple[NutritionPlanBatchItem, _PlanInputs | None] | None] = []
+        for payload, key in zip(payloads, cache_keys):
+            cached = plan_cache.get(key) if use_cache else None
+            results.append(
+                (
+                    NutritionPlanBatchItem(profile_id=payload.profile_id, plan=cached),
+                    None,
+                )
+                if cached is not None
+                else None
+            )
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return [result for result in results if result is not None]
 
-        daily_kcals_target = (
-            payload.goal.daily_kcals
-            if payload.goal.daily_kcals is not None
-            else self._estimate_daily_kcals(
-                weight_g=weight_g,
-                activity_factor=activity_factor,
+        rows = await self.profile_repository.get_many_with_latest_weight(
+            [payloads[i].profile_id for i in pending]
+        )
+        profile_map = {
+            profile.id: (profile, weight_g)
+            for profile, weight_g in rows
+            if profile.id is not None
+        }
+        foods = await self.food_repository.get_by_ids(
+            [item.food_id for i in pending for item in payloads[i].foods]
+        )
+        food_map = {food.id: food for food in foods if food.id is not None}
+
+        for i in pending:
+            payload = payloads[i]
+            try:
+                if payload.profile_id not in profile_map:
+                    raise NotFoundException("Profile not found")
+                profile, latest_weight_g = profile_map[payload.profile_id]
+                inputs = _PlanInputs(
+                    profile=profile,
+                    weight_g=self._resolve_weight_g(payload, latest_weight_g),
+                    foods=self._resolve_foods(payload.foods, food_map),
+                )
+                plan = self._build_plan(payload, inputs)
+            except HTTPException as e:
+                results[i] = (
+                    NutritionPlanBatchItem(
+                        profile_id=payload.profile_id, error=str(e.detail)
+                    ),
+                    None,
+                )
+                continue
+            plan_cache.put(cache_keys[i], payload, plan)
+            results[i] = (
+                NutritionPlanBatchItem(profile_id=payload.profile_id, plan=plan),
+                inputs,
             )
+
+        return [result for result in results if result is not None]
+
+    async def save_plan(
+        self, payload: NutritionPlanCreate
+    ) -> NutritionStoredPlanResponse:
+        """计算并保存宠物的营养计划（每个宠物一份，之后由后台任务保持最新）"""
+        # 不读缓存：保存的档案/食品版本号必须与本次计算读取的输入一致
+        plan, inputs = await self._plan_with_inputs(payload, use_cache=False)
+        assert inputs is not None
+        await self.plan_repository.upsert_many(
+            [self._stored_row(payload, plan, inputs)]
+        )
+        return await self.get_saved_plan(payload.profile_id)
+
+    async def get_saved_plan(self, profile_id: int) -> NutritionStoredPlanResponse:
+        stored = await self.plan_repository.get_by_profile_id(profile_id)
+        if not stored:
+            raise NotFoundException("NutritionPlan not found")
+        return NutritionStoredPlanResponse(
+            profile_id=stored.profile_id,
+            computed_at=stored.computed_at,
+            plan=NutritionPlanResponse.model_validate(stored.plan),
+            error=stored.error,
         )
 
-        plans, notes = self._allocate_foods(
-            target_kcals=daily_kcals_target,
-            foods=resolved_foods,
+    async def replan_stale(
+        self,
+        *,
+        after_profile_id: int,
+        limit: int,
+    ) -> tuple[int | None, int]:
+        """重新计算一批过期的已保存计划
+
+        按 profile_id keyset 取一批过期计划，批量计算后用一条 INSERT ... ON CONFLICT 写回。
+        返回 (本批最后一个 profile_id, 重新计算数量)；没有更多过期计划时游标为 None。
+        过期状态由数据本身决定，中途崩溃后重新执行即可从未完成的计划继续。
+        本批计划以 FOR UPDATE SKIP LOCKED 读取，多个实例同时执行时各自处理不同的计划。
+        无法计算的计划（宠物的体重记录被清空、食品被删除等）标记为失败，不再每轮重试。
+        """
+        stale = await self.plan_repository.get_stale(
+            after_profile_id=after_profile_id, limit=limit
+        )
+        if not stale:
+            return None, 0
+
+        payloads = [NutritionPlanCreate.model_validate(row.request) for row in stale]
+        # 数据已判定过期，不读缓存：缓存结果没有对应的档案版本号
+        results = await self._plan_batch(payloads, use_cache=False)
+
+        rows, errors = [], {}
+        for payload, (item, inputs) in zip(payloads, results):
+            if item.plan is None or inputs is None:
+                errors[payload.profile_id] = item.error or "unknown error"
+                continue
+            rows.append(self._stored_row(payload, item.plan, inputs))
+        if errors:
+            logger.warning(f"营养计划无法重新计算，已标记为失败: {errors}")
+
+        # 写回与失败标记同一事务提交，提交前本批计划一直被行锁占用
+        await self.plan_repository.save_replanned(rows, errors)
+        return stale[-1].profile_id, len(rows)
+
+    @staticmethod
+    def _stored_row(
+        payload: NutritionPlanCreate,
+        plan: NutritionPlanResponse,
+        inputs: _PlanInputs,
+    ) -> dict:
+        return {
+            "profile_id": payload.profile_id,
+            "request": payload.model_dump(mode="json"),
+            "plan": plan.model_dump(mode="json"),
+            "weight_g": plan.weight_g,
+            "profile_version": inputs.profile.version,
+            "food_versions": {str(food.food_id): food.version for food in inputs.foods},
+        }
+
+    async def plan_meal_schedule(
+        self,
+        payload: NutritionScheduleCreate,
+    ) -> Iterator[NutritionMeal]:
+        """计算每日计划后返回按餐展开的惰性生成器（不在内存中构建整个日程）"""
+        plan, inputs = await self._plan_with_inputs(payload.plan)
+        meals_per_day = payload.meals_per_day_override
+        if meals_per_day is None:
+            # 计划未命中缓存时档案已随体重一并预取，只有命中缓存才需要单独读取
+            profile = inputs.profile if inputs is not None else None
+            if profile is None:
+                profile = await self.profile_repository.get_by_id(
+                    payload.plan.profile_id
+                )
+                if not profile:
+                    raise NotFoundException("Profile not found")
+            meals_per_day = max(profile.meals_per_day, 1)
+
+        return self._iter_meals(
+            plan,
+            meals_per_day=meals_per_day,
+            start_date=payload.start_date or date.today(),
+            days=payload.days,
+            rotate_foods=payload.rotate_foods,
+            fixed_food_ids={
+                item.food_id
+                for item in payload.plan.foods
+                if item.fixed_grams is not None
+            },
         )
 
+    @staticmethod
+    def _split_grams(grams: float, parts: int) -> list[float]:
+        """按 0.01g 精度把克数拆成 parts 份：各份非负、相差至多 0.01g，合计与原值一致"""
+        base, extra = divmod(max(round(grams * 100), 0), parts)
+        return [(base + (1 if i < extra else 0)) / 100 for i in range(parts)]
+
+    @staticmethod
+    def _rotation_order(
+        foods: list[NutritionFoodPlan], days: int
+    ) -> Iterator[NutritionFoodPlan]:
+        """平滑加权轮询：按各食品在计划中的热量占比逐日挑选当天供应的食品
+
+        长期来看每个食品被选中的天数占比等于其热量占比，且同一食品尽量不连续出现。
+        """
+        total = sum(food.kcals for food in foods)
+        current = [0.0] * len(foods)
+        for _ in range(days):
+            for i, food in enumerate(foods):
+                current[i] += food.kcals
+            chosen = max(range(len(foods)), key=current.__getitem__)
+            current[chosen] -= total
+            yield foods[chosen]
+
+    @classmethod
+    def _iter_meals(
+        cls,
+        plan: NutritionPlanResponse,
+        *,
+        meals_per_day: int,
+        start_date: date,
+        days: int,
+        rotate_foods: bool,
+        fixed_food_ids: set[int],
+    ) -> Iterator[NutritionMeal]:
+        # 轮换：固定克数的食品每天照常供应，其余食品按天轮换，
+        # 当天只供应其中一种，由它提供这些食品在计划中的全部热量
+        rotating = [
+            food
+            for food in plan.foods
+            if food.food_id not in fixed_food_ids and food.kcals > 0
+        ]
+        rotate = rotate_foods and len(rotating) >= 2
+        daily = [
+            food
+            for food in plan.foods
+            if not rotate or food.food_id in fixed_food_ids or food.kcals <= 0
+        ]
+        rotating_kcals = sum(food.kcals for food in rotating)
+        rotation = cls._rotation_order(rotating, days) if rotate else None
+
+        for day_index in range(days):
+            day_foods = list(daily)
+            if rotation is not None:
+                food = next(rotation)
+                day_foods.append(
+                    food.model_copy(
+                        update={
+                            "grams": round(rotating_kcals / food.kcals_per_g, 2),
+                            "kcals": round(rotating_kcals, 2),
+                        }
+                    )
+                )
+            # 每个食品的当日克数在各餐间均分，保证每日总量与当日计划一致
+            portions = [
+                cls._split_grams(food.grams, meals_per_day) for food in day_foods
+            ]
+
+            for meal_index in range(meals_per_day):
+                foods = [
+                    NutritionMealFood(
+                        food_id=food.food_id,
+                        food_name=food.food_name,
+                        grams=portions[i][meal_index],
+                        kcals=round(portions[i][meal_index] * food.kcals_per_g, 2),
+                    )
+                    for i, food in enumerate(day_foods)
+                ]
+                yield NutritionMeal(
+                    date=start_date + timedelta(days=day_index),
+                    day_index=day_index,
+                    meal_index=meal_index,
+                    total_grams=round(sum(item.grams for item in foods), 2),
+                    total_kcals=round(sum(item.kcals for item in foods), 2),
+                    foods=foods,
+                )
+
+    async def recommend_foods(
+        self,
+        payload: NutritionRecommendCreate,
+    ) -> NutritionRecommendationResponse:
+        """从预加载的食品目录中推荐每日花费最低、且满足宏量下限的前 K 个喂食组合"""
+        row = await self.profile_repository.get_with_latest_weight(payload.profile_id)
+        if not row:
+            raise NotFoundException("Profile not found")
+        profile, latest_weight_g = row
+        weight_g = self._resolve_weight_g(payload, latest_weight_g)
+        daily_kcals_target = self._resolve_daily_kcals(payload, profile, weight_g)
+
+        await food_catalog.ensure_loaded(self.food_repository)
+        baskets: list[NutritionBasket] = []
+        for basket in food_catalog.cheapest_baskets(
+            daily_kcals=daily_kcals_target,
+            limit=payload.top_k,
+            max_foods=payload.max_foods,
+            protein_g=payload.goal.protein_g,
+            fat_g=payload.goal.fat_g,
+            carb_g=payload.goal.carb_g,
+        ):
+            resolved: list[_ResolvedFood] = []
+            plans: list[NutritionFoodPlan] = []
+            for food, share in basket.foods:
+                kcals = daily_kcals_target * share
+                grams = kcals / food.kcals_per_g
+                resolved.append(
+                    _ResolvedFood(
+                        food_id=food.food_id,
+                        name=food.name,
+                        ratio=share,
+                        kcals_per_g=food.kcals_per_g,
+                        fixed_grams=grams,
+                        protein_g_per_g=food.protein_g_per_g,
+                        fat_g_per_g=food.fat_g_per_g,
+                        carb_g_per_g=food.carb_g_per_g,
+                    )
+                )
+                plans.append(
+                    NutritionFoodPlan(
+                        food_id=food.food_id,
+                        food_name=food.name,
+                        kcals_per_g=food.kcals_per_g,
+                        grams=round(grams, 2),
+                        kcals=round(kcals, 2),
+                    )
+                )
+            baskets.append(
+                NutritionBasket(
+                    foods=plans,
+                    achieved=self._calc_achieved_nutrients(plans, resolved),
+                    daily_cost=round(daily_kcals_target * basket.cost_per_kcal, 4),
+                )
+            )
+
+        return NutritionRecommendationResponse(
+            profile_id=payload.profile_id,
+            weight_g=weight_g,
+            daily_kcals_target=round(daily_kcals_target, 2),
+            baskets=baskets,
+        )
+
+    async def sweep(self, payload: NutritionSweepCreate) -> NutritionSweepResponse:
+        """在体重 × 状态网格上评估每日热量与各食品克数（输入只解析一次）
+
+        活动系数只按 (绝育, 月龄) 组合计算一次；ratio 分配下各食品克数
+        是剩余热量的线性函数，预先求出系数后每个网格点只需 O(M) 次乘加。
+        macro 模式下克数不再是热量的线性函数，每个不同的目标热量各调用一次宏量求解器；
+        网格可达上万个点，求解放到线程中执行，不阻塞事件循环。
+        """
+        plan = payload.plan
+        if payload.weights_g:
+            plan = plan.model_copy(update={"weight_g_override": payload.weights_g[0]})
+        inputs = await self._prefetch_inputs(plan)
+        foods = inputs.foods
+
+        states: list[tuple[bool | None, int | None, float]] = []
+        if payload.activity_factors:
+            states = [(None, None, factor) for factor in payload.activity_factors]
+        else:
+            for neutered in payload.neutered or [None]:
+                for age_months in payload.age_months or [None]:
+                    variant = plan.model_copy(
+                        update={
+                            "neutered_override": (
+                                neutered
+                                if neutered is not None
+                                else plan.neutered_override
+                            ),
+                            "age_months_override": (
+                                age_months
+                                if age_months is not None
+                                else plan.age_months_override
+                            ),
+                        }
+                    )
+                    factor = self._determine_activity_factor(
+                        payload=variant, profile=inputs.profile
+                    )
+                    states.append((neutered, age_months, factor))
+
+        # 与 _allocate_foods 一致：固定克数优先，其余热量按 ratio 分给非固定食品
+        fixed_kcals = sum(item.fixed_grams * item.kcals_per_g for item in foods)
+        ratio_sum = sum(item.ratio for item in foods if item.fixed_grams <= 0)
+        grams_per_kcal = [
+            item.ratio / ratio_sum / item.kcals_per_g
+            if item.fixed_grams <= 0 and ratio_sum > 0
+            else 0.0
+            for item in foods
+        ]
+
+        macro_grams: dict[float, list[float]] = {}
+
+        def grams_for(target: float) -> list[float]:
+            if plan.mode != "macro":
+                remaining = max(target - fixed_kcals, 0)
+                return [
+                    round(item.fixed_grams + remaining * coef, 2)
+                    for item, coef in zip(foods, grams_per_kcal)
+                ]
+            if target not in macro_grams:
+                plans, _ = self._allocate_foods_by_macros(
+                    target_kcals=target, foods=foods, goal=plan.goal
+                )
+                macro_grams[target] = [item.grams for item in plans]
+            return macro_grams[target]
+
+        def evaluate() -> NutritionSweepResponse:
+            result = NutritionSweepResponse(
+                profile_id=plan.profile_id,
+                food_ids=[item.food_id for item in foods],
+                weight_g=[],
+                neutered=[],
+                age_months=[],
+                activity_factor=[],
+                daily_kcals_target=[],
+                grams=[[] for _ in foods],
+            )
+            for weight_g in payload.weights_g or [inputs.weight_g]:
+                base_kcals = self._estimate_daily_kcals(
+                    weight_g=weight_g, activity_factor=1.0
+                )
+                for neutered, age_months, factor in states:
+                    target = (
+                        plan.goal.daily_kcals
+                        if plan.goal.daily_kcals is not None
+                        else base_kcals * factor
+                    )
+                    result.weight_g.append(weight_g)
+                    result.neutered.append(neutered)
+                    result.age_months.append(age_months)
+                    result.activity_factor.append(factor)
+                    result.daily_kcals_target.append(round(target, 2))
+                    for column, grams in zip(result.grams, grams_for(target)):
+                        column.append(grams)
+            return result
+
+        if plan.mode == "macro":
+            return await asyncio.to_thread(evaluate)
+        return evaluate()
+
+    def _build_plan(
+        self,
+        payload: NutritionPlanCreate,
+        inputs: _PlanInputs,
+    ) -> NutritionPlanResponse:
+        """纯计算：基于已预取的输入生成喂食方案（不访问数据库）"""
+        profile = inputs.profile
+        weight_g = inputs.weight_g
+        resolved_foods = inputs.foods
+
+        daily_kcals_target = self._resolve_daily_kcals(payload, profile, weight_g)
+
+        if payload.mode == "macro":
+            plans, notes = self._allocate_foods_by_macros(
+                target_kcals=daily_kcals_target,
+                foods=resolved_foods,
+                goal=payload.goal,
+            )
+        else:
+            plans, notes = self._allocate_foods(
+                target_kcals=daily_kcals_target,
+                foods=resolved_foods,
+            )
+
         total_grams = round(sum(item.grams for item in plans), 2)
         total_kcals = round(sum(item.kcals for item in plans), 2)
         achieved = self._calc_achieved_nutrients(plans, resolved_foods)
@@ -94,32 +578,75 @@ class NutritionService:
             notes=notes,
         )
 
-    async def _resolve_weight_g(self, payload: NutritionPlanCreate) -> int:
+    def _resolve_daily_kcals(
+        self,
+        payload: NutritionPlanBase,
+        profile: Profile,
+        weight_g: int,
+    ) -> float:
+        if payload.goal.daily_kcals is not None:
+            return payload.goal.daily_kcals
+
+        # 自动判断或使用覆盖的活动系数
+        activity_factor = self._determine_activity_factor(
+            payload=payload,
+            profile=profile,
+        )
+        return self._estimate_daily_kcals(
+            weight_g=weight_g,
+            activity_factor=activity_factor,
+        )
+
+    async def _prefetch_inputs(self, payload: NutritionPlanCreate) -> _PlanInputs:
+        """预取计划所需的全部输入
+
+        档案、最新体重与全部食品合并为一条 SQL，只需 1 次往返，与食品数量无关。
+        """
+        row = await self.profile_repository.get_with_latest_weight_and_foods(
+            payload.profile_id, [item.food_id for item in payload.foods]
+        )
+        if not row:
+            raise NotFoundException("Profile not found")
+        profile, latest_weight_g, foods = row
+
+        food_map = {food.id: food for food in foods if food.id is not None}
+
+        return _PlanInputs(
+            profile=profile,
+            weight_g=self._resolve_weight_g(payload, latest_weight_g),
+            foods=self._resolve_foods(payload.foods, food_map),
+        )
+
+    def _resolve_weight_g(
+        self,
+        payload: NutritionPlanBase,
+        latest_weight_g: int | None,
+    ) -> int:
         if payload.weight_g_override is not None:
             return payload.weight_g_override
 
-        latest = await self.weight_repository.get_by_profile_id(
-            payload.profile_id,
-            order_by="measured_at",
-            direction="desc",
-            limit=1,
-            offset=0,
-        )
-        if not latest:
+        if latest_weight_g is None:
             raise NotFoundException("Weight record not found for profile")
 
-        return latest[0].weight_g
+        return latest_weight_g
 
-    async def _resolve_foods(
-        self, foods: list[NutritionFoodItem]
+    def _resolve_foods(
+        self,
+        foods: list[NutritionFoodItem],
+        food_map: Mapping[int, Food],
     ) -> list[_ResolvedFood]:
+        # 缺失的食品一次性全部报告，避免客户端逐个重试
+        missing = sorted(
+            {item.food_id for item in foods if item.food_id not in food_map}
+        )
+        if missing:
+            raise NotFoundException(
+                f"Food not found: {', '.join(str(food_id) for food_id in missing)}"
+            )
+
         resolved: list[_ResolvedFood] = []
         for item in foods:
-            food = await self.food_repository.get_by_id(item.food_id)
-            if not food:
-                raise NotFoundException(f"Food not found: {item.food_id}")
-            if food.id is None:
-                raise NotFoundException(f"Food id invalid: {item.food_id}")
+            food = food_map[item.food_id]
 
             kcals_per_g = (
                 item.kcals_per_g_override
@@ -131,14 +658,27 @@ class NutritionService:
 
             resolved.append(
                 _ResolvedFood(
-                    food_id=food.id,
+                    food_id=item.food_id,
                     name=food.name,
                     ratio=item.ratio,
                     kcals_per_g=kcals_per_g,
                     fixed_grams=item.fixed_grams or 0.0,
-                    protein_g_per_g=item.protein_g_per_g,
-                    fat_g_per_g=item.fat_g_per_g,
-                    carb_g_per_g=item.carb_g_per_g,
+                    protein_g_per_g=(
+                        item.protein_g_per_g
+                        if item.protein_g_per_g is not None
+                        else food.protein_g_per_g
+                    ),
+                    fat_g_per_g=(
+                        item.fat_g_per_g
+                        if item.fat_g_per_g is not None
+                        else food.fat_g_per_g
+                    ),
+                    carb_g_per_g=(
+                        item.carb_g_per_g
+                        if item.carb_g_per_g is not None
+                        else food.carb_g_per_g
+                    ),
+                    version=food.version,
                 )
             )
 
@@ -147,7 +687,7 @@ class NutritionService:
     def _determine_activity_factor(
         self,
         *,
-        payload: NutritionPlanCreate,
+        payload: NutritionPlanBase,
         profile,
     ) -> float:
         """根据宠物状态自动判断生活系数（活动系数）"""
@@ -269,6 +809,54 @@ class NutritionService:
 
         return plans, notes
 
+    def _allocate_foods_by_macros(
+        self,
+        *,
+        target_kcals: float,
+        foods: list[_ResolvedFood],
+        goal: NutritionGoal,
+    ) -> tuple[list[NutritionFoodPlan], list[str]]:
+        """固定克数为硬约束，满足热量目标并尽量逼近蛋白/脂肪/碳水目标"""
+        macro_rows = [
+            (target, [getattr(item, attr) for item in foods])
+            for target, attr in (
+                (goal.protein_g, "protein_g_per_g"),
+                (goal.fat_g, "fat_g_per_g"),
+                (goal.carb_g, "carb_g_per_g"),
+            )
+            if target is not None
+            and any(getattr(item, attr) is not None for item in foods)
+        ]
+        if not macro_rows:
+            plans, notes = self._allocate_foods(target_kcals=target_kcals, foods=foods)
+            notes.append("no macro targets with known densities, ratio allocation used")
+            return plans, notes
+
+        notes: list[str] = []
+        solution = solve_macro_allocation(
+            target_kcals=target_kcals,
+            kcals_per_g=[item.kcals_per_g for item in foods],
+            fixed_grams=[item.fixed_grams for item in foods],
+            ratios=[item.ratio for item in foods],
+            densities=[densities for _, densities in macro_rows],
+            targets=[target for target, _ in macro_rows],
+            time_budget_s=MACRO_SOLVER_TIME_BUDGET_S,
+        )
+        if not solution.converged:
+            notes.append("macro solver time budget exceeded, best effort result")
+
+        plans = [
+            NutritionFoodPlan(
+                food_id=item.food_id,
+                food_name=item.name,
+                kcals_per_g=item.kcals_per_g,
+                grams=round(grams, 2),
+                kcals=round(grams * item.kcals_per_g, 2),
+            )
+            for item, grams in zip(foods, solution.grams)
+        ]
+        return plans, notes
+
     def _calc_achieved_nutrients(
         self,
         plans: list[NutritionFoodPlan],
@@ -0,0 +1,161 @@
+"""宏量营养约束求解器
+
+在满足每日热量（硬约束）的前提下，为非固定克数的食品求非负克数，
+使蛋白/脂肪/碳水尽量逼近目标。问题规模很小（通常 3–8 个食品、至多 3 个宏量目标），
+因此以热量为变量做变量替换后，用 Lawson–Hanson 非负最小二乘（NNLS）在法方程上求解，
+纯 Python 实现即可做到亚毫秒级。
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Sequence
+
+# 热量行权重：远大于宏量行，使热量近似为等式约束，求解后再精确缩放
+_KCAL_WEIGHT = 1e3
+# 正则权重：向按 ratio 分配的结果轻微收缩，保证法方程正定并在多解时保留配比偏好
+_RATIO_WEIGHT = 1e-3
+_TOLERANCE = 1e-10
+
+
+@dataclass
+class MacroSolution:
+    grams: list[float]
+    converged: bool
+
+
+def solve_macro_allocation(
+    *,
+    target_kcals: float,
+    kcals_per_g: Sequence[float],
+    fixed_grams: Sequence[float],
+    ratios: Sequence[float],
+    densities: Sequence[Sequence[float | None]],
+    targets: Sequence[float],
+    time_budget_s: float = 0.005,
+) -> MacroSolution:
+    """求解各食品克数
+
+    :param target_kcals: 每日目标热量(kcal)
+    :param kcals_per_g: 各食品热量密度(kcal/g)
+    :param fixed_grams: 各食品固定克数（>0 视为硬约束，不参与求解）
+    :param ratios: 各食品配比权重（仅作为多解时的偏好）
+    :param densities: 每个宏量目标一行，各食品该营养素密度(g/g)，None 视为 0
+    :param targets: 各宏量目标(g)，与 densities 行一一对应
+    :param time_budget_s: 时间预算（秒），超时返回当前可行解且 converged=False
+    :return: 各食品克数（与输入顺序一致）
+    """
+    n = len(kcals_per_g)
+    grams = [max(fixed, 0.0) for fixed in fixed_grams]
+    free = [j for j in range(n) if grams[j] <= 0]
+
+    fixed_kcals = sum(grams[j] * kcals_per_g[j] for j in range(n))
+    remaining_kcals = max(target_kcals - fixed_kcals, 0.0)
+    if not free or remaining_kcals <= 0:
+        return MacroSolution(grams=grams, converged=True)
+
+    # 变量替换：y_j = 食品 j 提供的热量，热量约束变为 sum(y) = remaining_kcals
+    ratio_sum = sum(ratios[j] for j in free) or float(len(free))
+    rows: list[list[float]] = [[_KCAL_WEIGHT / remaining_kcals] * len(free)]
+    rhs: list[float] = [_KCAL_WEIGHT]
+    for row_densities, target in zip(densities, targets):
+        if target <= 0:
+            continue
+        fixed_amount = sum(
+            grams[j] * (row_densities[j] or 0.0) for j in range(n) if grams[j] > 0
+        )
+        rows.append([(row_densities[j] or 0.0) / kcals_per_g[j] / target for j in free])
+        rhs.append((target - fixed_amount) / target)
+    for k, j in enumerate(free):
+        row = [0.0] * len(free)
+        row[k] = _RATIO_WEIGHT / remaining_kcals
+        rows.append(row)
+        rhs.append(_RATIO_WEIGHT * (ratios[j] / ratio_sum))
+
+    y, converged = _nnls(rows, rhs, deadline=time.perf_counter() + time_budget_s)
+
+    total = sum(y)
+    if total <= 0:
+        y = [remaining_kcals * ratios[j] / ratio_sum for j in free]
+        total = remaining_kcals
+    scale = remaining_kcals / total
+    for k, j in enumerate(free):
+        grams[j] = y[k] * scale / kcals_per_g[j]
+
+    return MacroSolution(grams=grams, converged=converged)
+
+
+def _nnls(
+    rows: list[list[float]],
+    rhs: list[float],
+    *,
+    deadline: float,
+    max_iter: int | None = None,
+) -> tuple[list[float], bool]:
+    """Lawson–Hanson 非负最小二乘：min ||Ax - b||, x >= 0（基于法方程 G = AᵀA）
+
+    超时或迭代 max_iter 次（默认 3n）仍未满足 KKT 条件时返回当前解，converged 为 False。
+    """
+    n = len(rows[0])
+    gram = [[sum(row[i] * row[j] for row in rows) for j in range(n)] for i in range(n)]
+    atb = [sum(row[i] * b for row, b in zip(rows, rhs)) for i in range(n)]
+
+    x = [0.0] * n
+    passive: list[int] = []
+    limit = 3 * n if max_iter is None else max_iter
+    for iteration in range(limit + 1):
+        if time.perf_counter() > deadline:
+            return x, False
+
+        grad = [atb[i] - sum(gram[i][j] * x[j] for j in range(n)) for i in range(n)]
+        candidates = [i for i in range(n) if i not in passive and grad[i] > _TOLERANCE]
+        if not candidates:
+            return x, True
+        if iteration == limit:
+            break
+        passive.append(max(candidates, key=lambda i: grad[i]))
+
+        while True:
+            z = _solve_subset(gram, atb, passive, n)
+            if all(z[i] > _TOLERANCE for i in passive):
+                x = z
+                break
+            # 沿 x -> z 方向后退到可行域边界，并移出变为 0 的变量
+            alpha = min(x[i] / (x[i] - z[i]) for i in passive if z[i] <= _TOLERANCE)
+            x = [x[i] + alpha * (z[i] - x[i]) for i in range(n)]
+            passive = [i for i in passive if x[i] > _TOLERANCE]
+            if not passive:
+                break
+
+    return x, False
+
+
+def _solve_subset(
+    gram: list[list[float]],
+    atb: list[float],
+    passive: list[int],
+    n: int,
+) -> list[float]:
+    """在 passive 列上求解 G_PP z_P = (Aᵀb)_P，其余分量为 0（高斯消元，部分主元）"""
+    size = len(passive)
+    matrix = [[gram[i][j] for j in passive] + [atb[i]] for i in passive]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(matrix[r][col]))
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        lead = matrix[col][col]
+        for r in range(col + 1, size):
+            factor = matrix[r][col] / lead
+            if factor:
+                for c in range(col, size + 1):
+                    matrix[r][c] -= factor * matrix[col][c]
+
+    solution = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        acc = matrix[r][size] - sum(
+            matrix[r][c] * solution[c] for c in range(r + 1, size)
+        )
+        solution[r] = acc / matrix[r][r]
+
+    z = [0.0] * n
+    for k, i in enumerate(passive):
+        z[i] = solution[k]
+    return z
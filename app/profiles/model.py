@@ -37,6 +37,11 @@ class Profile(DateTimeMixin, SQLModel, table=True):
         default="medium", max_length=20, description="活动水平: 低/中/高"
     )
     description: str | None = Field(default=None, max_length=255, description="描述")
+    version: int = Field(
+        default=0,
+        sa_column_kwargs={"server_default": "0"},
+        description="版本号（每次修改递增，已保存的营养计划据此判断是否过期）",
+    )
 
     # 关系属性（非列）
     reminders: list["Reminder"] = Relationship(back_populates="profile")
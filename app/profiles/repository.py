@@ -1,10 +1,12 @@
-from typing import Any, Mapping
+from typing import Any, Mapping, Sequence
 
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import asc, col, desc, or_, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.foods.model import Food
 from app.profiles.model import Profile
+from app.weights.model import ProfileWeightSummary
 
 
 class ProfileRepository:
@@ -20,6 +22,64 @@ class ProfileRepository:
 
         return profile
 
+    async def get_with_latest_weight(
+        self, profile_id: int
+    ) -> tuple[Profile, int | None] | None:
+        """单条 SQL 同时获取宠物档案与最新体重(克)，无体重记录时体重为 None"""
+        statement = self._select_with_latest_weight().where(Profile.id == profile_id)
+        result = await self.session.exec(statement)
+        row = result.one_or_none()
+        if not row:
+            return None
+
+        profile, weight_g = row
+        return profile, weight_g
+
+    async def get_with_latest_weight_and_foods(
+        self, profile_id: int, food_ids: Sequence[int]
+    ) -> tuple[Profile, int | None, list[Food]] | None:
+        """单条 SQL 同时获取档案、最新体重与指定食品，缺失的食品 ID 直接忽略
+
+        食品以 LEFT JOIN 带出，每种食品一行；没有匹配的食品时只有档案一行。
+        """
+        statement = (
+            select(Profile, ProfileWeightSummary.latest_weight_g, Food)
+            .outerjoin(
+                ProfileWeightSummary,
+                col(ProfileWeightSummary.profile_id) == Profile.id,
+            )
+            .outerjoin(Food, col(Food.id).in_(set(food_ids)))
+            .where(Profile.id == profile_id)
+        )
+        result = await self.session.exec(statement)
+        rows = result.all()
+        if not rows:
+            return None
+
+        profile, weight_g, _ = rows[0]
+        return profile, weight_g, [food for _, _, food in rows if food is not None]
+
+    async def get_many_with_latest_weight(
+        self, profile_ids: Sequence[int]
+    ) -> list[tuple[Profile, int | None]]:
+        """批量版本：单条 SQL 获取多个档案及各自最新体重，缺失的 ID 直接忽略"""
+        if not profile_ids:
+            return []
+
+        statement = self._select_with_latest_weight().where(
+            col(Profile.id).in_(set(profile_ids))
+        )
+        result = await self.session.exec(statement)
+        return [(profile, weight_g) for profile, weight_g in result.all()]
+
+    @staticmethod
+    def _select_with_latest_weight():
+        # 最新体重来自 profile_weight_summary，按主键关联，无需排序查询体重记录
+        return select(Profile, ProfileWeightSummary.latest_weight_g).outerjoin(
+            ProfileWeightSummary,
+            col(ProfileWeightSummary.profile_id) == Profile.id,
+        )
+
     async def get_by_name(self, profile_name: str) -> Profile | None:
         statement = select(Profile).where(Profile.name == profile_name)
         result = await self.session.exec(statement)
@@ -87,6 +147,8 @@ class ProfileRepository:
 
         for key, value in profile_data.items():
             setattr(profile, key, value)
+        # 在数据库端递增，并发修改各自 +1，不会相互覆盖
+        profile.version = col(Profile.version) + 1  # type: ignore[assignment]
         await self.session.commit()
         await self.session.refresh(profile)
         return profile
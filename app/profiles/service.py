@@ -1,6 +1,8 @@
 from sqlalchemy.exc import IntegrityError
 
 from app.core.exception import AlreadyExistsException, NotFoundException
+from app.nutrition.cache import plan_cache
+from app.nutrition.replanner import nutrition_replanner
 from app.profiles.repository import ProfileRepository
 from app.profiles.schema import ProfileCreate, ProfileResponse, ProfileUpdate
 
@@ -64,6 +66,8 @@ class ProfileService:
             updated = await self.repository.update(profile_id, update_data)
             if not updated:
                 raise NotFoundException("Profile not found")
+            plan_cache.invalidate_profile(profile_id)
+            nutrition_replanner.notify()
 
             return ProfileResponse.model_validate(updated)
         except IntegrityError as e:
@@ -73,5 +77,7 @@ class ProfileService:
         deleted = await self.repository.delete(profile_id)
         if not deleted:
             raise NotFoundException("Profile not found")
+        plan_cache.invalidate_profile(profile_id)
+        nutrition_replanner.notify()
 
         return True
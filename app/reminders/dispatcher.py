@@ -0,0 +1,173 @@
+import asyncio
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import Database
+from app.reminders.model import Reminder
+from app.reminders.repository import ReminderRepository
+
+ReminderHandler = Callable[[Reminder], Awaitable[None]]
+
+# 到期提醒均被其它进程锁定时，重新装载前等待的秒数
+_RETRY_SECONDS = 1.0
+
+
+async def log_reminder(reminder: Reminder) -> None:
+    logger.info(
+        f"提醒到期: id={reminder.id}, profile_id={reminder.profile_id}, "
+        f"title={reminder.title}, due_date={reminder.due_date.isoformat()}"
+    )
+
+
+class ReminderDispatcher:
+    """到期提醒派发器
+
+    内存中维护一个按 (due_date, id) 排序的最小堆，只装载未来 window_seconds 内到期的提醒
+    （至多 batch_size 条，走部分索引 idx_reminders_pending_dispatch），
+    睡眠到堆顶到期或窗口结束，不轮询整张表。
+    到期后以 FOR UPDATE SKIP LOCKED 认领，在同一事务内调用处理器并写入 dispatched_at，
+    多个 worker 同时运行时每条提醒只派发一次。处理器按提醒逐条调用，某条失败时
+    只记录该条的失败次数与原因（dispatch_attempts/dispatch_error），按
+    retry_seconds·2^(n-1) 退避后重试，失败 max_attempts 次后不再派发；同批其它提醒照常写入。
+    本进程创建/修改提醒后调用 notify() 立即重新装载；其它进程的修改在窗口结束时装载。
+    """
+
+    def __init__(
+        self,
+        *,
+        window_seconds: float,
+        batch_size: int,
+        retry_seconds: float = 30.0,
+        max_attempts: int = 5,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self.handlers: list[ReminderHandler] = [log_reminder]
+        self._heap: list[tuple[datetime, int]] = []
+        self._window_end: datetime | None = None
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        self._window_end = None
+        self._wakeup.set()
+
+    async def run_once(self, session_factory: async_sessionmaker[AsyncSession]) -> int:
+        """按需重新装载窗口并派发所有已到期的提醒，返回派发数量"""
+        total = 0
+        while True:
+            if self._window_end is None or _now() >= self._window_end:
+                await self._refill(session_factory)
+
+            attempted = claimed = 0
+            while self._heap and self._heap[0][0] <= _now():
+                due_ids = []
+                while (
+                    self._heap
+                    and self._heap[0][0] <= _now()
+                    and len(due_ids) < self.batch_size
+                ):
+                    due_ids.append(heapq.heappop(self._heap)[1])
+                attempted += len(due_ids)
+                claimed += await self._dispatch(session_factory, due_ids)
+            total += claimed
+
+            if attempted and not claimed:
+                # 全部被其它进程锁定：稍后再装载，避免空转
+                self._window_end = _now() + timedelta(seconds=_RETRY_SECONDS)
+                return total
+            # 窗口被 batch_size 截断且已全部到期（积压）：继续装载下一批
+            if not attempted or self._window_end is None or self._window_end > _now():
+                return total
+
+    def seconds_until_next(self) -> float:
+        """距离下一次需要处理（堆顶到期或窗口结束）的秒数"""
+        if self._window_end is None:
+            return 0.0
+        next_at = self._window_end
+        if self._heap:
+            next_at = min(next_at, self._heap[0][0])
+        return max((next_at - _now()).total_seconds(), 0.0)
+
+    async def run_forever(self, database: Database) -> None:
+        while True:
+            try:
+                await self.run_once(database.session_factory)
+            except Exception as e:
+                logger.error(f"提醒派发失败: {str(e)}")
+                # 出错后等待一个窗口再重试，避免数据库故障时空转
+                self._window_end = _now() + timedelta(seconds=self.window_seconds)
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.seconds_until_next()
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _refill(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        until = _now() + timedelta(seconds=self.window_seconds)
+        async with session_factory() as session:
+            rows = await ReminderRepository(session).get_dispatch_window(
+                until, self.batch_size, max_attempts=self.max_attempts
+            )
+        self._heap = [(next_at, reminder_id) for _, next_at, reminder_id in rows]
+        heapq.heapify(self._heap)
+        # 窗口被 batch_size 截断时，只有最后一条（按 due_date）之前的提醒是完整的
+        self._window_end = rows[-1][0] if len(rows) >= self.batch_size else until
+
+    async def _dispatch(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        reminder_ids: list[int],
+    ) -> int:
+        async with session_factory() as session:
+            repository = ReminderRepository(session)
+            reminders = await repository.claim_due(
+                reminder_ids, max_attempts=self.max_attempts
+            )
+            if not reminders:
+                return 0
+            dispatched: list[int] = []
+            errors: dict[int, str] = {}
+            for reminder in reminders:
+                assert reminder.id is not None
+                try:
+                    for handler in self.handlers:
+                        await handler(reminder)
+                except Exception as e:
+                    # 单条失败不影响同批其它提醒；失败记录随本批一起提交
+                    errors[reminder.id] = f"{type(e).__name__}: {e}"
+                    attempt = reminder.dispatch_attempts + 1
+                    gave_up = "，不再重试" if attempt >= self.max_attempts else ""
+                    logger.error(
+                        f"提醒派发失败: id={reminder.id}, 第 {attempt} 次{gave_up}: {str(e)}"
+                    )
+                else:
+                    dispatched.append(reminder.id)
+            await repository.mark_dispatched(dispatched)
+            await repository.mark_dispatch_failed(
+                errors, retry_seconds=self.retry_seconds
+            )
+            await session.commit()
+        return len(reminders)
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+# 单例，lifespan 中启动，提醒写服务调用 notify()
+reminder_dispatcher = ReminderDispatcher(
+    window_seconds=settings.reminder_dispatch_window_seconds,
+    batch_size=settings.reminder_dispatch_batch_size,
+    retry_seconds=settings.reminder_dispatch_retry_seconds,
+    max_attempts=settings.reminder_dispatch_max_attempts,
+)
@@ -1,7 +1,9 @@
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
-from sqlmodel import Field, Index, Relationship, SQLModel
+import sqlalchemy.dialects.postgresql as pg
+from sqlalchemy import text
+from sqlmodel import Column, Field, Index, Relationship, SQLModel
 
 from app.core.base_model import DateTimeMixin
 
@@ -20,33 +22,106 @@ class Reminder(DateTimeMixin, SQLModel, table=True):
             postgresql_using="gin",
             postgresql_ops={"title": "gin_trgm_ops"},
         ),
+        # 标题 + 描述 n-gram 搜索索引（见 app/reminders/ngram.py）；
+        # 提醒写入频率低，关闭 fastupdate，避免待合并列表拖慢查询并抬高代价估算
+        Index(
+            "idx_reminders_search_tokens_gin",
+            "search_tokens",
+            postgresql_using="gin",
+            postgresql_with={"fastupdate": "off"},
+        ),
         # 核心查询索引
         Index("idx_reminders_type", "type"),
-        Index("idx_reminders_due_date", "due_date"),
-        Index("idx_reminders_is_done", "is_done"),
-        # 复合业务索引
+        # 按宠物+类型筛选；前缀同时覆盖按 profile_id 的查询（外键级联），无需单列索引
+        Index("idx_reminders_profile_type", "profile_id", "type"),
+        # 未完成提醒（部分索引，已完成的行不进入索引；按 (due_date, id) 键集分页）
         Index(
-            "idx_reminders_get_by_title", "profile_id", "is_done"
-        ),  # 查询宠物未完成提醒
+            "idx_reminders_pending_profile_due",
+            "profile_id",
+            "due_date",
+            "id",
+            postgresql_where=text("NOT is_done"),
+        ),  # 宠物即将到期 / 已逾期提醒
         Index(
-            "idx_reminders_profile_due_date", "profile_id", "is_done", "due_date"
-        ),  # 查询宠物即将到期提醒
-        Index("idx_reminders_profile_type", "profile_id", "type"),  # 按宠物+类型筛选
+            "idx_reminders_pending_due",
+            "due_date",
+            "id",
+            postgresql_where=text("NOT is_done"),
+        ),  # 不限宠物的即将到期 / 已逾期提醒、按时间窗口展开
+        # 待派发提醒（部分索引，只包含未完成且未派发的行）
         Index(
-            "idx_reminders_profile_due_is_done", "profile_id", "due_date", "is_done"
-        ),  # 核心查询：宠物未完成且未过期
+            "idx_reminders_pending_dispatch",
+            "due_date",
+            "id",
+            postgresql_where=text("dispatched_at IS NULL AND NOT is_done"),
+        ),  # reminders/dispatcher.py: 按到期时间窗口加载
     )
 
     id: int | None = Field(default=None, primary_key=True, description="提醒事项ID")
     title: str = Field(..., max_length=100, description="提醒事项标题")
     type: str = Field(..., max_length=50, description="提醒事项类型")
-    due_date: datetime = Field(..., description="到期时间")
+    due_date: datetime = Field(
+        ...,
+        sa_type=pg.TIMESTAMP(timezone=True),  # type: ignore[arg-type]
+        description="到期时间",
+    )
     is_done: bool = Field(default=False, nullable=False, description="是否完成")
+    # 重复规则（RRULE 子集，见 app/reminders/recurrence.py）：due_date 始终为下一次待完成的到期时间，
+    # 第 k 次到期时间 = recurrence_start + k·recurrence_months 月 + k·recurrence_days 天
+    recurrence_rule: str | None = Field(
+        default=None, max_length=255, description="重复规则，如 FREQ=MONTHLY;COUNT=3"
+    )
+    recurrence_start: datetime | None = Field(
+        default=None,
+        sa_type=pg.TIMESTAMP(timezone=True),  # type: ignore[arg-type]
+        description="重复的首次到期时间",
+    )
+    recurrence_months: int | None = Field(default=None, description="每次前进的月数")
+    recurrence_days: int | None = Field(default=None, description="每次前进的天数")
+    # 改期后以新的到期时间为第 0 次，此时为剩余次数（COUNT 减去已完成的次数）
+    recurrence_count: int | None = Field(
+        default=None, description="从 recurrence_start 起的总次数（COUNT）"
+    )
+    recurrence_until: datetime | None = Field(
+        default=None,
+        sa_type=pg.TIMESTAMP(timezone=True),  # type: ignore[arg-type]
+        description="截止时间（UNTIL）",
+    )
+    occurrence_index: int = Field(
+        default=0,
+        sa_column_kwargs={"server_default": "0"},
+        description="due_date 对应的重复序号（从 0 开始）",
+    )
+    dispatched_at: datetime | None = Field(
+        default=None,
+        sa_type=pg.TIMESTAMP(timezone=True),  # type: ignore[arg-type]
+        description="派发时间（到期后由派发器写入，修改到期时间时清空）",
+    )
+    # 处理器失败时由派发器记录，按指数退避重试；修改到期时间时与 dispatched_at 一起清空
+    dispatch_attempts: int = Field(
+        default=0,
+        sa_column_kwargs={"server_default": "0"},
+        description="派发失败次数",
+    )
+    dispatch_retry_at: datetime | None = Field(
+        default=None,
+        sa_type=pg.TIMESTAMP(timezone=True),  # type: ignore[arg-type]
+        description="派发失败后的下一次重试时间",
+    )
+    dispatch_error: str | None = Field(
+        default=None, max_length=255, description="最近一次派发失败的原因"
+    )
     description: str | None = Field(
         default=None, max_length=500, description="提醒事项描述"
     )
+    # 由仓储层在写入标题/描述时维护
+    search_tokens: list[str] = Field(
+        default_factory=list,
+        sa_column=Column(pg.ARRAY(pg.TEXT), nullable=False, server_default="{}"),
+        description="标题与描述的单字、二字 token",
+    )
     profile_id: int = Field(
-        foreign_key="profiles.id", nullable=False, index=True, description="宠物ID"
+        foreign_key="profiles.id", nullable=False, description="宠物ID"
     )
 
     # 关系属性（非列）
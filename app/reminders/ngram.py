@@ -0,0 +1,55 @@
+"""提醒搜索的 n-gram 分词
+
+pg_trgm 以 3 字符为单位建索引，1–2 个汉字的关键词（如「疫苗」「驱虫」）无法利用
+idx_reminders_title_gin_trgm。这里把标题和描述规范化（NFKC + 小写）后按 \\w+ 切成片段，
+每个片段收录全部单字与相邻二字，保存在 reminders.search_tokens 并建 GIN 索引。
+
+查询时关键词按同样规则切分，只取二字（单字片段取单字）：
+关键词是原文子串时，它的这些 token 必然都在原文的 token 中，
+因此 search_tokens @> 查询 token 不会漏掉结果，再用 ILIKE 复核去掉误匹配。
+"""
+
+import re
+import unicodedata
+from typing import Iterable
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def index_tokens(*texts: str | None) -> list[str]:
+    """标题、描述等文本的索引 token（单字 + 二字，去重排序）"""
+    tokens: set[str] = set()
+    for text in texts:
+        if not text:
+            continue
+        for run in _WORD.findall(normalize(text)):
+            tokens.update(run)
+            tokens.update(run[i : i + 2] for i in range(len(run) - 1))
+    return sorted(tokens)
+
+
+def query_tokens(terms: Iterable[str]) -> list[str]:
+    """查询词的 token：每个片段取二字，单字片段取单字"""
+    tokens: set[str] = set()
+    for term in terms:
+        for run in _WORD.findall(normalize(term)):
+            if len(run) == 1:
+                tokens.add(run)
+            else:
+                tokens.update(run[i : i + 2] for i in range(len(run) - 1))
+    return sorted(tokens)
+
+
+def split_terms(keyword: str) -> list[str]:
+    """按空白拆分查询词（去重，保持顺序）"""
+    return list(dict.fromkeys(keyword.split()))
+
+
+def like_pattern(term: str) -> str:
+    """包含匹配的 ILIKE 模式（转义 % _ \\）"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
@@ -0,0 +1,122 @@
+"""提醒重复规则（RRULE 子集）与按需展开
+
+支持 FREQ=DAILY|WEEKLY|MONTHLY|YEARLY、INTERVAL、COUNT、UNTIL（RFC 5545 语法），
+例如 "FREQ=MONTHLY;INTERVAL=3;COUNT=4"。规则解析为「每次前进的月数 + 天数」，
+第 k 次（从 0 开始）的到期时间 = 首次到期时间 + k·月数 + k·天数（UTC 计算，
+月份相加超出月末时取月末，与 PostgreSQL 的 timestamp + interval 一致），
+因此数据库中每个提醒只保存一行，完成时可以用一条 UPDATE 推进到下一次。
+"""
+
+import calendar
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+_FREQ_STEPS = {
+    "DAILY": (0, 1),
+    "WEEKLY": (0, 7),
+    "MONTHLY": (1, 0),
+    "YEARLY": (12, 0),
+}
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    months: int
+    days: int
+    count: int | None = None
+    until: datetime | None = None
+
+
+def parse_rrule(rule: str) -> RecurrenceRule:
+    """解析 RRULE 子集，不支持的写法抛出 ValueError"""
+    text = rule.strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[len("RRULE:") :]
+
+    parts: dict[str, str] = {}
+    for part in filter(None, text.split(";")):
+        key, sep, value = part.partition("=")
+        key = key.strip().upper()
+        if not sep or not value.strip():
+            raise ValueError(f"invalid rule part: {part}")
+        if key in parts:
+            raise ValueError(f"duplicate rule part: {key}")
+        parts[key] = value.strip().upper()
+
+    unsupported = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL"}
+    if unsupported:
+        raise ValueError(f"unsupported rule parts: {', '.join(sorted(unsupported))}")
+    if parts.get("FREQ") not in _FREQ_STEPS:
+        raise ValueError("FREQ must be one of DAILY, WEEKLY, MONTHLY, YEARLY")
+    if "COUNT" in parts and "UNTIL" in parts:
+        raise ValueError("COUNT and UNTIL are mutually exclusive")
+
+    interval = _positive_int(parts.get("INTERVAL", "1"), "INTERVAL")
+    months, days = _FREQ_STEPS[parts["FREQ"]]
+    return RecurrenceRule(
+        months=months * interval,
+        days=days * interval,
+        count=_positive_int(parts["COUNT"], "COUNT") if "COUNT" in parts else None,
+        until=_parse_until(parts["UNTIL"]) if "UNTIL" in parts else None,
+    )
+
+
+def occurrence_at(start: datetime, rule: RecurrenceRule, index: int) -> datetime:
+    """第 index 次（从 0 开始）的到期时间"""
+    at = start.astimezone(timezone.utc)
+    if rule.months:
+        month = at.month - 1 + rule.months * index
+        year, month = at.year + month // 12, month % 12 + 1
+        day = min(at.day, calendar.monthrange(year, month)[1])
+        at = at.replace(year=year, month=month, day=day)
+    return at + timedelta(days=rule.days * index)
+
+
+def iter_occurrences(
+    start: datetime,
+    rule: RecurrenceRule,
+    *,
+    first_index: int = 0,
+    window_start: datetime | None = None,
+    window_end: datetime,
+) -> Iterator[tuple[int, datetime]]:
+    """惰性产出 [window_start, window_end) 内的 (序号, 到期时间)，从 first_index 开始
+
+    直接跳到窗口起点附近的序号，不逐个生成窗口之前的重复。
+    """
+    index = first_index
+    if window_start is not None and (rule.months or rule.days):
+        # 每次前进至多 months·31 + days 天，按此跳过的次数不会越过窗口起点
+        step_days = rule.months * 31 + rule.days
+        behind = (window_start - occurrence_at(start, rule, index)).days
+        if behind > 0:
+            index += behind // step_days
+        while occurrence_at(start, rule, index) < window_start:
+            index += 1
+
+    while rule.count is None or index < rule.count:
+        at = occurrence_at(start, rule, index)
+        if at >= window_end or (rule.until is not None and at > rule.until):
+            return
+        yield index, at
+        index += 1
+
+
+def _positive_int(value: str, name: str) -> int:
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return int(value)
+
+
+def _parse_until(value: str) -> datetime:
+    for fmt in ("%Y%m%dT%H%M%SZ", "%Y%m%d"):
+        try:
+            until = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == "%Y%m%d":
+            # 只给日期时包含当天全天
+            until += timedelta(days=1, microseconds=-1)
+        return until.replace(tzinfo=timezone.utc)
+    raise ValueError("UNTIL must be YYYYMMDD or YYYYMMDDTHHMMSSZ")
@@ -1,11 +1,22 @@
-from typing import Any, Mapping
+from datetime import datetime, timedelta
+from typing import Any, Mapping, Sequence
 
+from sqlalchemy import ColumnElement, case, delete, func, or_, tuple_, update
 from sqlalchemy.exc import IntegrityError
-from sqlmodel import asc, col, desc, or_, select
+from sqlmodel import asc, col, desc, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.reminders import ngram
 from app.reminders.model import Reminder
 
+# 重新进入派发队列（改期、完成一次）时清空的派发状态
+DISPATCH_RESET: dict[str, Any] = {
+    "dispatched_at": None,
+    "dispatch_attempts": 0,
+    "dispatch_retry_at": None,
+    "dispatch_error": None,
+}
+
 
 class ReminderRepository:
     """Reminder CRUD"""
@@ -40,13 +51,7 @@ class ReminderRepository:
 
         # 1. 搜索
         if search:
-            pattern = f"%{search}%"
-            query = query.where(
-                or_(
-                    col(Reminder.title).ilike(pattern),
-                    col(Reminder.description).ilike(pattern),
-                )
-            )
+            query = query.where(*self._search_conditions([search]))
 
         # 2. 排序
         allowed_sort = {"id", "title", "created_at"}
@@ -84,8 +89,80 @@ class ReminderRepository:
         result = await self.session.exec(statement)
         return list(result.all())
 
+    async def search_ngram(
+        self,
+        keyword: str,
+        *,
+        limit: int = 10,
+        offset: int = 0,
+    ) -> list[Reminder]:
+        """按 n-gram 索引搜索标题与描述（空白分隔的多个词需全部命中）
+
+        先以 search_tokens @> 查询 token 走 GIN 索引筛出候选，再以 ILIKE 复核；
+        按相关度排序：标题命中的词越多越靠前，其次关键词在标题中出现得越早、标题越短越靠前。
+        """
+        terms = ngram.split_terms(keyword)
+        if not terms:
+            return []
+        title = col(Reminder.title)
+        hits = [case((title.ilike(ngram.like_pattern(t)), 1), else_=0) for t in terms]
+        title_hits = sum(hits[1:], hits[0])
+        first_position = func.strpos(func.lower(title), func.lower(terms[0]))
+        statement = (
+            select(Reminder)
+            .where(*self._search_conditions(terms))
+            .order_by(
+                desc(title_hits),
+                func.nullif(first_position, 0).asc().nulls_last(),
+                func.char_length(title),
+                col(Reminder.id),
+            )
+            .offset(max(offset, 0))
+            .limit(min(limit, 500))
+        )
+        result = await self.session.exec(statement)
+        return list(result.all())
+
+    @staticmethod
+    def _search_conditions(terms: Sequence[str]) -> list[ColumnElement[bool]]:
+        """每个词都需出现在标题或描述中（GIN 预筛 + ILIKE 复核）"""
+        conditions: list[ColumnElement[bool]] = []
+        tokens = ngram.query_tokens(terms)
+        if tokens:
+            conditions.append(col(Reminder.search_tokens).contains(tokens))
+        for term in terms:
+            pattern = ngram.like_pattern(term)
+            conditions.append(
+                or_(
+                    col(Reminder.title).ilike(pattern),
+                    col(Reminder.description).ilike(pattern),
+                )
+            )
+        return conditions
+
+    async def index_missing_search_tokens(self, after_id: int, limit: int) -> list[int]:
+        """为 id > after_id 且 search_tokens 为空的提醒（新增该列之前写入的行）补建 token，
+        返回处理的 id（升序）"""
+        statement = (
+            select(Reminder)
+            .where(col(Reminder.id) > after_id, col(Reminder.search_tokens) == [])
+            .order_by(col(Reminder.id))
+            .limit(limit)
+        )
+        reminders = list((await self.session.exec(statement)).all())
+        for reminder in reminders:
+            reminder.search_tokens = ngram.index_tokens(
+                reminder.title, reminder.description
+            )
+            self.session.add(reminder)
+        await self.session.commit()
+        return [reminder.id for reminder in reminders if reminder.id]
+
     async def create(self, data: Mapping[str, Any]) -> Reminder:
         reminder = Reminder(**data)
+        reminder.search_tokens = ngram.index_tokens(
+            reminder.title, reminder.description
+        )
         self.session.add(reminder)
         await self.session.commit()
         await self.session.refresh(reminder)
@@ -100,6 +177,10 @@ class ReminderRepository:
 
         for key, value in data.items():
             setattr(reminder, key, value)
+        if "title" in data or "description" in data:
+            reminder.search_tokens = ngram.index_tokens(
+                reminder.title, reminder.description
+            )
 
         self.session.add(reminder)
         try:
@@ -118,3 +199,324 @@ class ReminderRepository:
         await self.session.delete(reminder)
         await self.session.commit()
         return True
+
+    async def get_pending_in_window(
+        self,
+        start: datetime,
+        end: datetime,
+        *,
+        profile_id: int | None = None,
+        after: tuple[datetime, int] | None = None,
+        limit: int = 500,
+    ) -> list[Reminder]:
+        """未完成且在 [start, end) 内可能有到期的提醒，按 (due_date, id) 键集分页
+
+        due_date 是下一次待完成的到期时间，之后的重复都不早于它，
+        因此 due_date < end 即可作为范围条件（走 due_date 相关索引）。
+        """
+        conditions = [
+            ~col(Reminder.is_done),
+            col(Reminder.due_date) < end,
+            or_(
+                col(Reminder.recurrence_rule).is_not(None),
+                col(Reminder.due_date) >= start,
+            ),
+            or_(
+                col(Reminder.recurrence_until).is_(None),
+                col(Reminder.recurrence_until) >= start,
+            ),
+        ]
+        if profile_id is not None:
+            conditions.append(col(Reminder.profile_id) == profile_id)
+        if after is not None:
+            conditions.append(
+                tuple_(col(Reminder.due_date), col(Reminder.id)) > tuple_(*after)
+            )
+        statement = (
+            select(Reminder)
+            .where(*conditions)
+            .order_by(col(Reminder.due_date), col(Reminder.id))
+            .limit(limit)
+        )
+        result = await self.session.exec(statement)
+        return list(result.all())
+
+    async def get_pending_page(
+        self,
+        *,
+        due_from: datetime | None = None,
+        due_before: datetime | None = None,
+        profile_ids: Sequence[int] | None = None,
+        after: tuple[datetime, int] | None = None,
+        limit: int = 50,
+    ) -> list[Reminder]:
+        """按 (due_date, id) 升序读取未完成提醒的一页（键集分页，after 为上一页最后一条）
+
+        走部分索引 idx_reminders_pending_profile_due / idx_reminders_pending_due，
+        翻页代价与页码无关。
+        """
+        conditions = [~col(Reminder.is_done)]
+        if due_from is not None:
+            conditions.append(col(Reminder.due_date) >= due_from)
+        if due_before is not None:
+            conditions.append(col(Reminder.due_date) < due_before)
+        if profile_ids:
+            conditions.append(col(Reminder.profile_id).in_(profile_ids))
+        if after is not None:
+            conditions.append(
+                tuple_(col(Reminder.due_date), col(Reminder.id)) > tuple_(*after)
+            )
+        statement = (
+            select(Reminder)
+            .where(*conditions)
+            .order_by(col(Reminder.due_date), col(Reminder.id))
+            .limit(limit)
+        )
+        result = await self.session.exec(statement)
+        return list(result.all())
+
+    async def complete(self, reminder_id: int) -> Reminder | None:
+        """完成当前这一次：重复提醒推进到下一次，最后一次或非重复提醒标记完成
+
+        单条 UPDATE ... RETURNING，不先读取；已完成的提醒不匹配，返回 None。
+        """
+        statement = (
+            update(Reminder)
+            .where(col(Reminder.id) == reminder_id, ~col(Reminder.is_done))
+            .values(**self._advance_values())
+            .returning(Reminder)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        result = await self.session.exec(statement)  # type: ignore[call-overload]
+        reminder = result.scalars().one_or_none()
+        await self.session.commit()
+        return reminder
+
+    async def bulk_complete(self, filters: Mapping[str, Any]) -> list[Reminder]:
+        """批量完成当前这一次（规则同 complete），单条 UPDATE ... RETURNING"""
+        statement = (
+            update(Reminder)
+            .where(*self._filter_conditions(filters), ~col(Reminder.is_done))
+            .values(**self._advance_values())
+            .returning(Reminder)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        result = await self.session.exec(statement)  # type: ignore[call-overload]
+        reminders = list(result.scalars().all())
+        await self.session.commit()
+        return reminders
+
+    async def bulk_reschedule(
+        self,
+        filters: Mapping[str, Any],
+        *,
+        due_date: datetime | None = None,
+        shift_days: int | None = None,
+    ) -> list[Reminder]:
+        """批量改期（指定新的到期时间，或整体平移 shift_days 天），单条 UPDATE ... RETURNING
+
+        与单条修改到期时间一致：重复提醒以新的到期时间作为第 0 次重新开始计数，
+        COUNT 扣除已完成的次数（SET 中的列引用均为更新前的值），并重新进入派发队列。
+        """
+        new_due = (
+            due_date
+            if due_date is not None
+            else col(Reminder.due_date) + timedelta(days=shift_days or 0)
+        )
+        statement = (
+            update(Reminder)
+            .where(*self._filter_conditions(filters))
+            .values(
+                due_date=new_due,
+                recurrence_start=case(
+                    (col(Reminder.recurrence_rule).is_not(None), new_due),
+                    else_=None,
+                ),
+                recurrence_count=col(Reminder.recurrence_count)
+                - col(Reminder.occurrence_index),
+                occurrence_index=0,
+                **DISPATCH_RESET,
+                updated_at=func.now(),
+            )
+            .returning(Reminder)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        result = await self.session.exec(statement)  # type: ignore[call-overload]
+        reminders = list(result.scalars().all())
+        await self.session.commit()
+        return reminders
+
+    async def bulk_delete(self, filters: Mapping[str, Any]) -> list[int]:
+        """批量删除，单条 DELETE ... RETURNING id"""
+        statement = (
+            delete(Reminder)
+            .where(*self._filter_conditions(filters))
+            .returning(col(Reminder.id))
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.exec(statement)  # type: ignore[call-overload]
+        deleted_ids = list(result.scalars().all())
+        await self.session.commit()
+        return deleted_ids
+
+    @staticmethod
+    def _filter_conditions(filters: Mapping[str, Any]) -> list[ColumnElement[bool]]:
+        """批量操作的 WHERE 条件（见 ReminderBulkFilter）"""
+        conditions: list[ColumnElement[bool]] = []
+        if filters.get("ids"):
+            conditions.append(col(Reminder.id).in_(filters["ids"]))
+        if filters.get("profile_id") is not None:
+            conditions.append(col(Reminder.profile_id) == filters["profile_id"])
+        if filters.get("type") is not None:
+            conditions.append(col(Reminder.type) == filters["type"])
+        if filters.get("is_done") is not None:
+            conditions.append(col(Reminder.is_done) == filters["is_done"])
+        if filters.get("due_from") is not None:
+            conditions.append(col(Reminder.due_date) >= filters["due_from"])
+        if filters.get("due_before") is not None:
+            conditions.append(col(Reminder.due_date) < filters["due_before"])
+        if not conditions:
+            raise ValueError("bulk operations require at least one filter")
+        return conditions
+
+    @staticmethod
+    def _advance_values() -> dict[str, Any]:
+        """完成一次所需的 SET 子句（均引用更新前的列值）
+
+        下一次到期时间按 UTC 计算：recurrence_start + (k+1)·月 + (k+1)·天，
+        与 app/reminders/recurrence.py 的 occurrence_at 一致。
+        """
+        next_index = col(Reminder.occurrence_index) + 1
+        next_due = func.timezone(
+            "UTC",
+            func.timezone("UTC", col(Reminder.recurrence_start))
+            + func.make_interval(
+                0,
+                col(Reminder.recurrence_months) * next_index,
+                0,
+                col(Reminder.recurrence_days) * next_index,
+            ),
+        )
+        has_next = (
+            col(Reminder.recurrence_rule).is_not(None)
+            & or_(
+                col(Reminder.recurrence_count).is_(None),
+                next_index < col(Reminder.recurrence_count),
+            )
+            & or_(
+                col(Reminder.recurrence_until).is_(None),
+                next_due <= col(Reminder.recurrence_until),
+            )
+        )
+        return {
+            "due_date": case((has_next, next_due), else_=col(Reminder.due_date)),
+            "occurrence_index": case(
+                (has_next, next_index), else_=col(Reminder.occurrence_index)
+            ),
+            "is_done": ~has_next,
+            **DISPATCH_RESET,
+            "updated_at": func.now(),
+        }
+
+    async def get_dispatch_window(
+        self,
+        until: datetime,
+        limit: int,
+        *,
+        max_attempts: int,
+    ) -> list[tuple[datetime, datetime, int]]:
+        """按 (due_date, id) 升序读取 until 之前应派发、未完成且未派发的提醒（走部分索引）
+
+        返回 (due_date, 派发时间, id)：派发失败过的提醒的派发时间为其重试时间；
+        失败已达 max_attempts 次的不再派发。
+        """
+        attempt_at = func.coalesce(
+            col(Reminder.dispatch_retry_at), col(Reminder.due_date)
+        )
+        statement = (
+            select(Reminder.due_date, attempt_at, Reminder.id)
+            .where(
+                col(Reminder.dispatched_at).is_(None),
+                ~col(Reminder.is_done),
+                col(Reminder.due_date) <= until,
+                attempt_at <= until,
+                col(Reminder.dispatch_attempts) < max_attempts,
+            )
+            .order_by(col(Reminder.due_date), col(Reminder.id))
+            .limit(limit)
+        )
+        result = await self.session.exec(statement)
+        return [
+            (due_date, next_at, reminder_id)
+            for due_date, next_at, reminder_id in result.all()
+        ]
+
+    async def claim_due(
+        self,
+        reminder_ids: Sequence[int],
+        *,
+        max_attempts: int,
+    ) -> list[Reminder]:
+        """锁定已到期且仍未派发的提醒（FOR UPDATE SKIP LOCKED）
+
+        其它进程正在派发的行被跳过；锁持有到调用方提交，提交前写入 dispatched_at
+        （或失败记录），因此每条提醒每次到期只会被派发一次。到期时间、重试时间、
+        完成状态在加锁时重新判断，内存中的过期条目（已修改/已完成）不会被派发。
+        """
+        statement = (
+            select(Reminder)
+            .where(
+                col(Reminder.id).in_(reminder_ids),
+                col(Reminder.dispatched_at).is_(None),
+                ~col(Reminder.is_done),
+                col(Reminder.due_date) <= func.now(),
+                func.coalesce(col(Reminder.dispatch_retry_at), col(Reminder.due_date))
+                <= func.now(),
+                col(Reminder.dispatch_attempts) < max_attempts,
+            )
+            .order_by(col(Reminder.due_date), col(Reminder.id))
+            .with_for_update(skip_locked=True)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.exec(statement)
+        return list(result.all())
+
+    async def mark_dispatched(self, reminder_ids: Sequence[int]) -> None:
+        if not reminder_ids:
+            return
+        await self.session.exec(
+            update(Reminder)
+            .where(col(Reminder.id).in_(reminder_ids))
+            .values(dispatched_at=func.now(), dispatch_retry_at=None)
+        )
+
+    async def mark_dispatch_failed(
+        self,
+        errors: Mapping[int, str],
+        *,
+        retry_seconds: float,
+    ) -> None:
+        """记录派发失败：失败次数加一，按 retry_seconds·2^(次数-1) 退避后重试"""
+        if not errors:
+            return
+        await self.session.exec(
+            update(Reminder)
+            .where(col(Reminder.id).in_(errors))
+            .values(
+                dispatch_attempts=col(Reminder.dispatch_attempts) + 1,
+                dispatch_retry_at=func.now()
+                + func.make_interval(
+                    0,
+                    0,
+                    0,
+                    0,
+                    0,
+                    0,
+                    retry_seconds * func.power(2, col(Reminder.dispatch_attempts)),
+                ),
+                dispatch_error=case(
+                    {reminder_id: error[:255] for reminder_id, error in errors.items()},
+                    value=col(Reminder.id),
+                ),
+            )
+        )
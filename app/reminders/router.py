@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Path, Query
@@ -6,7 +7,16 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.database import get_session
 from app.core.exception import NotFoundException
 from app.reminders.repository import ReminderRepository
-from app.reminders.schema import ReminderCreate, ReminderResponse, ReminderUpdate
+from app.reminders.schema import (
+    ReminderBulkDeleteResponse,
+    ReminderBulkFilter,
+    ReminderBulkReschedule,
+    ReminderCreate,
+    ReminderOccurrenceResponse,
+    ReminderPageResponse,
+    ReminderResponse,
+    ReminderUpdate,
+)
 from app.reminders.service import ReminderService
 
 router = APIRouter(prefix="/reminders", tags=["reminders"])
@@ -31,12 +41,124 @@ async def create_reminder(
 
 @router.get("/search", response_model=list[ReminderResponse])
 async def search_reminders_by_title(
-    keyword: Annotated[str, Query(..., description="标题关键词（支持模糊匹配）")],
+    keyword: Annotated[
+        str, Query(..., description="关键词（ngram 模式下空白分隔的多个词需全部命中）")
+    ],
     service: Annotated[ReminderService, Depends(get_reminder_service)],
+    mode: Annotated[
+        str,
+        Query(
+            pattern="^(ngram|trgm)$",
+            description="ngram: 标题+描述，按相关度排序；trgm: 仅标题（pg_trgm）",
+        ),
+    ] = "ngram",
     limit: Annotated[int, Query(ge=1, le=500, description="每页数量")] = 10,
     offset: Annotated[int, Query(ge=0, description="偏移量")] = 0,
 ):
-    return await service.search_reminders_by_title(keyword, limit=limit, offset=offset)
+    return await service.search_reminders_by_title(
+        keyword, mode=mode, limit=limit, offset=offset
+    )
+
+
+@router.get("/occurrences", response_model=list[ReminderOccurrenceResponse])
+async def list_reminder_occurrences(
+    start: Annotated[datetime, Query(..., description="起始时间（包含）")],
+    end: Annotated[
+        datetime, Query(..., description="结束时间（不包含），窗口至多 366 天")
+    ],
+    service: Annotated[ReminderService, Depends(get_reminder_service)],
+    profile_id: Annotated[int | None, Query(description="宠物ID，为空不限")] = None,
+    limit: Annotated[int, Query(ge=1, le=5000, description="最大返回数量")] = 500,
+):
+    """按时间窗口展开未完成的提醒（重复提醒按规则惰性展开），按到期时间升序"""
+    return await service.list_occurrences(
+        start=start, end=end, profile_id=profile_id, limit=limit
+    )
+
+
+@router.get("/upcoming", response_model=ReminderPageResponse)
+async def list_upcoming_reminders(
+    service: Annotated[ReminderService, Depends(get_reminder_service)],
+    profile_id: Annotated[
+        list[int] | None, Query(description="宠物ID，可重复传入多个，为空不限")
+    ] = None,
+    days: Annotated[int, Query(ge=1, le=90, description="未来天数")] = 7,
+    after_due_date: Annotated[
+        datetime | None, Query(description="上一页返回的 next_after_due_date")
+    ] = None,
+    after_id: Annotated[
+        int | None, Query(description="上一页返回的 next_after_id")
+    ] = None,
+    limit: Annotated[int, Query(ge=1, le=500, description="每页数量")] = 50,
+):
+    """未来 days 天内到期的未完成提醒，按 (到期时间, ID) 升序键集分页"""
+    return await service.list_upcoming(
+        days=days,
+        profile_ids=profile_id,
+        after_due_date=after_due_date,
+        after_id=after_id,
+        limit=limit,
+    )
+
+
+@router.get("/overdue", response_model=ReminderPageResponse)
+async def list_overdue_reminders(
+    service: Annotated[ReminderService, Depends(get_reminder_service)],
+    profile_id: Annotated[
+        list[int] | None, Query(description="宠物ID，可重复传入多个，为空不限")
+    ] = None,
+    after_due_date: Annotated[
+        datetime | None, Query(description="上一页返回的 next_after_due_date")
+    ] = None,
+    after_id: Annotated[
+        int | None, Query(description="上一页返回的 next_after_id")
+    ] = None,
+    limit: Annotated[int, Query(ge=1, le=500, description="每页数量")] = 50,
+):
+    """已过到期时间仍未完成的提醒，按 (到期时间, ID) 升序键集分页（最早逾期的在前）"""
+    return await service.list_overdue(
+        profile_ids=profile_id,
+        after_due_date=after_due_date,
+        after_id=after_id,
+        limit=limit,
+    )
+
+
+# 批量操作：每个请求一条 UPDATE/DELETE ... RETURNING 语句、一个事务
+@router.post("/bulk/complete", response_model=list[ReminderResponse])
+async def bulk_complete_reminders(
+    filters: ReminderBulkFilter,
+    service: Annotated[ReminderService, Depends(get_reminder_service)],
+):
+    """批量完成匹配的未完成提醒（重复提醒推进到下一次），返回被修改的提醒"""
+    return await service.bulk_complete(filters)
+
+
+@router.post("/bulk/reschedule", response_model=list[ReminderResponse])
+async def bulk_reschedule_reminders(
+    data: ReminderBulkReschedule,
+    service: Annotated[ReminderService, Depends(get_reminder_service)],
+):
+    """批量改期（指定新的到期时间或整体平移天数），返回被修改的提醒"""
+    return await service.bulk_reschedule(data)
+
+
+@router.post("/bulk/delete", response_model=ReminderBulkDeleteResponse)
+async def bulk_delete_reminders(
+    filters: ReminderBulkFilter,
+    service: Annotated[ReminderService, Depends(get_reminder_service)],
+):
+    """批量删除匹配的提醒，返回被删除的提醒ID"""
+    return await service.bulk_delete(filters)
+
+
+@router.post("/{reminder_id}/complete", response_model=ReminderResponse)
+async def complete_reminder(
+    reminder_id: Annotated[int, Path(..., description="提醒事项ID")],
+    service: Annotated[ReminderService, Depends(get_reminder_service)],
+):
+    """完成当前这一次：重复提醒推进到下一次到期时间，最后一次或非重复提醒标记为完成"""
+    return await service.complete_reminder(reminder_id)
 
 
 @router.get("/{reminder_title}", response_model=ReminderResponse)
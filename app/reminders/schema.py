@@ -1,5 +1,6 @@
 from datetime import datetime
 
+from pydantic import model_validator
 from sqlmodel import Field, SQLModel
 
 
@@ -12,6 +13,11 @@ class ReminderCreate(SQLModel):
     is_done: bool = Field(False, description="是否完成")
     description: str | None = Field(None, description="提醒事项描述")
     profile_id: int = Field(..., description="宠物ID")
+    recurrence_rule: str | None = Field(
+        None,
+        max_length=255,
+        description="重复规则（RRULE 子集：FREQ=DAILY|WEEKLY|MONTHLY|YEARLY;INTERVAL;COUNT;UNTIL）",
+    )
 
 
 class ReminderUpdate(SQLModel):
@@ -23,6 +29,9 @@ class ReminderUpdate(SQLModel):
     is_done: bool | None = Field(None, description="是否完成")
     description: str | None = Field(None, description="提醒事项描述")
     profile_id: int | None = Field(None, description="宠物ID")
+    recurrence_rule: str | None = Field(
+        None, max_length=255, description="重复规则，空字符串表示取消重复"
+    )
 
 
 class ReminderResponse(SQLModel):
@@ -35,3 +44,74 @@ class ReminderResponse(SQLModel):
     is_done: bool = Field(False, description="是否完成")
     description: str | None = Field(None, description="提醒事项描述")
     profile_id: int = Field(..., description="宠物ID")
+    recurrence_rule: str | None = Field(None, description="重复规则")
+    occurrence_index: int = Field(0, description="当前到期时间对应的重复序号")
+    dispatched_at: datetime | None = Field(None, description="派发时间")
+    dispatch_attempts: int = Field(0, description="派发失败次数")
+    dispatch_error: str | None = Field(None, description="最近一次派发失败的原因")
+
+
+class ReminderOccurrenceResponse(SQLModel):
+    """按需展开的一次提醒"""
+
+    reminder_id: int = Field(..., description="提醒事项ID")
+    profile_id: int = Field(..., description="宠物ID")
+    title: str = Field(..., description="提醒事项标题")
+    type: str = Field(..., description="提醒事项类型")
+    occurrence_index: int = Field(..., description="重复序号（从 0 开始）")
+    due_date: datetime = Field(..., description="到期时间")
+
+
+class ReminderPageResponse(SQLModel):
+    """提醒分页响应（按 (due_date, id) 键集分页）"""
+
+    items: list[ReminderResponse] = Field(
+        default_factory=list, description="本页提醒，按到期时间升序"
+    )
+    next_after_due_date: datetime | None = Field(
+        None, description="下一页的 after_due_date，为空表示没有更多"
+    )
+    next_after_id: int | None = Field(
+        None, description="下一页的 after_id，为空表示没有更多"
+    )
+
+
+class ReminderBulkFilter(SQLModel):
+    """批量操作的筛选条件（各条件同时满足；ids 与 profile_id 至少提供一个）"""
+
+    ids: list[int] | None = Field(
+        None, min_length=1, max_length=1000, description="提醒事项ID列表"
+    )
+    profile_id: int | None = Field(None, description="宠物ID")
+    type: str | None = Field(None, max_length=50, description="提醒事项类型")
+    is_done: bool | None = Field(None, description="是否完成")
+    due_from: datetime | None = Field(None, description="到期时间下限（包含）")
+    due_before: datetime | None = Field(None, description="到期时间上限（不包含）")
+
+    @model_validator(mode="after")
+    def check_scope(self):
+        """避免误操作整张表"""
+        if not self.ids and self.profile_id is None:
+            raise ValueError("Must provide ids or profile_id")
+        return self
+
+
+class ReminderBulkReschedule(ReminderBulkFilter):
+    """批量改期：due_date 与 shift_days 二选一"""
+
+    due_date: datetime | None = Field(None, description="新的到期时间")
+    shift_days: int | None = Field(
+        None, ge=-3650, le=3650, description="到期时间整体前移/后移的天数"
+    )
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.due_date is None) == (self.shift_days is None):
+            raise ValueError("Must provide exactly one of due_date or shift_days")
+        return self
+
+
+class ReminderBulkDeleteResponse(SQLModel):
+    """批量删除响应"""
+
+    deleted_ids: list[int] = Field(default_factory=list, description="已删除的提醒ID")
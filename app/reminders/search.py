@@ -0,0 +1,26 @@
+from loguru import logger
+
+from app.core.database import Database
+from app.reminders.repository import ReminderRepository
+
+_BACKFILL_BATCH = 500
+
+
+async def backfill_search_tokens(database: Database) -> int:
+    """启动时为旧提醒补建 n-gram 搜索 token（按 id 游标分批提交），返回处理数量"""
+    total = cursor = 0
+    while True:
+        try:
+            async with database.session_factory() as session:
+                ids = await ReminderRepository(session).index_missing_search_tokens(
+                    cursor, _BACKFILL_BATCH
+                )
+        except Exception as e:
+            logger.error(f"提醒搜索 token 补建失败: {str(e)}")
+            return total
+        total += len(ids)
+        if len(ids) < _BACKFILL_BATCH:
+            if total:
+                logger.info(f"提醒搜索 token 补建完成: {total} 条")
+            return total
+        cursor = ids[-1]
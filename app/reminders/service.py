@@ -1,8 +1,34 @@
+import heapq
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Iterator
+
 from sqlalchemy.exc import IntegrityError
 
-from app.core.exception import AlreadyExistsException, NotFoundException
-from app.reminders.repository import ReminderRepository
-from app.reminders.schema import ReminderCreate, ReminderResponse, ReminderUpdate
+from app.core.exception import (
+    AlreadyExistsException,
+    BadRequestException,
+    NotFoundException,
+)
+from app.reminders import recurrence
+from app.reminders.dispatcher import reminder_dispatcher
+from app.reminders.model import Reminder
+from app.reminders.repository import DISPATCH_RESET, ReminderRepository
+from app.reminders.schema import (
+    ReminderBulkDeleteResponse,
+    ReminderBulkFilter,
+    ReminderBulkReschedule,
+    ReminderCreate,
+    ReminderOccurrenceResponse,
+    ReminderPageResponse,
+    ReminderResponse,
+    ReminderUpdate,
+)
+
+# 展开重复提醒时允许的最大时间窗口
+MAX_OCCURRENCE_WINDOW = timedelta(days=366)
+# 展开时每次读取的提醒数量
+_OCCURRENCE_PAGE_SIZE = 500
 
 
 class ReminderService:
@@ -49,21 +75,240 @@ class ReminderService:
         self,
         keyword: str,
         *,
+        mode: str = "ngram",
         limit: int = 10,
         offset: int = 0,
     ) -> list[ReminderResponse]:
-        """通过标题关键词模糊搜索提醒（pg_trgm GIN 索引加速）"""
-        reminders = await self.repository.search_by_title_trgm(
-            keyword,
+        """关键词搜索提醒
+
+        ngram: 标题 + 描述，n-gram GIN 索引加速并按相关度排序（适合 1–2 个汉字的短词）；
+        trgm: 仅标题，pg_trgm GIN 索引加速。
+        """
+        search = (
+            self.repository.search_ngram
+            if mode == "ngram"
+            else self.repository.search_by_title_trgm
+        )
+        reminders = await search(keyword, limit=limit, offset=offset)
+        return [ReminderResponse.model_validate(r) for r in reminders]
+
+    async def list_occurrences(
+        self,
+        *,
+        start: datetime,
+        end: datetime,
+        profile_id: int | None = None,
+        limit: int = 500,
+    ) -> list[ReminderOccurrenceResponse]:
+        """展开 [start, end) 内的提醒：每个重复提醒一个惰性生成器，按到期时间归并
+
+        提醒按 (due_date, id) 分页读取，每页与已有结果归并后只保留前 limit 条。
+        之后的页中提醒的每次到期都不早于本页最后一条的 due_date，
+        已有 limit 条不晚于它的结果时停止读取，不会把全部重复提醒装入内存。
+        """
+        if start >= end:
+            raise BadRequestException("start must be earlier than end")
+        if end - start > MAX_OCCURRENCE_WINDOW:
+            raise BadRequestException("window must not exceed 366 days")
+
+        def key(occurrence: ReminderOccurrenceResponse) -> tuple[datetime, int]:
+            return occurrence.due_date, occurrence.reminder_id
+
+        occurrences: list[ReminderOccurrenceResponse] = []
+        after: tuple[datetime, int] | None = None
+        while True:
+            reminders = await self.repository.get_pending_in_window(
+                start,
+                end,
+                profile_id=profile_id,
+                after=after,
+                limit=_OCCURRENCE_PAGE_SIZE,
+            )
+            merged = heapq.merge(
+                occurrences,
+                *(self._occurrences(r, start, end) for r in reminders),
+                key=key,
+            )
+            occurrences = list(islice(merged, limit))
+            if len(reminders) < _OCCURRENCE_PAGE_SIZE:
+                return occurrences
+            last = reminders[-1]
+            assert last.id is not None
+            after = (last.due_date, last.id)
+            if len(occurrences) >= limit and key(occurrences[-1]) <= after:
+                return occurrences
+
+    async def list_upcoming(
+        self,
+        *,
+        days: int = 7,
+        profile_ids: list[int] | None = None,
+        after_due_date: datetime | None = None,
+        after_id: int | None = None,
+        limit: int = 50,
+    ) -> ReminderPageResponse:
+        """未来 days 天内到期的未完成提醒"""
+        now = datetime.now(tz=timezone.utc)
+        return await self._pending_page(
+            due_from=now,
+            due_before=now + timedelta(days=days),
+            profile_ids=profile_ids,
+            after_due_date=after_due_date,
+            after_id=after_id,
             limit=limit,
-            offset=offset,
         )
+
+    async def list_overdue(
+        self,
+        *,
+        profile_ids: list[int] | None = None,
+        after_due_date: datetime | None = None,
+        after_id: int | None = None,
+        limit: int = 50,
+    ) -> ReminderPageResponse:
+        """已过到期时间仍未完成的提醒"""
+        return await self._pending_page(
+            due_before=datetime.now(tz=timezone.utc),
+            profile_ids=profile_ids,
+            after_due_date=after_due_date,
+            after_id=after_id,
+            limit=limit,
+        )
+
+    async def _pending_page(
+        self,
+        *,
+        after_due_date: datetime | None,
+        after_id: int | None,
+        limit: int,
+        **filters: Any,
+    ) -> ReminderPageResponse:
+        if (after_due_date is None) != (after_id is None):
+            raise BadRequestException(
+                "after_due_date and after_id must be given together"
+            )
+        after = (after_due_date, after_id) if after_id is not None else None
+
+        # 多取一条判断是否还有下一页
+        reminders = await self.repository.get_pending_page(
+            after=after, limit=limit + 1, **filters
+        )
+        page = ReminderPageResponse(
+            items=[ReminderResponse.model_validate(r) for r in reminders[:limit]]
+        )
+        if len(reminders) > limit:
+            page.next_after_due_date = page.items[-1].due_date
+            page.next_after_id = page.items[-1].id
+        return page
+
+    async def complete_reminder(self, reminder_id: int) -> ReminderResponse:
+        """完成当前这一次（重复提醒推进到下一次）；已完成的提醒原样返回"""
+        reminder = await self.repository.complete(reminder_id)
+        if reminder is None:
+            reminder = await self.repository.get_by_id(reminder_id)
+            if not reminder:
+                raise NotFoundException("Reminder not found")
+        reminder_dispatcher.notify()
+        return ReminderResponse.model_validate(reminder)
+
+    async def bulk_complete(
+        self, filters: ReminderBulkFilter
+    ) -> list[ReminderResponse]:
+        """批量完成匹配的未完成提醒（重复提醒推进到下一次），返回被修改的提醒"""
+        reminders = await self.repository.bulk_complete(
+            filters.model_dump(exclude_none=True)
+        )
+        if reminders:
+            reminder_dispatcher.notify()
         return [ReminderResponse.model_validate(r) for r in reminders]
 
+    async def bulk_reschedule(
+        self, data: ReminderBulkReschedule
+    ) -> list[ReminderResponse]:
+        """批量改期，返回被修改的提醒"""
+        reminders = await self.repository.bulk_reschedule(
+            data.model_dump(exclude_none=True, exclude={"due_date", "shift_days"}),
+            due_date=data.due_date,
+            shift_days=data.shift_days,
+        )
+        if reminders:
+            reminder_dispatcher.notify()
+        return [ReminderResponse.model_validate(r) for r in reminders]
+
+    async def bulk_delete(
+        self, filters: ReminderBulkFilter
+    ) -> ReminderBulkDeleteResponse:
+        deleted_ids = await self.repository.bulk_delete(
+            filters.model_dump(exclude_none=True)
+        )
+        return ReminderBulkDeleteResponse(deleted_ids=deleted_ids)
+
+    @staticmethod
+    def _occurrences(
+        reminder: Reminder,
+        start: datetime,
+        end: datetime,
+    ) -> Iterator[ReminderOccurrenceResponse]:
+        if reminder.recurrence_rule is None or reminder.recurrence_start is None:
+            schedule = iter([(reminder.occurrence_index, reminder.due_date)])
+        else:
+            rule = recurrence.RecurrenceRule(
+                months=reminder.recurrence_months or 0,
+                days=reminder.recurrence_days or 0,
+                count=reminder.recurrence_count,
+                until=reminder.recurrence_until,
+            )
+            schedule = recurrence.iter_occurrences(
+                reminder.recurrence_start,
+                rule,
+                first_index=reminder.occurrence_index,
+                window_start=start,
+                window_end=end,
+            )
+        for index, due_date in schedule:
+            if start <= due_date < end:
+                yield ReminderOccurrenceResponse(
+                    reminder_id=reminder.id,
+                    profile_id=reminder.profile_id,
+                    title=reminder.title,
+                    type=reminder.type,
+                    occurrence_index=index,
+                    due_date=due_date,
+                )
+
+    @staticmethod
+    def _recurrence_values(rule_text: str | None, due_date: datetime) -> dict[str, Any]:
+        """解析重复规则为存储列，以 due_date 作为第 0 次重新开始计数"""
+        if not rule_text:
+            return {
+                "recurrence_rule": None,
+                "recurrence_start": None,
+                "recurrence_months": None,
+                "recurrence_days": None,
+                "recurrence_count": None,
+                "recurrence_until": None,
+                "occurrence_index": 0,
+            }
+        try:
+            rule = recurrence.parse_rrule(rule_text)
+        except ValueError as e:
+            raise BadRequestException(f"Invalid recurrence_rule: {e}") from e
+        return {
+            "recurrence_rule": rule_text.strip(),
+            "recurrence_start": due_date,
+            "recurrence_months": rule.months,
+            "recurrence_days": rule.days,
+            "recurrence_count": rule.count,
+            "recurrence_until": rule.until,
+            "occurrence_index": 0,
+        }
+
     async def create_reminder(self, reminder_data: ReminderCreate) -> ReminderResponse:
         data = reminder_data.model_dump()
+        data.update(self._recurrence_values(data["recurrence_rule"], data["due_date"]))
         try:
             reminder = await self.repository.create(data)
+            reminder_dispatcher.notify()
 
             return ReminderResponse.model_validate(reminder)
         except IntegrityError as e:
@@ -80,9 +325,30 @@ class ReminderService:
             update_data = reminder_data.model_dump(
                 exclude_unset=True, exclude_none=True
             )
+            if "due_date" in update_data or "recurrence_rule" in update_data:
+                # 改期或修改规则时，以新的到期时间作为第 0 次重新开始计数
+                current = await self.repository.get_by_id(reminder_id)
+                if not current:
+                    raise NotFoundException("Reminder not found")
+                values = self._recurrence_values(
+                    update_data.get("recurrence_rule", current.recurrence_rule),
+                    update_data.get("due_date", current.due_date),
+                )
+                if (
+                    "recurrence_rule" not in update_data
+                    and current.recurrence_count is not None
+                ):
+                    # 规则未变只改期：已完成的次数计入 COUNT，新的起点只剩余下的次数
+                    values["recurrence_count"] = (
+                        current.recurrence_count - current.occurrence_index
+                    )
+                update_data.update(values)
+                # 改期后重新进入派发队列
+                update_data.update(DISPATCH_RESET)
             updated = await self.repository.update(reminder_id, update_data)
             if not updated:
                 raise NotFoundException("Reminder not found")
+            reminder_dispatcher.notify()
 
             return ReminderResponse.model_validate(updated)
         except IntegrityError as e:
@@ -0,0 +1,43 @@
+"""体重读数异常检测（滚动中位数 + MAD）
+
+每个宠物在 profile_weight_summary 上保存最近若干条读数（新到旧），
+新读数到达时与窗口的中位数比较修正 Z 分数（Iglewicz–Hoaglin）：
+    z = 0.6745 · |x - median| / MAD
+窗口很小（默认 15 条），在锁定汇总行后于内存中计算，不增加额外查询。
+体重通常很稳定，MAD 可能接近 0，因此设置相对下限（中位数的 1%），
+即偏离中位数约 5% 以上才会被判定为异常。
+
+被标记为异常的读数同样进入窗口：零星的异常值不会移动中位数，
+而体重持续处于新水平（换秤、术后等）时，新读数占到窗口约一半后中位数随之移动，
+之后的读数不再被标记；若只保留正常读数，窗口会停留在旧水平，之后的读数永远是异常。
+"""
+
+from statistics import median
+
+_Z_SCALE = 0.6745
+# MAD 的相对下限（占中位数的比例）
+_MIN_RELATIVE_MAD = 0.01
+
+
+def is_outlier(
+    window: list[int],
+    weight_g: int,
+    *,
+    threshold: float,
+    min_samples: int,
+) -> bool:
+    """窗口样本不足 min_samples 时不做判断"""
+    if len(window) < min_samples:
+        return False
+
+    center = median(window)
+    mad = median(abs(value - center) for value in window)
+    spread = max(mad, center * _MIN_RELATIVE_MAD)
+    if spread <= 0:
+        return False
+    return _Z_SCALE * abs(weight_g - center) / spread > threshold
+
+
+def push(window: list[int], weight_g: int, *, size: int) -> list[int]:
+    """将最新读数放到窗口头部，超出 size 的旧读数被移除"""
+    return [weight_g, *window][:size]
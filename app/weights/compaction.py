@@ -0,0 +1,98 @@
+"""旧体重读数压缩为日汇总行
+
+早于保留期（WEIGHT_COMPACTION_RETENTION_DAYS）的原始读数很少需要全分辨率读取，
+却占据 weight_records 的大部分体积与索引。压缩任务按 UTC 日把每个宠物的读数
+合并为一行（weight_g 为均值，sample_count/min_weight_g/max_weight_g 保留统计信息），
+日汇总行仍存放在 weight_records 中，列表、曲线、导出无需改动即可读到；
+时间桶聚合、汇总重算与生长百分位按 sample_count 加权。
+
+按宠物分块，每块一个事务，块之间暂停，避免长事务与持续占满 IO。
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import Database
+from app.nutrition.cache import plan_cache
+from app.nutrition.replanner import nutrition_replanner
+from app.weights.repository import WeightRecordRepository
+
+
+@dataclass
+class CompactionResult:
+    profiles: int = 0
+    removed: int = 0
+    rollups: int = 0
+
+
+def compaction_horizon(
+    now: datetime | None = None,
+    *,
+    retention_days: int | None = None,
+) -> datetime:
+    """保留期起点（UTC 零点），早于该时间的读数参与压缩"""
+    if retention_days is None:
+        retention_days = settings.weight_compaction_retention_days
+    now = now or datetime.now(tz=timezone.utc)
+    horizon = now.astimezone(timezone.utc) - timedelta(days=retention_days)
+    return horizon.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def compact_weight_records(
+    session_factory: async_sessionmaker[AsyncSession],
+    *,
+    before: datetime | None = None,
+    chunk_profiles: int | None = None,
+    throttle_s: float | None = None,
+) -> CompactionResult:
+    """按 profile_id 游标分块压缩全部宠物的旧读数"""
+    before = before or compaction_horizon()
+    chunk_profiles = chunk_profiles or settings.weight_compaction_chunk_profiles
+    if throttle_s is None:
+        throttle_s = settings.weight_compaction_throttle_ms / 1000
+
+    result = CompactionResult()
+    cursor = 0
+    while True:
+        async with session_factory() as session:
+            repository = WeightRecordRepository(session)
+            profile_ids = await repository.get_profile_ids_after(cursor, chunk_profiles)
+            if not profile_ids:
+                break
+            removed, rollups, compacted = await repository.compact_daily(
+                profile_ids, before=before
+            )
+
+        cursor = profile_ids[-1]
+        result.profiles += len(compacted)
+        result.removed += removed
+        result.rollups += rollups
+        # 最近无读数的宠物，最新体重可能变为日均值
+        for profile_id in compacted:
+            plan_cache.invalidate_profile(profile_id)
+        if compacted:
+            nutrition_replanner.notify()
+        if throttle_s > 0:
+            await asyncio.sleep(throttle_s)
+    return result
+
+
+async def compact_weight_records_forever(database: Database) -> None:
+    """后台定期压缩旧体重读数"""
+    while True:
+        try:
+            result = await compact_weight_records(database.session_factory)
+            if result.removed:
+                logger.info(
+                    f"体重读数压缩完成: {result.profiles} 个宠物, "
+                    f"{result.removed} 行合并为 {result.rollups} 个日汇总行"
+                )
+        except Exception as e:
+            logger.error(f"体重读数压缩失败: {str(e)}")
+        await asyncio.sleep(settings.weight_compaction_interval_seconds)
@@ -0,0 +1,92 @@
+"""体重曲线降采样（Largest-Triangle-Three-Buckets）
+
+首尾两点必选，中间读数按下标均分为 threshold-2 个桶，每个桶选出与
+「上一个已选点」「下一个桶的平均点」构成三角形面积最大的读数。
+与按时间桶取平均不同，LTTB 保留峰谷等视觉形状，适合绘图。
+
+输入为按时间升序的流，总数 total 事先由 count 查询得到（用于确定桶边界）；
+处理时最多只缓存相邻三个桶，内存占用为 O(total / threshold)，与序列长度无关。
+流实际长度与 total 不一致（统计后有并发写入）时仍能正确结束：
+末点总是流中最后一条，多出的读数归入最后一个桶。
+"""
+
+import math
+from datetime import datetime
+from typing import AsyncIterator
+
+# (measured_at, weight_g)
+Point = tuple[datetime, int]
+
+
+async def lttb(
+    points: AsyncIterator[Point],
+    *,
+    total: int,
+    threshold: int,
+) -> AsyncIterator[Point]:
+    """从按时间升序的读数流中选出至多 threshold 个点（threshold < 3 时不降采样）"""
+    if threshold < 3 or total <= threshold:
+        async for point in points:
+            yield point
+        return
+
+    every = (total - 2) / (threshold - 2)
+    last_bucket = threshold - 3
+    selected: Point | None = None
+    pending: Point | None = None
+    buckets: list[list[Point]] = []
+    bucket_id = -1
+    index = 1
+
+    async for point in points:
+        if selected is None:
+            selected = point
+            yield point
+            continue
+
+        # 只有看到下一条读数后，才能确定 pending 不是末点
+        if pending is not None:
+            # 第 b 个桶覆盖中间读数下标 [floor(b·every)+1, floor((b+1)·every)+1)
+            current = min(math.ceil(index / every) - 1, last_bucket)
+            if current != bucket_id:
+                bucket_id = current
+                buckets.append([])
+                # 新桶开始意味着前一个桶已完整，可以处理再前一个桶
+                if len(buckets) == 3:
+                    selected = _pick(selected, buckets.pop(0), _mean(buckets[0]))
+                    yield selected
+            buckets[-1].append(pending)
+            index += 1
+        pending = point
+
+    if selected is None or pending is None:
+        return
+
+    while buckets:
+        bucket = buckets.pop(0)
+        selected = _pick(
+            selected, bucket, _mean(buckets[0]) if buckets else _xy(pending)
+        )
+        yield selected
+    yield pending
+
+
+def _xy(point: Point) -> tuple[float, float]:
+    return point[0].timestamp(), float(point[1])
+
+
+def _mean(bucket: list[Point]) -> tuple[float, float]:
+    xs, ys = zip(*(_xy(point) for point in bucket))
+    return sum(xs) / len(xs), sum(ys) / len(ys)
+
+
+def _pick(previous: Point, bucket: list[Point], target: tuple[float, float]) -> Point:
+    ax, ay = _xy(previous)
+    cx, cy = target
+
+    def area(point: Point) -> float:
+        bx, by = _xy(point)
+        # 三角形面积的两倍，比较大小时无需除以 2
+        return abs((ax - cx) * (by - ay) - (ax - bx) * (cy - ay))
+
+    return max(bucket, key=area)
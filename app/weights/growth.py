@@ -0,0 +1,61 @@
+"""品种生长百分位曲线
+
+后台任务定期从 weight_records 与 profiles.variety/birthday 重算
+breed_growth_percentiles（每个品种、每个月龄一行 P5–P95），
+查询时按（品种, 月龄）主键读取一行，再在 7 个百分位节点间线性插值定位，
+请求路径上不扫描体重表。
+"""
+
+import asyncio
+from datetime import date, datetime
+from typing import Sequence
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import Database
+from app.weights.model import GROWTH_PERCENTILES
+from app.weights.repository import WeightRecordRepository
+
+
+def age_in_months(birthday: date, at: datetime) -> int:
+    """满月龄（与 SQL 中 age() 的年、月部分一致）"""
+    measured = at.date()
+    months = (measured.year - birthday.year) * 12 + measured.month - birthday.month
+    if measured.day < birthday.day:
+        months -= 1
+    return months
+
+
+def place(percentiles_g: Sequence[float], weight_g: float) -> tuple[float | None, str]:
+    """体重在百分位曲线上的位置：(插值得到的百分位, 所在区间)
+
+    超出 P5–P95 范围时百分位为 None，区间为 "<P5" 或 ">P95"。
+    """
+    if weight_g < percentiles_g[0]:
+        return None, f"<P{GROWTH_PERCENTILES[0]}"
+    if weight_g > percentiles_g[-1]:
+        return None, f">P{GROWTH_PERCENTILES[-1]}"
+
+    for i in range(1, len(GROWTH_PERCENTILES)):
+        lo_g, hi_g = percentiles_g[i - 1], percentiles_g[i]
+        if weight_g <= hi_g:
+            lo_p, hi_p = GROWTH_PERCENTILES[i - 1], GROWTH_PERCENTILES[i]
+            # 相邻节点体重相同（样本集中）时取区间中点
+            ratio = (weight_g - lo_g) / (hi_g - lo_g) if hi_g > lo_g else 0.5
+            return round(lo_p + ratio * (hi_p - lo_p), 1), f"P{lo_p}–P{hi_p}"
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+async def refresh_growth_percentiles_forever(database: Database) -> None:
+    """后台定期重算品种生长百分位表"""
+    while True:
+        try:
+            async with database.session_factory() as session:
+                count = await WeightRecordRepository(
+                    session
+                ).refresh_growth_percentiles()
+            logger.info(f"品种生长百分位表已重算: {count} 组")
+        except Exception as e:
+            logger.error(f"品种生长百分位表重算失败: {str(e)}")
+        await asyncio.sleep(settings.growth_percentile_refresh_interval_seconds)
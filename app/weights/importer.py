@@ -0,0 +1,121 @@
+"""体重批量导入：流式解析 CSV / NDJSON 并逐行校验
+
+请求体按网络数据块增量切分为行，不会整体读入内存；每行校验后产出
+(行号, 校验通过的读数) 或 (行号, 错误信息)，由服务层按块写入数据库。
+"""
+
+import csv
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+
+from app.weights.schema import WeightRecordImportRow
+
+CSV_COLUMNS = ("profile_id", "weight_g", "measured_at")
+# 导出文件附带的可选列；空字段（数据库 NULL）按未提供处理
+OPTIONAL_CSV_COLUMNS = ("is_anomaly", "sample_count", "min_weight_g", "max_weight_g")
+
+# (行号, profile_id, weight_g, measured_at, is_anomaly, sample_count,
+#  min_weight_g, max_weight_g)
+ImportRecord = tuple[int, int, int, datetime, bool, int, int | None, int | None]
+ImportResult = tuple[int, ImportRecord | None, str | None]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[str]]:
+    """将字节流切分为完整的文本行，每个网络数据块产出一批"""
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        if complete:
+            lines = [
+                line.decode("utf-8-sig" if first and i == 0 else "utf-8")
+                for i, line in enumerate(complete)
+            ]
+            first = False
+            yield lines
+    if buffer:
+        yield [buffer.decode("utf-8-sig" if first else "utf-8")]
+
+
+async def iter_import_rows(
+    chunks: AsyncIterator[bytes],
+    *,
+    fmt: str,
+) -> AsyncIterator[ImportResult]:
+    """逐行解析并校验；fmt 为 csv（首行为表头）或 ndjson（每行一个 JSON 对象）"""
+    line_no = 0
+    header: list[str] | None = None
+    async for lines in iter_lines(chunks):
+        if fmt == "csv":
+            parsed = csv.reader(line.rstrip("\r") for line in lines)
+        else:
+            parsed = iter(lines)
+
+        for raw in parsed:
+            line_no += 1
+            if fmt == "csv":
+                if not raw or not any(field.strip() for field in raw):
+                    continue
+                if header is None:
+                    header = [field.strip() for field in raw]
+                    missing = [c for c in CSV_COLUMNS if c not in header]
+                    if missing:
+                        yield line_no, None, f"missing columns: {', '.join(missing)}"
+                        return
+                    continue
+                if len(raw) != len(header):
+                    yield (
+                        line_no,
+                        None,
+                        f"expected {len(header)} fields, got {len(raw)}",
+                    )
+                    continue
+                data = {
+                    key: value
+                    for key, value in zip(header, raw)
+                    if value or key not in OPTIONAL_CSV_COLUMNS
+                }
+            else:
+                if not raw.strip():
+                    continue
+                try:
+                    data = json.loads(raw)
+                except json.JSONDecodeError as e:
+                    yield line_no, None, f"invalid JSON: {e.msg}"
+                    continue
+                if not isinstance(data, dict):
+                    yield line_no, None, "expected a JSON object"
+                    continue
+
+            yield _validate(line_no, data)
+
+
+def _validate(line_no: int, data: dict) -> ImportResult:
+    try:
+        row = WeightRecordImportRow.model_validate(data)
+    except ValidationError as e:
+        message = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in e.errors()
+        )
+        return line_no, None, message
+
+    measured_at = row.measured_at
+    if measured_at.tzinfo is None:
+        # 未带时区的时间按 UTC 处理，与数据库 timestamptz 一致
+        measured_at = measured_at.replace(tzinfo=timezone.utc)
+    record = (
+        line_no,
+        row.profile_id,
+        row.weight_g,
+        measured_at,
+        row.is_anomaly,
+        row.sample_count,
+        row.min_weight_g,
+        row.max_weight_g,
+    )
+    return line_no, record, None
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timezone
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.nutrition.cache import plan_cache
+from app.nutrition.replanner import nutrition_replanner
+from app.weights.repository import WeightRecordRepository
+from app.weights.schema import WeightIngestResponse
+
+_Reading = tuple[int, int, datetime]
+
+
+class WeightIngestBuffer:
+    """体重读数微批写入缓冲区
+
+    并发请求提交的读数先进入进程内缓冲区，攒满 max_batch 条或等待 max_delay_s 后
+    由一个事务批量写入（WeightRecordRepository.create_many），事务提交后各请求才收到确认。
+    写入使用独立会话，不占用请求会话；多个批次可以并发写入，受连接池大小约束。
+    """
+
+    def __init__(
+        self,
+        *,
+        max_batch: int,
+        max_delay_s: float,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ) -> None:
+        self.max_batch = max_batch
+        self.max_delay_s = max_delay_s
+        self.session_factory = session_factory
+        self._pending: list[tuple[_Reading, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        profile_id: int,
+        weight_g: int,
+        measured_at: datetime | None,
+    ) -> WeightIngestResponse:
+        if measured_at is None:
+            measured_at = datetime.now(tz=timezone.utc)
+        elif measured_at.tzinfo is None:
+            measured_at = measured_at.replace(tzinfo=timezone.utc)
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append(((profile_id, weight_g, measured_at), future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay_s, self._flush)
+
+        # 请求被取消（客户端断开）不影响批次写入
+        return await asyncio.shield(future)
+
+    async def drain(self) -> None:
+        """写入缓冲区中剩余的读数并等待所有批次完成（应用关闭时调用）"""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _write(self, batch: list[tuple[_Reading, asyncio.Future]]) -> None:
+        readings = [reading for reading, _ in batch]
+        try:
+            session_factory = self.session_factory or _default_session_factory()
+            async with session_factory() as session:
+                records, missing = await WeightRecordRepository(session).create_many(
+                    readings
+                )
+        except Exception as e:
+            if len(batch) > 1:
+                # 批次中混入了无法写入的读数：逐条重试，只让出错的那条失败，
+                # 不连累同批其它请求
+                logger.warning(
+                    f"体重微批写入失败（{len(batch)} 条），改为逐条写入: {str(e)}"
+                )
+                for item in batch:
+                    await self._write([item])
+                return
+            logger.error(f"体重读数写入失败: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for ((profile_id, _, measured_at), future), record in zip(batch, records):
+            if future.done():
+                continue
+            if record is None:
+                future.set_result(
+                    WeightIngestResponse(
+                        profile_id=profile_id,
+                        measured_at=measured_at,
+                        status="profile_not_found"
+                        if profile_id in missing
+                        else "duplicate",
+                    )
+                )
+            else:
+                future.set_result(
+                    WeightIngestResponse(
+                        id=record.id,
+                        profile_id=profile_id,
+                        measured_at=record.measured_at,
+                        is_anomaly=record.is_anomaly,
+                        status="created",
+                    )
+                )
+
+        for profile_id in {record.profile_id for record in records if record}:
+            plan_cache.invalidate_profile(profile_id)
+        nutrition_replanner.notify()
+
+
+def _default_session_factory() -> async_sessionmaker[AsyncSession]:
+    from app.core.database import db
+
+    return db.session_factory
+
+
+# 单例，供 POST /weights/ingest 使用，lifespan 关闭时 drain()
+weight_ingest_buffer = WeightIngestBuffer(
+    max_batch=settings.weight_ingest_max_batch,
+    max_delay_s=settings.weight_ingest_max_delay_ms / 1000,
+)
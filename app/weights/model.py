@@ -1,7 +1,9 @@
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Optional
 
-from sqlmodel import Field, Index, Relationship, SQLModel, desc
+import sqlalchemy.dialects.postgresql as pg
+from sqlalchemy import Float, ForeignKey, Integer
+from sqlmodel import Column, Field, Index, Relationship, SQLModel
 
 from app.core.base_model import DateTimeMixin
 
@@ -12,22 +14,119 @@ if TYPE_CHECKING:
 class WeightRecord(DateTimeMixin, SQLModel, table=True):
     __tablename__ = "weight_records"  # type: ignore[assignment]
     __table_args__ = (
-        # 复合索引
+        # 复合唯一索引（前缀同时覆盖按 profile_id 的查询，无需单列索引）；
+        # 同一宠物同一时刻只保留一条读数，批量导入据此去重覆盖
         Index(
             "idx_weight_records_get_by_profile_id",
             "profile_id",
             "measured_at",
+            unique=True,
         ),  # weights/repository.py: get_weight_records_by_profile_id
-        # 排序索引
-        Index("idx_weight_records_measured_at_desc", desc("measured_at")),
+        # 大范围按时间顺序扫描：BRIN 体积极小，适合按时间追加写入的数据
+        Index(
+            "idx_weight_records_measured_at_brin",
+            "measured_at",
+            postgresql_using="brin",
+        ),
+        # 按 measured_at 月度范围分区，分区由 app/weights/partitions.py 维护
+        {"postgresql_partition_by": "RANGE (measured_at)"},
     )
 
-    id: int | None = Field(default=None, primary_key=True)  # type: ignore[assignment]
-    profile_id: int = Field(foreign_key="profiles.id", nullable=False, index=True)
+    # 分区表的主键必须包含分区键
+    id: int | None = Field(
+        default=None,
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+    )  # type: ignore[assignment]
+    profile_id: int = Field(foreign_key="profiles.id", nullable=False)
     weight_g: int = Field(..., description="体重 (克)")
-    measured_at: datetime = Field(default_factory=lambda: datetime.now(tz=timezone.utc))
+    is_anomaly: bool = Field(
+        default=False,
+        sa_column_kwargs={"server_default": "false"},
+        description="是否被判定为异常读数（写入时检测，可手动修正）",
+    )
+    # 日汇总行（由 app/weights/compaction.py 压缩旧读数生成）：weight_g 为当日均值，
+    # measured_at 为当日最后一次测量时间；原始读数 sample_count=1、极值为空
+    sample_count: int = Field(
+        default=1,
+        sa_column_kwargs={"server_default": "1"},
+        description="该行代表的读数数量",
+    )
+    min_weight_g: int | None = Field(default=None, description="当日最小体重 (克)")
+    max_weight_g: int | None = Field(default=None, description="当日最大体重 (克)")
+    measured_at: datetime = Field(
+        default_factory=lambda: datetime.now(tz=timezone.utc),
+        primary_key=True,
+        sa_type=pg.TIMESTAMP(timezone=True),  # type: ignore[arg-type]
+        description="测量时间",
+    )
 
     profile: Optional["Profile"] = Relationship(back_populates="weight_records")
 
     def __repr__(self) -> str:  # pragma: no cover - simple representation
         return f"<WeightRecord(id={self.id}, profile_id={self.profile_id}, weight_g={self.weight_g})>"
+
+
+class ProfileWeightSummary(DateTimeMixin, SQLModel, table=True):
+    """每个宠物的体重汇总（读模型），与 weight_records 的写入在同一事务内维护"""
+
+    __tablename__ = "profile_weight_summary"  # type: ignore[assignment]
+
+    profile_id: int = Field(
+        sa_column=Column(
+            ForeignKey("profiles.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        description="宠物ID",
+    )
+    latest_weight_g: int = Field(..., description="最新体重 (克)")
+    latest_measured_at: datetime = Field(
+        ...,
+        sa_type=pg.TIMESTAMP(timezone=True),  # type: ignore[arg-type]
+        description="最新测量时间",
+    )
+    min_weight_g: int = Field(..., description="最小体重 (克)")
+    max_weight_g: int = Field(..., description="最大体重 (克)")
+    record_count: int = Field(..., description="记录数")
+    mean_weight_g: float = Field(..., description="平均体重 (克)")
+    # 时间衰减加权回归的累加量（以 latest_measured_at 为锚点，见 app/weights/trend.py）
+    trend_s0: float = Field(default=0.0, description="趋势累加量 Σw")
+    trend_s1: float = Field(default=0.0, description="趋势累加量 Σw·x")
+    trend_s2: float = Field(default=0.0, description="趋势累加量 Σw·x²")
+    trend_sy: float = Field(default=0.0, description="趋势累加量 Σw·y")
+    trend_sxy: float = Field(default=0.0, description="趋势累加量 Σw·x·y")
+    # 最近的读数（新到旧，含被标记的异常读数），用于异常检测，见 app/weights/anomaly.py
+    recent_weights_g: list[int] = Field(
+        default_factory=list,
+        sa_column=Column(pg.ARRAY(Integer), nullable=False, server_default="{}"),
+        description="最近读数窗口 (克)",
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover - simple representation
+        return f"<ProfileWeightSummary(profile_id={self.profile_id}, latest_weight_g={self.latest_weight_g})>"
+
+
+# breed_growth_percentiles.percentiles_g 各元素对应的百分位（P5–P95）
+GROWTH_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+class BreedGrowthPercentile(SQLModel, table=True):
+    """按品种、月龄预计算的体重百分位表（后台任务定期整体重算）"""
+
+    __tablename__ = "breed_growth_percentiles"  # type: ignore[assignment]
+
+    variety: str = Field(..., primary_key=True, max_length=100, description="品种")
+    age_month: int = Field(..., primary_key=True, description="月龄")
+    sample_count: int = Field(..., description="参与统计的宠物数")
+    percentiles_g: list[float] = Field(
+        sa_column=Column(pg.ARRAY(Float), nullable=False),
+        description="体重百分位 (克)，与 GROWTH_PERCENTILES 一一对应",
+    )
+    computed_at: datetime = Field(
+        default_factory=lambda: datetime.now(tz=timezone.utc),
+        sa_type=pg.TIMESTAMP(timezone=True),  # type: ignore[arg-type]
+        description="计算时间",
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover - simple representation
+        return f"<BreedGrowthPercentile(variety={self.variety}, age_month={self.age_month})>"
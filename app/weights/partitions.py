@@ -0,0 +1,174 @@
+"""weight_records 月度分区维护
+
+weight_records 按 measured_at 做 RANGE 分区：每个自然月（UTC）一个分区，
+另有 DEFAULT 分区兜底接收尚未创建分区的时间（例如补录的单条历史读数）。
+建表后（metadata.create_all）立即创建当月及之后若干个月的分区；
+批量导入前为导入数据覆盖的月份建好分区，历史数据直接落入各自的月度分区；
+应用运行期间由后台任务定期提前创建后续分区，并把 DEFAULT 中积累的月份迁出到独立分区。
+"""
+
+import asyncio
+from datetime import date, datetime, timezone
+from typing import Iterable
+
+from loguru import logger
+from sqlalchemy import Connection, event, text
+
+from app.core.config import settings
+from app.core.database import Database
+from app.weights.model import WeightRecord
+
+TABLE_NAME = WeightRecord.__tablename__
+DEFAULT_NAME = f"{TABLE_NAME}_default"
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE_NAME}_p{month.year:04d}_{month.month:02d}"
+
+
+def month_starts(start: date, count: int) -> list[date]:
+    """从 start 所在月起连续 count 个月的月初日期"""
+    year, month = start.year, start.month
+    months = []
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def month_of(measured_at: datetime) -> date:
+    """测量时间所在的 UTC 自然月（无时区的时间按 UTC 处理）"""
+    if measured_at.tzinfo is not None:
+        measured_at = measured_at.astimezone(timezone.utc)
+    return date(measured_at.year, measured_at.month, 1)
+
+
+def ensure_partitions(
+    conn: Connection,
+    *,
+    months_ahead: int | None = None,
+    today: date | None = None,
+    months: Iterable[date] = (),
+    adopt_default: bool = True,
+) -> list[str]:
+    """创建 DEFAULT 分区、当月起 months_ahead 个月及 months 中各月的分区，返回新建的分区名
+
+    adopt_default 为 True 时（后台维护），DEFAULT 中已有数据的月份也会建立独立分区。
+    DEFAULT 中已有某月数据时 PostgreSQL 拒绝直接创建该月分区，此时在同一事务中
+    先 DETACH DEFAULT、建分区、把该月的行迁入新分区，再重新 ATTACH DEFAULT，
+    之后该月的查询不再扫描 DEFAULT，也不会在每次维护时重复失败。
+    """
+    if months_ahead is None:
+        months_ahead = settings.weight_partition_months_ahead
+    today = today or datetime.now(tz=timezone.utc).date()
+
+    # 多个 worker 同时维护时串行执行（事务级咨询锁，提交/回滚时释放）
+    conn.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:table))"), {"table": TABLE_NAME}
+    )
+    existing = set(
+        conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table"
+            ),
+            {"table": TABLE_NAME},
+        ).scalars()
+    )
+
+    created: list[str] = []
+    if DEFAULT_NAME not in existing:
+        conn.execute(
+            text(f"CREATE TABLE {DEFAULT_NAME} PARTITION OF {TABLE_NAME} DEFAULT")
+        )
+        created.append(DEFAULT_NAME)
+        existing.add(DEFAULT_NAME)
+
+    wanted = set(month_starts(today, months_ahead + 1))
+    wanted.update(date(month.year, month.month, 1) for month in months)
+    if adopt_default:
+        wanted.update(
+            conn.execute(
+                text(
+                    "SELECT DISTINCT date_trunc('month', measured_at, 'UTC')::date "
+                    f"FROM {DEFAULT_NAME}"
+                )
+            ).scalars()
+        )
+    missing = sorted(month for month in wanted if partition_name(month) not in existing)
+    if not missing:
+        return created
+
+    # DEFAULT 中已有数据的月份（按 measured_at 索引判断是否存在，不扫描整个 DEFAULT）
+    crowded = [
+        month
+        for month in missing
+        if conn.execute(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_NAME} "
+                "WHERE measured_at >= :lower AND measured_at < :upper)"
+            ),
+            _bounds(month),
+        ).scalar_one()
+    ]
+    if crowded:
+        conn.execute(text(f"ALTER TABLE {TABLE_NAME} DETACH PARTITION {DEFAULT_NAME}"))
+
+    for month in missing:
+        name = partition_name(month)
+        lower, upper = _bounds(month).values()
+        conn.execute(
+            text(
+                f"CREATE TABLE {name} PARTITION OF {TABLE_NAME} "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+        )
+        created.append(name)
+
+    if crowded:
+        for month in crowded:
+            moved = conn.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_NAME} "
+                    "WHERE measured_at >= :lower AND measured_at < :upper RETURNING *) "
+                    f"INSERT INTO {partition_name(month)} SELECT * FROM moved"
+                ),
+                _bounds(month),
+            )
+            logger.info(
+                f"已将 {moved.rowcount} 条记录从 {DEFAULT_NAME} 迁入 {partition_name(month)}"
+            )
+        # ATTACH 会校验 DEFAULT 中没有属于其它分区的行（迁出后只剩少量未分区数据）
+        conn.execute(
+            text(f"ALTER TABLE {TABLE_NAME} ATTACH PARTITION {DEFAULT_NAME} DEFAULT")
+        )
+
+    return created
+
+
+def _bounds(month: date) -> dict[str, datetime]:
+    upper = month_starts(month, 2)[1]
+    return {
+        "lower": datetime(month.year, month.month, 1, tzinfo=timezone.utc),
+        "upper": datetime(upper.year, upper.month, 1, tzinfo=timezone.utc),
+    }
+
+
+@event.listens_for(WeightRecord.__table__, "after_create")
+def _create_initial_partitions(target, connection: Connection, **kw) -> None:
+    ensure_partitions(connection)
+
+
+async def maintain_partitions_forever(database: Database) -> None:
+    """后台定期提前创建后续月份的分区，并把 DEFAULT 中已有数据的月份迁出到独立分区"""
+    while True:
+        try:
+            async with database.engine.begin() as conn:
+                created = await conn.run_sync(ensure_partitions)
+            if created:
+                logger.info(f"已创建 weight_records 分区: {', '.join(created)}")
+        except Exception as e:
+            logger.error(f"weight_records 分区维护失败: {str(e)}")
+        await asyncio.sleep(settings.weight_partition_maintenance_interval_seconds)
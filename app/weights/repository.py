@@ -1,10 +1,35 @@
-from typing import Any, Mapping
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable, Mapping, Sequence
 
+from sqlalchemy import Float, Row, cast, delete, exists, func, literal_column, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import asc, col, desc, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.weights.model import WeightRecord
+from app.core.config import settings
+from app.profiles.model import Profile
+from app.weights import anomaly, partitions, trend
+from app.weights.importer import ImportRecord
+from app.weights.model import (
+    GROWTH_PERCENTILES,
+    BreedGrowthPercentile,
+    ProfileWeightSummary,
+    WeightRecord,
+)
+
+# 单条读数 (weight_g, measured_at, is_anomaly)
+Reading = tuple[int, datetime, bool]
+
+# 批量导入使用的临时表（每个事务创建，提交时删除）
+_IMPORT_STAGING_TABLE = "weight_import_staging"
+
+# 曲线降采样时服务端游标每次拉取的行数
+_SERIES_FETCH_SIZE = 1_000
+
+# 导出时 COPY 输出与 HTTP 发送之间缓冲的数据块数量（背压：队列满时 COPY 暂停读取）
+_EXPORT_QUEUE_SIZE = 16
 
 
 class WeightRecordRepository:
@@ -13,8 +38,21 @@ class WeightRecordRepository:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def get_by_id(self, record_id: int) -> WeightRecord | None:
-        return await self.session.get(WeightRecord, record_id)
+    async def get_by_id(
+        self,
+        record_id: int,
+        measured_at: datetime | None = None,
+    ) -> WeightRecord | None:
+        """按 ID 获取记录
+
+        分区表主键为 (id, measured_at)：只给 id 时需探查每个分区的主键索引，
+        同时给出 measured_at 时分区裁剪后只查询一个分区。
+        """
+        statement = select(WeightRecord).where(col(WeightRecord.id) == record_id)
+        if measured_at is not None:
+            statement = statement.where(col(WeightRecord.measured_at) == measured_at)
+        result = await self.session.exec(statement)
+        return result.one_or_none()
 
     async def get_by_profile_id(
         self,
@@ -63,10 +101,275 @@ class WeightRecordRepository:
         offset = max(offset, 0)
         return list(await self.session.exec(query.offset(offset).limit(limit)))
 
+    async def get_buckets(
+        self,
+        profile_id: int,
+        *,
+        interval: str,
+        tz: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[Row]:
+        """按 day/week/month 时间桶聚合指定宠物的体重（min/max/avg/last/count）
+
+        范围条件走 idx_weight_records_get_by_profile_id，分桶与聚合全部在数据库完成。
+        interval 由调用方校验为白名单值，以字面量内联，保证 SELECT 与 GROUP BY 表达式一致。
+        日汇总行按其代表的读数数量加权，极值取其记录的当日极值。
+        """
+        bucket = func.date_trunc(
+            literal_column(f"'{interval}'"), WeightRecord.measured_at, tz
+        )
+        conditions = [col(WeightRecord.profile_id) == profile_id]
+        if start is not None:
+            conditions.append(col(WeightRecord.measured_at) >= start)
+        if end is not None:
+            conditions.append(col(WeightRecord.measured_at) < end)
+
+        inner = (
+            select(
+                bucket.label("bucket_start"),
+                col(WeightRecord.weight_g).label("weight_g"),
+                col(WeightRecord.measured_at).label("measured_at"),
+                col(WeightRecord.sample_count).label("sample_count"),
+                *self._extremes(),
+            )
+            .where(*conditions)
+            .subquery()
+        )
+        last_g = func.array_agg(
+            aggregate_order_by(inner.c.weight_g, inner.c.measured_at.desc())
+        )[1]
+        statement = (
+            select(
+                inner.c.bucket_start,
+                func.sum(inner.c.sample_count).label("count"),
+                func.min(inner.c.low_g).label("min_g"),
+                func.max(inner.c.high_g).label("max_g"),
+                (
+                    func.sum(inner.c.weight_g * inner.c.sample_count)
+                    / cast(func.sum(inner.c.sample_count), Float)
+                ).label("avg_g"),
+                last_g.label("last_g"),
+            )
+            .group_by(inner.c.bucket_start)
+            .order_by(inner.c.bucket_start)
+        )
+        result = await self.session.exec(statement)
+        return list(result.all())
+
+    async def count_series(
+        self,
+        profile_id: int,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> int:
+        statement = select(func.count()).where(
+            *self._series_conditions(profile_id, start=start, end=end)
+        )
+        return (await self.session.exec(statement)).one()
+
+    async def stream_series(
+        self,
+        profile_id: int,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> AsyncIterator[tuple[datetime, int]]:
+        """按时间升序流式读取 (measured_at, weight_g)，使用服务端游标分批拉取"""
+        statement = (
+            select(WeightRecord.measured_at, WeightRecord.weight_g)
+            .where(*self._series_conditions(profile_id, start=start, end=end))
+            .order_by(col(WeightRecord.measured_at))
+            .execution_options(yield_per=_SERIES_FETCH_SIZE)
+        )
+        result = await self.session.stream(statement)
+        try:
+            async for measured_at, weight_g in result:
+                yield measured_at, weight_g
+        finally:
+            await result.close()
+
+    @staticmethod
+    def _series_conditions(
+        profile_id: int,
+        *,
+        start: datetime | None,
+        end: datetime | None,
+    ) -> list:
+        conditions = [col(WeightRecord.profile_id) == profile_id]
+        if start is not None:
+            conditions.append(col(WeightRecord.measured_at) >= start)
+        if end is not None:
+            conditions.append(col(WeightRecord.measured_at) < end)
+        return conditions
+
+    async def stream_csv(
+        self,
+        *,
+        profile_id: int | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> AsyncIterator[bytes]:
+        """以 COPY (SELECT ...) TO STDOUT 导出 CSV，逐块产出原始字节
+
+        直接使用 asyncpg 连接执行 COPY，不经过 ORM；COPY 输出经有界队列转交给调用方，
+        发送慢于读取时 COPY 被阻塞，内存占用与导出规模无关。
+        """
+        conditions: list[str] = []
+        args: list[Any] = []
+        for condition, value in (
+            ("profile_id = ${}", profile_id),
+            ("measured_at >= ${}", start),
+            ("measured_at < ${}", end),
+        ):
+            if value is not None:
+                args.append(value)
+                conditions.append(condition.format(len(args)))
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        query = (
+            # 时间输出为 ISO 8601（UTC），日汇总行带上条数与极值，导出文件可原样导回
+            "SELECT id, profile_id, weight_g, "
+            "to_char(measured_at AT TIME ZONE 'UTC', "
+            '\'YYYY-MM-DD"T"HH24:MI:SS.US"Z"\') AS measured_at, '
+            "is_anomaly, sample_count, min_weight_g, max_weight_g "
+            f"FROM {WeightRecord.__tablename__} {where}"
+            "ORDER BY profile_id, measured_at"
+        )
+
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        assert driver_connection is not None
+
+        queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=_EXPORT_QUEUE_SIZE)
+
+        async def put(chunk: bytes | bytearray) -> None:
+            # asyncpg 传入的是 bytearray，转为不可变 bytes 交给响应
+            await queue.put(bytes(chunk))
+
+        async def produce() -> None:
+            try:
+                await driver_connection.copy_from_query(
+                    query, *args, output=put, format="csv", header=True
+                )
+            finally:
+                await queue.put(None)
+
+        task = asyncio.create_task(produce())
+        try:
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+            await task  # 传播 COPY 过程中的异常
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    async def get_summary(self, profile_id: int) -> ProfileWeightSummary | None:
+        """按主键读取体重汇总（最新/最小/最大/记录数/均值）"""
+        return await self.session.get(
+            ProfileWeightSummary, profile_id, populate_existing=True
+        )
+
+    async def get_profile_with_summary(
+        self,
+        profile_id: int,
+    ) -> tuple[Profile, ProfileWeightSummary | None] | None:
+        statement = (
+            select(Profile, ProfileWeightSummary)
+            .outerjoin(
+                ProfileWeightSummary,
+                col(ProfileWeightSummary.profile_id) == col(Profile.id),
+            )
+            .where(col(Profile.id) == profile_id)
+        )
+        row = (await self.session.exec(statement)).one_or_none()
+        return None if row is None else (row[0], row[1])
+
+    async def get_growth_percentile(
+        self,
+        variety: str,
+        age_month: int,
+    ) -> BreedGrowthPercentile | None:
+        return await self.session.get(
+            BreedGrowthPercentile, (variety, age_month), populate_existing=True
+        )
+
+    async def get_growth_curve(self, variety: str) -> list[BreedGrowthPercentile]:
+        statement = (
+            select(BreedGrowthPercentile)
+            .where(col(BreedGrowthPercentile.variety) == variety)
+            .order_by(col(BreedGrowthPercentile.age_month))
+        )
+        return list((await self.session.exec(statement)).all())
+
+    async def refresh_growth_percentiles(self) -> int:
+        """重算品种生长百分位表并提交，返回（品种, 月龄）组数
+
+        每个宠物每个月龄先取当月读数均值（日汇总行按读数数量加权，
+        避免测量频繁的宠物占比过大），
+        再用 percentile_cont(数组) 在一次排序中算出全部百分位；排除异常读数。
+        在同一事务内整体替换，读取方始终看到完整的旧表或新表。
+        """
+        await self.session.exec(delete(BreedGrowthPercentile))
+        result = await self.session.exec(
+            text(
+                "WITH monthly AS ("
+                "SELECT p.variety, w.profile_id, "
+                "(12 * date_part('year', age(w.measured_at::date, p.birthday)) "
+                "+ date_part('month', age(w.measured_at::date, p.birthday)))::int "
+                "AS age_month, "
+                "sum(w.weight_g * w.sample_count)::float8 / sum(w.sample_count) "
+                "AS weight_g "
+                f"FROM {WeightRecord.__tablename__} w "
+                "JOIN profiles p ON p.id = w.profile_id "
+                "WHERE p.birthday IS NOT NULL AND NOT w.is_anomaly "
+                "AND w.measured_at::date >= p.birthday "
+                "GROUP BY 1, 2, 3) "
+                f"INSERT INTO {BreedGrowthPercentile.__tablename__} "
+                "(variety, age_month, sample_count, percentiles_g, computed_at) "
+                "SELECT variety, age_month, count(*), "
+                "percentile_cont(CAST(:fractions AS float8[])) "
+                "WITHIN GROUP (ORDER BY weight_g), now() "
+                "FROM monthly WHERE age_month <= :max_age_month "
+                "GROUP BY variety, age_month HAVING count(*) >= :min_samples"
+            ),
+            params={
+                "fractions": [p / 100 for p in GROWTH_PERCENTILES],
+                "max_age_month": settings.growth_percentile_max_age_months,
+                "min_samples": settings.growth_percentile_min_samples,
+            },
+        )
+        await self.session.commit()
+        return result.rowcount
+
     async def create(self, data: Mapping[str, Any]) -> WeightRecord:
+        """写入一条读数，并在同一事务内完成异常检测与汇总更新
+
+        先锁定汇总行：异常检测所需的最近读数窗口就在该行上，不增加额外查询。
+        """
         record = WeightRecord(**data)
+        summary = await self._lock_summary(record.profile_id)
+        if summary is not None:
+            record.is_anomaly = anomaly.is_outlier(
+                summary.recent_weights_g,
+                record.weight_g,
+                threshold=settings.weight_anomaly_threshold,
+                min_samples=settings.weight_anomaly_min_samples,
+            )
         self.session.add(record)
         try:
+            await self.session.flush()
+            if self._counted(record.is_anomaly):
+                await self._summary_add(
+                    record.profile_id, self._reading_of(record), summary=summary
+                )
+            elif summary is not None:
+                self._push_window(summary, record.weight_g, record.measured_at)
             await self.session.commit()
         except IntegrityError:
             await self.session.rollback()
@@ -74,26 +377,667 @@ class WeightRecordRepository:
         await self.session.refresh(record)
         return record
 
+    async def create_many(
+        self,
+        readings: Sequence[tuple[int, int, datetime]],
+    ) -> tuple[list[WeightRecord | None], set[int]]:
+        """批量写入 (profile_id, weight_g, measured_at) 并提交（微批写入使用）
+
+        一次锁定涉及宠物的汇总行（按 profile_id 排序，避免并发批次死锁），在内存中完成
+        异常检测，再用一条 INSERT ... SELECT FROM unnest(...) ON CONFLICT DO NOTHING 写入，
+        语句数量与批次大小无关。
+        返回 (与输入对齐的新记录，重复读数为 None；不存在的 profile_id)。
+        """
+        profile_ids = sorted({profile_id for profile_id, _, _ in readings})
+        existing = set(
+            (
+                await self.session.exec(
+                    select(Profile.id).where(col(Profile.id).in_(profile_ids))
+                )
+            ).all()
+        )
+        summaries = {
+            summary.profile_id: summary
+            for summary in (
+                await self.session.exec(
+                    select(ProfileWeightSummary)
+                    .where(col(ProfileWeightSummary.profile_id).in_(existing))
+                    .order_by(col(ProfileWeightSummary.profile_id))
+                    .with_for_update()
+                    .execution_options(populate_existing=True)
+                )
+            ).all()
+        }
+
+        # 按宠物、时间顺序模拟窗口推进，得到每条读数的异常标记
+        order = sorted(
+            (i for i, reading in enumerate(readings) if reading[0] in existing),
+            key=lambda i: (readings[i][0], readings[i][2]),
+        )
+        flags: dict[int, bool] = {}
+        windows: dict[int, tuple[list[int], datetime | None]] = {
+            profile_id: (summary.recent_weights_g, summary.latest_measured_at)
+            for profile_id, summary in summaries.items()
+        }
+        for i in order:
+            profile_id, weight_g, measured_at = readings[i]
+            window, latest_at = windows.get(profile_id, ([], None))
+            flags[i] = anomaly.is_outlier(
+                window,
+                weight_g,
+                threshold=settings.weight_anomaly_threshold,
+                min_samples=settings.weight_anomaly_min_samples,
+            )
+            if latest_at is None or measured_at >= latest_at:
+                window = anomaly.push(
+                    window, weight_g, size=settings.weight_anomaly_window
+                )
+                latest_at = measured_at
+            windows[profile_id] = (window, latest_at)
+
+        result = await self.session.exec(
+            text(
+                f"INSERT INTO {WeightRecord.__tablename__} "
+                "(profile_id, weight_g, measured_at, is_anomaly) "
+                "SELECT r.* FROM unnest(CAST(:profile_ids AS integer[]), "
+                "CAST(:weights AS integer[]), CAST(:measured_ats AS timestamptz[]), "
+                "CAST(:anomalies AS boolean[])) "
+                "AS r(profile_id, weight_g, measured_at, is_anomaly) "
+                # 查询之后被删除的宠物在语句内过滤，不让整批因外键失败
+                "WHERE EXISTS (SELECT 1 FROM profiles p WHERE p.id = r.profile_id) "
+                "ON CONFLICT (profile_id, measured_at) DO NOTHING "
+                "RETURNING id, profile_id, weight_g, measured_at, is_anomaly, "
+                "created_at, updated_at"
+            ),
+            params={
+                "profile_ids": [readings[i][0] for i in order],
+                "weights": [readings[i][1] for i in order],
+                "measured_ats": [readings[i][2] for i in order],
+                "anomalies": [flags[i] for i in order],
+            },
+        )
+        inserted = {
+            (row.profile_id, row.measured_at): WeightRecord(**row._mapping)
+            for row in result
+        }
+
+        records: list[WeightRecord | None] = [None] * len(readings)
+        for i in order:
+            record = inserted.pop((readings[i][0], readings[i][2]), None)
+            if record is None:
+                continue
+            records[i] = record
+            summary = summaries.get(record.profile_id)
+            if not self._counted(record.is_anomaly):
+                if summary is not None:
+                    self._push_window(summary, record.weight_g, record.measured_at)
+                continue
+            if summary is None:
+                # 尚无汇总行：走单条写入的路径创建，与并发批次的创建互斥
+                await self._summary_add(
+                    record.profile_id, self._reading_of(record), summary=None
+                )
+            else:
+                self._apply_reading(summary, self._reading_of(record))
+        await self.session.flush()
+        await self.session.commit()
+
+        return records, set(profile_ids) - existing
+
     async def update(
         self,
         record_id: int,
         data: Mapping[str, Any],
+        measured_at: datetime | None = None,
     ) -> WeightRecord | None:
-        record = await self.get_by_id(record_id)
+        record = await self.get_by_id(record_id, measured_at)
         if not record:
             return None
 
+        removed = self._reading_of(record)
         for key, value in data.items():
             setattr(record, key, value)
-        await self.session.commit()
+        try:
+            await self.session.flush()
+            if record.sample_count > 1:
+                await self._summary_rebuild(record.profile_id)
+            else:
+                await self._summary_replace(
+                    record.profile_id,
+                    removed=removed,
+                    added=self._reading_of(record),
+                )
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise
         await self.session.refresh(record)
         return record
 
-    async def delete(self, record_id: int) -> bool:
-        record = await self.get_by_id(record_id)
+    async def delete(self, record_id: int, measured_at: datetime | None = None) -> bool:
+        record = await self.get_by_id(record_id, measured_at)
         if not record:
             return False
 
+        profile_id, removed = record.profile_id, self._reading_of(record)
+        is_rollup = record.sample_count > 1
         await self.session.delete(record)
+        await self.session.flush()
+        if is_rollup:
+            await self._summary_rebuild(profile_id)
+        else:
+            await self._summary_replace(profile_id, removed=removed, added=None)
         await self.session.commit()
         return True
+
+    async def ensure_partitions_for(
+        self, measured_ats: Iterable[datetime]
+    ) -> list[str]:
+        """为这些测量时间所在的月份建好分区并提交，返回新建的分区名
+
+        导入的历史数据因此直接写入各自的月度分区，而不是堆积在 DEFAULT 中；
+        建分区的 DDL 在单独的短事务中完成，不与后续写入共用锁。
+        """
+        months = {partitions.month_of(measured_at) for measured_at in measured_ats}
+        connection = await self.session.connection()
+        created = await connection.run_sync(
+            lambda conn: partitions.ensure_partitions(
+                conn, months=months, adopt_default=False
+            )
+        )
+        await self.session.commit()
+        return created
+
+    async def merge_import_chunk(
+        self,
+        records: Sequence[ImportRecord],
+    ) -> tuple[int, int, list[tuple[int, int]], set[int]]:
+        """将一块已校验的导入记录合并到 weight_records 并提交
+
+        记录先经 asyncpg copy_records_to_table 写入事务级临时表，再用一条
+        INSERT ... SELECT ... ON CONFLICT (profile_id, measured_at) DO UPDATE 合并；
+        块内同一 (profile_id, measured_at) 以行号最大的为准。
+        返回 (新增数, 覆盖数, 宠物不存在的 (行号, profile_id), 受影响的 profile_id)。
+        汇总表不在这里逐块维护，由调用方在全部导入后对受影响的宠物统一重算。
+        """
+        await self.ensure_partitions_for(record[3] for record in records)
+
+        # 先经 SQLAlchemy 执行语句以开启事务，临时表随事务提交删除
+        await self.session.exec(
+            text(
+                f"CREATE TEMP TABLE {_IMPORT_STAGING_TABLE} ("
+                "line_no bigint, profile_id integer, weight_g integer, "
+                "measured_at timestamptz, is_anomaly boolean, sample_count integer, "
+                "min_weight_g integer, max_weight_g integer) ON COMMIT DROP"
+            )
+        )
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        assert driver_connection is not None
+        await driver_connection.copy_records_to_table(
+            _IMPORT_STAGING_TABLE,
+            records=records,
+            columns=[
+                "line_no",
+                "profile_id",
+                "weight_g",
+                "measured_at",
+                "is_anomaly",
+                "sample_count",
+                "min_weight_g",
+                "max_weight_g",
+            ],
+        )
+
+        unknown = await self.session.exec(
+            text(
+                f"SELECT s.line_no, s.profile_id FROM {_IMPORT_STAGING_TABLE} s "
+                "WHERE NOT EXISTS (SELECT 1 FROM profiles p WHERE p.id = s.profile_id) "
+                "ORDER BY s.line_no"
+            )
+        )
+        unknown_rows = [(line_no, profile_id) for line_no, profile_id in unknown]
+
+        merged = await self.session.exec(
+            text(
+                f"INSERT INTO {WeightRecord.__tablename__} AS w "
+                "(profile_id, weight_g, measured_at, is_anomaly, sample_count, "
+                "min_weight_g, max_weight_g) "
+                "SELECT DISTINCT ON (s.profile_id, s.measured_at) "
+                "s.profile_id, s.weight_g, s.measured_at, s.is_anomaly, "
+                "s.sample_count, s.min_weight_g, s.max_weight_g "
+                f"FROM {_IMPORT_STAGING_TABLE} s "
+                "JOIN profiles p ON p.id = s.profile_id "
+                "ORDER BY s.profile_id, s.measured_at, s.line_no DESC "
+                # 导入的日汇总行与原始读数覆盖原行；原始读数落到已有日汇总行上时
+                # 把读数并入（与压缩时的合并方式一致）
+                "ON CONFLICT (profile_id, measured_at) DO UPDATE SET "
+                "weight_g = CASE WHEN w.sample_count > 1 AND EXCLUDED.sample_count = 1 "
+                "THEN round((w.weight_g::numeric * w.sample_count + EXCLUDED.weight_g) "
+                "/ (w.sample_count + 1)) ELSE EXCLUDED.weight_g END, "
+                "min_weight_g = CASE WHEN w.sample_count > 1 AND EXCLUDED.sample_count = 1 "
+                "THEN least(w.min_weight_g, EXCLUDED.weight_g) "
+                "ELSE EXCLUDED.min_weight_g END, "
+                "max_weight_g = CASE WHEN w.sample_count > 1 AND EXCLUDED.sample_count = 1 "
+                "THEN greatest(w.max_weight_g, EXCLUDED.weight_g) "
+                "ELSE EXCLUDED.max_weight_g END, "
+                "sample_count = CASE WHEN w.sample_count > 1 AND EXCLUDED.sample_count = 1 "
+                "THEN w.sample_count + 1 ELSE EXCLUDED.sample_count END, "
+                "is_anomaly = CASE WHEN w.sample_count > 1 AND EXCLUDED.sample_count = 1 "
+                "THEN false ELSE EXCLUDED.is_anomaly END, updated_at = now() "
+                # 分区表不能读取 xmax：新插入行的 created_at 即本事务的 now()
+                "RETURNING (created_at = now()) AS inserted, profile_id"
+            )
+        )
+        inserted = updated = 0
+        profile_ids: set[int] = set()
+        for is_inserted, profile_id in merged:
+            if is_inserted:
+                inserted += 1
+            else:
+                updated += 1
+            profile_ids.add(profile_id)
+
+        await self.session.commit()
+        return inserted, updated, unknown_rows, profile_ids
+
+    async def get_profile_ids_after(
+        self,
+        after_profile_id: int,
+        limit: int,
+    ) -> list[int]:
+        statement = (
+            select(Profile.id)
+            .where(col(Profile.id) > after_profile_id)
+            .order_by(col(Profile.id))
+            .limit(limit)
+        )
+        return list((await self.session.exec(statement)).all())
+
+    async def compact_daily(
+        self,
+        profile_ids: Sequence[int],
+        *,
+        before: datetime,
+    ) -> tuple[int, int, list[int]]:
+        """把指定宠物早于 before 的读数按 UTC 日合并为日汇总行，重算汇总并提交
+
+        before 应为 UTC 零点，避免把同一天拆成两部分。只合并多于一行的（宠物, 日），
+        已压缩且没有新读数的日期不会被重写；异常读数保留原样。
+        删除与插入在同一条语句内完成（数据修改 CTE），先按 profile_id 顺序锁定汇总行，
+        与单条写入的加锁顺序一致。
+        返回 (删除的行数, 生成的日汇总行数, 被压缩的宠物ID)。
+        """
+        ids = sorted(profile_ids)
+        if not ids:
+            return 0, 0, []
+
+        await self.session.exec(
+            select(ProfileWeightSummary.profile_id)
+            .where(col(ProfileWeightSummary.profile_id).in_(ids))
+            .order_by(col(ProfileWeightSummary.profile_id))
+            .with_for_update()
+        )
+        table = WeightRecord.__tablename__
+        result = await self.session.exec(
+            text(
+                "WITH days AS ("
+                "SELECT profile_id, date_trunc('day', measured_at, 'UTC') AS day "
+                f"FROM {table} "
+                "WHERE profile_id = ANY(:ids) AND measured_at < :before "
+                "AND NOT is_anomaly "
+                "GROUP BY 1, 2 HAVING count(*) > 1), "
+                "removed AS ("
+                f"DELETE FROM {table} w USING days d "
+                "WHERE w.profile_id = d.profile_id AND w.measured_at >= d.day "
+                "AND w.measured_at < d.day + INTERVAL '24 hours' "
+                "AND w.measured_at < :before AND NOT w.is_anomaly "
+                "RETURNING w.profile_id, d.day, w.weight_g, w.measured_at, "
+                "w.sample_count, w.min_weight_g, w.max_weight_g), "
+                "inserted AS ("
+                f"INSERT INTO {table} (profile_id, weight_g, measured_at, "
+                "is_anomaly, sample_count, min_weight_g, max_weight_g) "
+                "SELECT profile_id, "
+                "round(sum(weight_g * sample_count)::numeric / sum(sample_count)), "
+                "max(measured_at), false, sum(sample_count), "
+                "min(least(min_weight_g, weight_g)), "
+                "max(greatest(max_weight_g, weight_g)) "
+                "FROM removed GROUP BY profile_id, day "
+                "RETURNING profile_id) "
+                "SELECT (SELECT count(*) FROM removed) AS removed, "
+                "(SELECT count(*) FROM inserted) AS rollups, "
+                "(SELECT array_agg(DISTINCT profile_id) FROM inserted) AS profile_ids"
+            ),
+            params={"ids": ids, "before": before},
+        )
+        removed, rollups, compacted = result.one()
+        compacted = compacted or []
+        await self.refresh_summaries(compacted)
+        await self.session.commit()
+        return removed, rollups, compacted
+
+    async def rebuild_summaries(
+        self,
+        profile_ids: Sequence[int],
+        *,
+        batch_size: int = 1000,
+    ) -> None:
+        """分批重算并提交多个宠物的体重汇总（批量导入后使用）"""
+        for i in range(0, len(profile_ids), batch_size):
+            await self.refresh_summaries(profile_ids[i : i + batch_size])
+            await self.session.commit()
+
+    async def refresh_summaries(self, profile_ids: Sequence[int]) -> None:
+        """从原始记录（含日汇总行）重新计算指定宠物的体重汇总（不提交，由调用方控制事务）"""
+        if not profile_ids:
+            return
+
+        ids = set(profile_ids)
+        counted = [col(WeightRecord.profile_id).in_(ids)]
+        if settings.weight_anomaly_exclude:
+            counted.append(~col(WeightRecord.is_anomaly))
+        latest = (
+            select(
+                col(WeightRecord.profile_id).label("profile_id"),
+                col(WeightRecord.weight_g).label("weight_g"),
+                col(WeightRecord.measured_at).label("measured_at"),
+            )
+            .where(*counted)
+            .distinct(col(WeightRecord.profile_id))
+            .order_by(col(WeightRecord.profile_id), desc(WeightRecord.measured_at))
+            .subquery()
+        )
+        # 趋势累加量：x 为距最新读数的天数，w = exp(λx)（限制下界避免 exp 下溢报错）
+        x = (
+            func.extract("epoch", col(WeightRecord.measured_at) - latest.c.measured_at)
+            / 86_400.0
+        )
+        w = func.exp(
+            func.greatest(
+                x * trend.decay_rate(settings.weight_trend_half_life_days), -700
+            )
+        )
+        y = cast(WeightRecord.weight_g, Float)
+        # 日汇总行按其代表的读数数量加权
+        n = col(WeightRecord.sample_count)
+        w = w * n
+        low_g, high_g = self._extremes()
+        stats = (
+            select(
+                col(WeightRecord.profile_id).label("profile_id"),
+                func.min(low_g).label("min_weight_g"),
+                func.max(high_g).label("max_weight_g"),
+                func.sum(n).label("record_count"),
+                (func.sum(y * n) / func.sum(n)).label("mean_weight_g"),
+                func.sum(w).label("trend_s0"),
+                func.sum(w * x).label("trend_s1"),
+                func.sum(w * x * x).label("trend_s2"),
+                func.sum(w * y).label("trend_sy"),
+                func.sum(w * x * y).label("trend_sxy"),
+            )
+            .join(latest, latest.c.profile_id == WeightRecord.profile_id)
+            .where(*counted)
+            .group_by(col(WeightRecord.profile_id))
+            .subquery()
+        )
+        columns = [
+            "profile_id",
+            "latest_weight_g",
+            "latest_measured_at",
+            "min_weight_g",
+            "max_weight_g",
+            "record_count",
+            "mean_weight_g",
+            "trend_s0",
+            "trend_s1",
+            "trend_s2",
+            "trend_sy",
+            "trend_sxy",
+            "recent_weights_g",
+        ]
+        source = select(
+            latest.c.profile_id,
+            latest.c.weight_g,
+            latest.c.measured_at,
+            *(stats.c[name] for name in columns[3:-1]),
+            func.array(
+                self._recent_weights_query(
+                    latest.c.profile_id, latest.c.measured_at
+                ).scalar_subquery()
+            ),
+        ).join(stats, stats.c.profile_id == latest.c.profile_id)
+        statement = insert(ProfileWeightSummary).from_select(columns, source)
+        statement = statement.on_conflict_do_update(
+            index_elements=[ProfileWeightSummary.__table__.c.profile_id],  # type: ignore[attr-defined]
+            set_={
+                **{name: statement.excluded[name] for name in columns[1:]},
+                "updated_at": func.now(),
+            },
+        )
+        await self.session.exec(statement)
+
+        # 已无任何（计入汇总的）记录的宠物删除汇总行
+        await self.session.exec(
+            delete(ProfileWeightSummary).where(
+                col(ProfileWeightSummary.profile_id).in_(ids),
+                ~exists().where(
+                    col(WeightRecord.profile_id) == ProfileWeightSummary.profile_id,
+                    *counted[1:],
+                ),
+            )
+        )
+
+    async def _lock_summary(self, profile_id: int) -> ProfileWeightSummary | None:
+        statement = (
+            select(ProfileWeightSummary)
+            .where(col(ProfileWeightSummary.profile_id) == profile_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return (await self.session.exec(statement)).one_or_none()
+
+    async def _summary_add(
+        self,
+        profile_id: int,
+        added: Reading,
+        *,
+        summary: ProfileWeightSummary | None,
+    ) -> None:
+        """计入一条读数：首条读数直接插入汇总行，否则在已锁定的汇总行上增量更新"""
+        weight_g, measured_at, _ = added
+        if summary is None:
+            statement = (
+                insert(ProfileWeightSummary)
+                .values(
+                    profile_id=profile_id,
+                    latest_weight_g=weight_g,
+                    latest_measured_at=measured_at,
+                    min_weight_g=weight_g,
+                    max_weight_g=weight_g,
+                    record_count=1,
+                    mean_weight_g=float(weight_g),
+                    trend_s0=1.0,
+                    trend_sy=float(weight_g),
+                    recent_weights_g=[weight_g],
+                )
+                .on_conflict_do_nothing()
+            )
+            result = await self.session.exec(statement)
+            if result.rowcount:
+                return
+            # 并发事务已创建汇总行
+            summary = await self._lock_summary(profile_id)
+            if summary is None:  # pragma: no cover - 汇总行被并发删除
+                await self.refresh_summaries([profile_id])
+                return
+
+        self._apply_reading(summary, added)
+        await self.session.flush()
+
+    async def _summary_rebuild(self, profile_id: int) -> None:
+        """日汇总行代表多条读数，修改/删除时无法增量推导：锁定后重新计算"""
+        await self._lock_summary(profile_id)
+        await self.refresh_summaries([profile_id])
+
+    async def _summary_replace(
+        self,
+        profile_id: int,
+        *,
+        removed: Reading,
+        added: Reading | None,
+    ) -> None:
+        """移除一条读数（可同时加入新值）：锁定汇总行后增量更新
+
+        被移除的读数是最小/最大值或最新读数时无法增量推导，改为从原始记录重新计算
+        （走 (profile_id, measured_at) 索引，仅涉及该宠物的记录）。
+        不计入汇总的异常读数（WEIGHT_ANOMALY_EXCLUDE）按不存在处理。
+        """
+        summary = await self._lock_summary(profile_id)
+        if added is not None and not self._counted(added[2]):
+            added = None
+        if not self._counted(removed[2]):
+            if added is not None:
+                await self._summary_add(profile_id, added, summary=summary)
+            if summary is not None:
+                # 被移除的异常读数可能在窗口中
+                await self._reload_window(summary)
+            return
+
+        removed_g, removed_at, _ = removed
+        if (
+            summary is None
+            or summary.record_count <= 1
+            or removed_g in (summary.min_weight_g, summary.max_weight_g)
+            or removed_at >= summary.latest_measured_at
+        ):
+            await self.refresh_summaries([profile_id])
+            return
+
+        total = summary.mean_weight_g * summary.record_count - removed_g
+        summary.record_count -= 1
+        summary.mean_weight_g = total / summary.record_count
+        self._set_trend(
+            summary,
+            trend.add(
+                self._trend_of(summary),
+                trend.days_between(summary.latest_measured_at, removed_at),
+                removed_g,
+                settings.weight_trend_half_life_days,
+                sign=-1.0,
+            ),
+        )
+        if added is not None:
+            self._apply_reading(summary, added, update_window=False)
+        # 被移除的读数可能在窗口中，按当前数据重新取窗口
+        await self._reload_window(summary)
+
+    async def _reload_window(self, summary: ProfileWeightSummary) -> None:
+        """按当前记录重新取异常检测窗口（索引范围扫描，至多 N 行）"""
+        window = await self.session.exec(
+            self._recent_weights_query(summary.profile_id, summary.latest_measured_at)
+        )
+        summary.recent_weights_g = list(window.all())
+        await self.session.flush()
+
+    @staticmethod
+    def _extremes() -> tuple[Any, Any]:
+        """每行的最小/最大体重：日汇总行取记录的当日极值（least/greatest 忽略 NULL）"""
+        return (
+            func.least(WeightRecord.min_weight_g, WeightRecord.weight_g).label("low_g"),
+            func.greatest(WeightRecord.max_weight_g, WeightRecord.weight_g).label(
+                "high_g"
+            ),
+        )
+
+    @staticmethod
+    def _recent_weights_query(profile_id: Any, until: Any):
+        # 窗口包含被标记的异常读数（见 app/weights/anomaly.py）。
+        # 窗口中的读数都不晚于汇总的最新读数：上界让分区裁剪跳过之后的（预建的）分区，
+        # 按 measured_at 倒序的有序 Append 取满 N 行即停止，不会再访问更早的分区；
+        # 异常读数不计入汇总（WEIGHT_ANOMALY_EXCLUDE）时它们可能晚于最新读数，不加上界
+        conditions = [col(WeightRecord.profile_id) == profile_id]
+        if not settings.weight_anomaly_exclude:
+            conditions.append(col(WeightRecord.measured_at) <= until)
+        return (
+            select(WeightRecord.weight_g)
+            .where(*conditions)
+            .order_by(desc(WeightRecord.measured_at))
+            .limit(settings.weight_anomaly_window)
+        )
+
+    @staticmethod
+    def _counted(is_anomaly: bool) -> bool:
+        return not (is_anomaly and settings.weight_anomaly_exclude)
+
+    @staticmethod
+    def _reading_of(record: WeightRecord) -> Reading:
+        return record.weight_g, record.measured_at, record.is_anomaly
+
+    @staticmethod
+    def _push_window(
+        summary: ProfileWeightSummary, weight_g: int, measured_at: datetime
+    ) -> None:
+        """不早于最新读数的读数进入异常检测窗口（补录的旧读数不改变窗口）"""
+        if measured_at >= summary.latest_measured_at:
+            summary.recent_weights_g = anomaly.push(
+                summary.recent_weights_g,
+                weight_g,
+                size=settings.weight_anomaly_window,
+            )
+
+    @classmethod
+    def _apply_reading(
+        cls,
+        summary: ProfileWeightSummary,
+        added: Reading,
+        *,
+        update_window: bool = True,
+    ) -> None:
+        weight_g, measured_at, _ = added
+        half_life = settings.weight_trend_half_life_days
+
+        sums = cls._trend_of(summary)
+        if measured_at >= summary.latest_measured_at:
+            # 新读数成为锚点：累加量整体平移到新的最新时间
+            sums = trend.shift(
+                sums,
+                trend.days_between(summary.latest_measured_at, measured_at),
+                half_life,
+            )
+            if update_window:
+                cls._push_window(summary, weight_g, measured_at)
+            summary.latest_weight_g = weight_g
+            summary.latest_measured_at = measured_at
+        sums = trend.add(
+            sums,
+            trend.days_between(summary.latest_measured_at, measured_at),
+            weight_g,
+            half_life,
+        )
+        cls._set_trend(summary, sums)
+
+        summary.record_count += 1
+        summary.mean_weight_g += (
+            weight_g - summary.mean_weight_g
+        ) / summary.record_count
+        summary.min_weight_g = min(summary.min_weight_g, weight_g)
+        summary.max_weight_g = max(summary.max_weight_g, weight_g)
+
+    @staticmethod
+    def _trend_of(summary: ProfileWeightSummary) -> trend.TrendSums:
+        return trend.TrendSums(
+            s0=summary.trend_s0,
+            s1=summary.trend_s1,
+            s2=summary.trend_s2,
+            sy=summary.trend_sy,
+            sxy=summary.trend_sxy,
+        )
+
+    @staticmethod
+    def _set_trend(summary: ProfileWeightSummary, sums: trend.TrendSums) -> None:
+        summary.trend_s0 = sums.s0
+        summary.trend_s1 = sums.s1
+        summary.trend_s2 = sums.s2
+        summary.trend_sy = sums.sy
+        summary.trend_sxy = sums.sxy
@@ -1,14 +1,25 @@
+from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Path, Query
+from fastapi import APIRouter, Depends, Path, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.database import get_session
 from app.weights.repository import WeightRecordRepository
 from app.weights.schema import (
+    WeightBucketResponse,
+    WeightGrowthCurveResponse,
+    WeightImportResponse,
+    WeightIngestCreate,
+    WeightIngestResponse,
+    WeightPercentileResponse,
     WeightRecordCreate,
     WeightRecordResponse,
     WeightRecordUpdate,
+    WeightSeriesResponse,
+    WeightSummaryResponse,
+    WeightTrendResponse,
 )
 from app.weights.service import WeightRecordService
 
@@ -30,6 +41,39 @@ async def create_weight_record(
     return await service.create_record(record_data)
 
 
+@router.post("/ingest", response_model=list[WeightIngestResponse])
+async def ingest_weight_records(
+    payload: WeightIngestCreate,
+    service: Annotated[WeightRecordService, Depends(get_weight_service)],
+):
+    """高频写入体重读数：与并发请求合并为微批写入，所在批次提交后按请求顺序返回确认"""
+    return await service.ingest_records(payload.readings)
+
+
+@router.post("/import", response_model=WeightImportResponse)
+async def import_weight_records(
+    request: Request,
+    service: Annotated[WeightRecordService, Depends(get_weight_service)],
+    fmt: Annotated[
+        str,
+        Query(
+            alias="format",
+            pattern="^(csv|ndjson)$",
+            description=(
+                "请求体格式: csv（首行表头 profile_id,weight_g,measured_at，"
+                "可带导出文件中的 is_anomaly,sample_count,min_weight_g,max_weight_g）"
+                "/ndjson"
+            ),
+        ),
+    ] = "csv",
+):
+    """批量导入体重记录，按 (profile_id, measured_at) 去重覆盖，返回逐行错误
+
+    /weights/export 的导出文件可原样导回，日汇总行保留条数与极值。
+    """
+    return await service.import_records(request.stream(), fmt=fmt)
+
+
 @router.get("/", response_model=list[WeightRecordResponse])
 async def list_weight_records(
     service: Annotated[WeightRecordService, Depends(get_weight_service)],
@@ -66,13 +110,129 @@ async def list_weight_records_by_profile(
     )
 
 
+@router.get("/by-profile/{profile_id}/summary", response_model=WeightSummaryResponse)
+async def get_weight_summary_by_profile(
+    profile_id: Annotated[int, Path(..., description="宠物ID")],
+    service: Annotated[WeightRecordService, Depends(get_weight_service)],
+):
+    """获取指定宠物的体重汇总（最新/最小/最大/记录数/均值），按主键读取"""
+    return await service.get_summary_by_profile(profile_id)
+
+
+@router.get(
+    "/by-profile/{profile_id}/percentile", response_model=WeightPercentileResponse
+)
+async def get_weight_percentile_by_profile(
+    profile_id: Annotated[int, Path(..., description="宠物ID")],
+    service: Annotated[WeightRecordService, Depends(get_weight_service)],
+):
+    """最新体重在同品种生长曲线上的百分位（读取预计算的百分位表）"""
+    return await service.get_percentile_by_profile(profile_id)
+
+
+@router.get("/growth-curves/{variety}", response_model=list[WeightGrowthCurveResponse])
+async def get_growth_curve(
+    variety: Annotated[str, Path(..., description="品种")],
+    service: Annotated[WeightRecordService, Depends(get_weight_service)],
+):
+    """品种生长曲线：各月龄的体重百分位（P5–P95）"""
+    return await service.get_growth_curve(variety)
+
+
+@router.get("/by-profile/{profile_id}/trend", response_model=WeightTrendResponse)
+async def get_weight_trend_by_profile(
+    profile_id: Annotated[int, Path(..., description="宠物ID")],
+    service: Annotated[WeightRecordService, Depends(get_weight_service)],
+    target_weight_g: Annotated[
+        int | None, Query(gt=0, description="目标体重 (克)，用于预计到达时间")
+    ] = None,
+):
+    """获取指定宠物的体重趋势（EWMA、斜率、预计到达目标体重的时间）"""
+    return await service.get_trend_by_profile(
+        profile_id, target_weight_g=target_weight_g
+    )
+
+
+@router.get(
+    "/by-profile/{profile_id}/buckets", response_model=list[WeightBucketResponse]
+)
+async def aggregate_weight_records_by_profile(
+    profile_id: Annotated[int, Path(..., description="宠物ID")],
+    service: Annotated[WeightRecordService, Depends(get_weight_service)],
+    interval: Annotated[
+        str, Query(pattern="^(day|week|month)$", description="桶粒度 day/week/month")
+    ] = "day",
+    tz: Annotated[str, Query(description="分桶使用的时区（IANA 名称）")] = "UTC",
+    start: Annotated[
+        datetime | None, Query(description="起始时间（包含），为空不限")
+    ] = None,
+    end: Annotated[
+        datetime | None, Query(description="结束时间（不包含），为空不限")
+    ] = None,
+):
+    """按日/周/月聚合指定宠物的体重（最小/最大/平均/最后一次/记录数）"""
+    return await service.aggregate_by_profile(
+        profile_id,
+        interval=interval,
+        tz=tz,
+        start=start,
+        end=end,
+    )
+
+
+@router.get("/by-profile/{profile_id}/series", response_model=WeightSeriesResponse)
+async def get_weight_series_by_profile(
+    profile_id: Annotated[int, Path(..., description="宠物ID")],
+    service: Annotated[WeightRecordService, Depends(get_weight_service)],
+    max_points: Annotated[
+        int, Query(ge=3, le=5000, description="返回的最大点数")
+    ] = 500,
+    start: Annotated[
+        datetime | None, Query(description="起始时间（包含），为空不限")
+    ] = None,
+    end: Annotated[
+        datetime | None, Query(description="结束时间（不包含），为空不限")
+    ] = None,
+):
+    """绘图用体重曲线：按 LTTB 降采样到至多 max_points 个原始读数，保留峰谷形状"""
+    return await service.get_series_by_profile(
+        profile_id,
+        max_points=max_points,
+        start=start,
+        end=end,
+    )
+
+
+@router.get("/export")
+async def export_weight_records(
+    service: Annotated[WeightRecordService, Depends(get_weight_service)],
+    profile_id: Annotated[int | None, Query(description="宠物ID，为空导出全部")] = None,
+    start: Annotated[
+        datetime | None, Query(description="起始时间（包含），为空不限")
+    ] = None,
+    end: Annotated[
+        datetime | None, Query(description="结束时间（不包含），为空不限")
+    ] = None,
+):
+    """以 CSV 流式导出体重记录（数据库 COPY 输出直接写入响应，内存占用恒定）"""
+    return StreamingResponse(
+        service.export_csv(profile_id=profile_id, start=start, end=end),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="weight_records.csv"'},
+    )
+
+
 @router.get("/{record_id}", response_model=WeightRecordResponse)
 async def get_weight_record(
     record_id: Annotated[int, Path(..., description="体重记录ID")],
     service: Annotated[WeightRecordService, Depends(get_weight_service)],
+    measured_at: Annotated[
+        datetime | None,
+        Query(description="测量时间（可选，提供时只查询该时间所在的分区）"),
+    ] = None,
 ):
     """根据ID获取体重记录"""
-    return await service.get_record_by_id(record_id)
+    return await service.get_record_by_id(record_id, measured_at)
 
 
 @router.patch("/{record_id}", response_model=WeightRecordResponse)
@@ -80,16 +240,24 @@ async def update_weight_record(
     record_id: Annotated[int, Path(..., description="体重记录ID")],
     record_data: WeightRecordUpdate,
     service: Annotated[WeightRecordService, Depends(get_weight_service)],
+    measured_at: Annotated[
+        datetime | None,
+        Query(description="测量时间（可选，提供时只查询该时间所在的分区）"),
+    ] = None,
 ):
     """更新体重记录"""
-    return await service.update_record(record_id, record_data)
+    return await service.update_record(record_id, record_data, measured_at)
 
 
 @router.delete("/{record_id}", status_code=204)
 async def delete_weight_record(
     record_id: Annotated[int, Path(..., description="体重记录ID")],
     service: Annotated[WeightRecordService, Depends(get_weight_service)],
+    measured_at: Annotated[
+        datetime | None,
+        Query(description="测量时间（可选，提供时只查询该时间所在的分区）"),
+    ] = None,
 ):
     """删除体重记录"""
-    await service.delete_record(record_id)
+    await service.delete_record(record_id, measured_at)
     return None
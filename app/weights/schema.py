@@ -1,23 +1,77 @@
 from datetime import datetime, timezone
 
+from pydantic import field_validator, model_validator
 from sqlmodel import Field, SQLModel
 
 
+def _assume_utc(value: datetime | None) -> datetime | None:
+    """无时区的测量时间按 UTC 处理（与批量导入、微批写入一致）"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
 class WeightRecordCreate(SQLModel):
-    """创建体重记录"""
+    """创建体重记录（数值限制在数据库 int4 范围内）"""
 
-    profile_id: int = Field(..., description="宠物ID")
-    weight_g: int = Field(..., gt=0, description="体重 (克)")
+    profile_id: int = Field(..., gt=0, lt=2**31, description="宠物ID")
+    weight_g: int = Field(..., gt=0, lt=2**31, description="体重 (克)")
     measured_at: datetime | None = Field(
         default_factory=lambda: datetime.now(tz=timezone.utc), description="测量时间"
     )
 
+    @field_validator("measured_at")
+    @classmethod
+    def _measured_at_utc(cls, value: datetime | None) -> datetime | None:
+        return _assume_utc(value)
+
+
+class WeightRecordImportRow(SQLModel):
+    """批量导入中的一行（measured_at 必填，数值限制在数据库 int4 范围内）
+
+    其余列与导出文件一致且可省略：导出的日汇总行（sample_count > 1）原样导回，
+    不会被当作单条读数。
+    """
+
+    profile_id: int = Field(..., gt=0, lt=2**31, description="宠物ID")
+    weight_g: int = Field(..., gt=0, lt=2**31, description="体重 (克)")
+    measured_at: datetime = Field(..., description="测量时间")
+    is_anomaly: bool = Field(False, description="是否为异常读数")
+    sample_count: int = Field(1, ge=1, lt=2**31, description="合并的读数条数")
+    min_weight_g: int | None = Field(
+        None, gt=0, lt=2**31, description="日汇总行的最小体重 (克)"
+    )
+    max_weight_g: int | None = Field(
+        None, gt=0, lt=2**31, description="日汇总行的最大体重 (克)"
+    )
+
+    @model_validator(mode="after")
+    def check_rollup(self):
+        """原始读数不带极值；日汇总行的极值必须包住均值"""
+        if self.sample_count == 1:
+            self.min_weight_g = self.max_weight_g = None
+        elif (
+            self.min_weight_g is None
+            or self.max_weight_g is None
+            or not self.min_weight_g <= self.weight_g <= self.max_weight_g
+        ):
+            raise ValueError(
+                "Rollup rows require min_weight_g <= weight_g <= max_weight_g"
+            )
+        return self
+
 
 class WeightRecordUpdate(SQLModel):
     """更新体重记录（部分可选）"""
 
-    weight_g: int | None = Field(None, gt=0, description="体重 (克)")
+    weight_g: int | None = Field(None, gt=0, lt=2**31, description="体重 (克)")
     measured_at: datetime | None = Field(None, description="测量时间")
+    is_anomaly: bool | None = Field(None, description="手动修正异常标记")
+
+    @field_validator("measured_at")
+    @classmethod
+    def _measured_at_utc(cls, value: datetime | None) -> datetime | None:
+        return _assume_utc(value)
 
 
 class WeightRecordResponse(SQLModel):
@@ -27,3 +81,131 @@ class WeightRecordResponse(SQLModel):
     profile_id: int = Field(..., description="宠物ID")
     weight_g: int = Field(..., description="体重 (克)")
     measured_at: datetime = Field(..., description="测量时间")
+    is_anomaly: bool = Field(False, description="是否为异常读数")
+    sample_count: int = Field(1, description="读数数量（>1 为压缩后的日汇总行）")
+    min_weight_g: int | None = Field(None, description="日汇总行的当日最小体重 (克)")
+    max_weight_g: int | None = Field(None, description="日汇总行的当日最大体重 (克)")
+
+
+class WeightBucketResponse(SQLModel):
+    """按时间桶聚合的体重统计"""
+
+    bucket_start: datetime = Field(..., description="桶起始时间")
+    count: int = Field(..., description="读数数量（日汇总行按其代表的读数计）")
+    min_g: int = Field(..., description="最小体重 (克)")
+    max_g: int = Field(..., description="最大体重 (克)")
+    avg_g: float = Field(..., description="平均体重 (克)")
+    last_g: int = Field(
+        ..., description="桶内最后一次测量的体重 (克)，已压缩的日期为当日均值"
+    )
+
+
+class WeightSeriesPoint(SQLModel):
+    measured_at: datetime = Field(..., description="测量时间")
+    weight_g: int = Field(..., description="体重 (克)")
+
+
+class WeightSeriesResponse(SQLModel):
+    """降采样后的体重曲线"""
+
+    total_points: int = Field(..., description="时间范围内的原始读数数量")
+    points: list[WeightSeriesPoint] = Field(
+        ..., description="LTTB 选出的读数（按时间升序，至多 max_points 个）"
+    )
+
+
+class WeightSummaryResponse(SQLModel):
+    """宠物体重汇总"""
+
+    profile_id: int = Field(..., description="宠物ID")
+    latest_weight_g: int = Field(..., description="最新体重 (克)")
+    latest_measured_at: datetime = Field(..., description="最新测量时间")
+    min_weight_g: int = Field(..., description="最小体重 (克)")
+    max_weight_g: int = Field(..., description="最大体重 (克)")
+    record_count: int = Field(..., description="记录数")
+    mean_weight_g: float = Field(..., description="平均体重 (克)")
+
+
+class WeightTrendResponse(SQLModel):
+    """宠物体重趋势（增量维护，读取为 O(1)）"""
+
+    profile_id: int = Field(..., description="宠物ID")
+    as_of: datetime = Field(..., description="趋势锚点（最新测量时间）")
+    latest_weight_g: int = Field(..., description="最新体重 (克)")
+    ewma_g: float = Field(..., description="指数加权移动平均体重 (克)")
+    slope_g_per_day: float | None = Field(
+        None, description="近期体重变化斜率 (克/天)，读数不足时为空"
+    )
+    half_life_days: float = Field(..., description="趋势权重半衰期 (天)")
+    target_weight_g: int | None = Field(None, description="目标体重 (克)")
+    projected_at: datetime | None = Field(
+        None, description="按当前趋势预计到达目标体重的时间，趋势方向不符时为空"
+    )
+
+
+class WeightGrowthCurveResponse(SQLModel):
+    """品种生长曲线中某个月龄的体重百分位"""
+
+    age_month: int = Field(..., description="月龄")
+    sample_count: int = Field(..., description="参与统计的宠物数")
+    p5: float = Field(..., description="P5 体重 (克)")
+    p10: float = Field(..., description="P10 体重 (克)")
+    p25: float = Field(..., description="P25 体重 (克)")
+    p50: float = Field(..., description="P50 体重 (克)")
+    p75: float = Field(..., description="P75 体重 (克)")
+    p90: float = Field(..., description="P90 体重 (克)")
+    p95: float = Field(..., description="P95 体重 (克)")
+
+
+class WeightPercentileResponse(SQLModel):
+    """宠物最新体重在同品种生长曲线上的位置"""
+
+    profile_id: int = Field(..., description="宠物ID")
+    variety: str = Field(..., description="品种")
+    measured_at: datetime = Field(..., description="最新测量时间")
+    weight_g: int = Field(..., description="最新体重 (克)")
+    percentile: float | None = Field(
+        None, description="插值得到的百分位，超出 P5–P95 范围时为空"
+    )
+    band: str = Field(..., description="所在区间，如 P25–P50、<P5、>P95")
+    curve: WeightGrowthCurveResponse = Field(..., description="该月龄的百分位")
+
+
+class WeightIngestCreate(SQLModel):
+    """高频写入请求（同一客户端的一批读数）"""
+
+    readings: list[WeightRecordCreate] = Field(
+        ..., min_length=1, max_length=1000, description="体重读数"
+    )
+
+
+class WeightIngestResponse(SQLModel):
+    """高频写入的单条确认（所在批次提交后返回）"""
+
+    status: str = Field(
+        ...,
+        description="created: 已写入；duplicate: 同一时间点已有记录；profile_not_found: 宠物不存在",
+    )
+    profile_id: int = Field(..., description="宠物ID")
+    measured_at: datetime = Field(..., description="测量时间")
+    id: int | None = Field(default=None, description="记录ID（仅 created）")
+    is_anomaly: bool | None = Field(
+        default=None, description="是否被判定为异常读数（仅 created）"
+    )
+
+
+class WeightImportError(SQLModel):
+    line: int = Field(..., description="行号（从 1 开始，CSV 包含表头行）")
+    message: str = Field(..., description="错误信息")
+
+
+class WeightImportResponse(SQLModel):
+    """批量导入结果"""
+
+    total_rows: int = Field(..., description="解析的数据行数")
+    inserted: int = Field(..., description="新增记录数")
+    updated: int = Field(..., description="按 (profile_id, measured_at) 覆盖的记录数")
+    failed: int = Field(..., description="失败行数")
+    errors: list[WeightImportError] = Field(
+        ..., description="失败行明细（最多返回前 N 条）"
+    )
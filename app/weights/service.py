@@ -1,10 +1,47 @@
+import asyncio
 from datetime import datetime, timezone
+from typing import AsyncIterator, Sequence
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from sqlalchemy.exc import IntegrityError
 
-from app.core.exception import NotFoundException
+from app.core.config import settings
+from app.core.exception import (
+    AlreadyExistsException,
+    BadRequestException,
+    NotFoundException,
+)
+from app.nutrition.cache import plan_cache
+from app.nutrition.replanner import nutrition_replanner
+from app.weights import downsample, growth, trend
+from app.weights.importer import ImportRecord, iter_import_rows
+from app.weights.ingest import weight_ingest_buffer
+from app.weights.model import GROWTH_PERCENTILES, BreedGrowthPercentile
 from app.weights.repository import WeightRecordRepository
-from app.weights.schema import WeightRecordCreate, WeightRecordResponse, WeightRecordUpdate
+from app.weights.schema import (
+    WeightBucketResponse,
+    WeightGrowthCurveResponse,
+    WeightImportError,
+    WeightImportResponse,
+    WeightIngestResponse,
+    WeightPercentileResponse,
+    WeightRecordCreate,
+    WeightRecordResponse,
+    WeightRecordUpdate,
+    WeightSeriesPoint,
+    WeightSeriesResponse,
+    WeightSummaryResponse,
+    WeightTrendResponse,
+)
+
+# PostgreSQL 唯一约束冲突的 SQLSTATE
+_UNIQUE_VIOLATION = "23505"
+# 导入结果中最多返回的错误行数
+MAX_IMPORT_ERRORS = 1000
+
+
+def _is_unique_violation(error: IntegrityError) -> bool:
+    return getattr(error.orig, "sqlstate", None) == _UNIQUE_VIOLATION
 
 
 class WeightRecordService:
@@ -13,12 +50,108 @@ class WeightRecordService:
     def __init__(self, repository: WeightRecordRepository) -> None:
         self.repository = repository
 
-    async def get_record_by_id(self, record_id: int) -> WeightRecordResponse:
-        record = await self.repository.get_by_id(record_id)
+    async def get_record_by_id(
+        self, record_id: int, measured_at: datetime | None = None
+    ) -> WeightRecordResponse:
+        record = await self.repository.get_by_id(record_id, measured_at)
         if not record:
             raise NotFoundException("WeightRecord not found")
         return WeightRecordResponse.model_validate(record)
 
+    async def get_summary_by_profile(self, profile_id: int) -> WeightSummaryResponse:
+        summary = await self.repository.get_summary(profile_id)
+        if not summary:
+            raise NotFoundException("WeightSummary not found")
+        return WeightSummaryResponse.model_validate(summary)
+
+    async def get_percentile_by_profile(
+        self,
+        profile_id: int,
+    ) -> WeightPercentileResponse:
+        """最新体重在同品种、同月龄百分位表中的位置（主键读取 + 插值）"""
+        found = await self.repository.get_profile_with_summary(profile_id)
+        if not found:
+            raise NotFoundException("Profile not found")
+        profile, summary = found
+        if not summary:
+            raise NotFoundException("WeightSummary not found")
+        if profile.birthday is None:
+            raise BadRequestException("Profile birthday is required")
+
+        age_month = growth.age_in_months(profile.birthday, summary.latest_measured_at)
+        row = await self.repository.get_growth_percentile(profile.variety, age_month)
+        if not row:
+            raise NotFoundException("Growth percentiles not found")
+
+        percentile, band = growth.place(row.percentiles_g, summary.latest_weight_g)
+        return WeightPercentileResponse(
+            profile_id=profile_id,
+            variety=profile.variety,
+            measured_at=summary.latest_measured_at,
+            weight_g=summary.latest_weight_g,
+            percentile=percentile,
+            band=band,
+            curve=self._curve_point(row),
+        )
+
+    async def get_growth_curve(self, variety: str) -> list[WeightGrowthCurveResponse]:
+        rows = await self.repository.get_growth_curve(variety)
+        return [self._curve_point(row) for row in rows]
+
+    @staticmethod
+    def _curve_point(row: BreedGrowthPercentile) -> WeightGrowthCurveResponse:
+        return WeightGrowthCurveResponse(
+            age_month=row.age_month,
+            sample_count=row.sample_count,
+            **{
+                f"p{p}": round(value, 1)
+                for p, value in zip(GROWTH_PERCENTILES, row.percentiles_g)
+            },
+        )
+
+    async def get_trend_by_profile(
+        self,
+        profile_id: int,
+        *,
+        target_weight_g: int | None = None,
+    ) -> WeightTrendResponse:
+        """由汇总行中的趋势累加量直接计算 EWMA、斜率与预计到达目标体重的时间"""
+        summary = await self.repository.get_summary(profile_id)
+        if not summary:
+            raise NotFoundException("WeightSummary not found")
+
+        estimate = trend.estimate(
+            trend.TrendSums(
+                s0=summary.trend_s0,
+                s1=summary.trend_s1,
+                s2=summary.trend_s2,
+                sy=summary.trend_sy,
+                sxy=summary.trend_sxy,
+            )
+        )
+        projected_at = None
+        if target_weight_g is not None:
+            projected_at = trend.projected_at(
+                estimate,
+                anchor=summary.latest_measured_at,
+                target_weight_g=target_weight_g,
+            )
+
+        return WeightTrendResponse(
+            profile_id=profile_id,
+            as_of=summary.latest_measured_at,
+            latest_weight_g=summary.latest_weight_g,
+            ewma_g=round(estimate.ewma_g or summary.latest_weight_g, 2),
+            slope_g_per_day=(
+                None
+                if estimate.slope_g_per_day is None
+                else round(estimate.slope_g_per_day, 2)
+            ),
+            half_life_days=settings.weight_trend_half_life_days,
+            target_weight_g=target_weight_g,
+            projected_at=projected_at,
+        )
+
     async def list_records_by_profile(
         self,
         profile_id: int,
@@ -55,29 +188,201 @@ class WeightRecordService:
         )
         return [WeightRecordResponse.model_validate(r) for r in records]
 
+    async def aggregate_by_profile(
+        self,
+        profile_id: int,
+        *,
+        interval: str = "day",
+        tz: str = "UTC",
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[WeightBucketResponse]:
+        """按时间桶聚合指定宠物的体重记录"""
+        # ZoneInfo 按名称缓存实例，重复校验同一时区几乎无开销（不必每次枚举全部时区）
+        try:
+            ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError) as e:
+            raise BadRequestException(f"Unknown timezone: {tz}") from e
+        if start is not None and end is not None and start >= end:
+            raise BadRequestException("start must be earlier than end")
+
+        rows = await self.repository.get_buckets(
+            profile_id, interval=interval, tz=tz, start=start, end=end
+        )
+        return [
+            WeightBucketResponse(
+                bucket_start=row.bucket_start,
+                count=row.count,
+                min_g=row.min_g,
+                max_g=row.max_g,
+                avg_g=round(float(row.avg_g), 2),
+                last_g=row.last_g,
+            )
+            for row in rows
+        ]
+
+    async def get_series_by_profile(
+        self,
+        profile_id: int,
+        *,
+        max_points: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> WeightSeriesResponse:
+        """LTTB 降采样的体重曲线：先统计读数数量确定分桶，再流式读取逐桶选点"""
+        if start is not None and end is not None and start >= end:
+            raise BadRequestException("start must be earlier than end")
+
+        total = await self.repository.count_series(profile_id, start=start, end=end)
+        points = downsample.lttb(
+            self.repository.stream_series(profile_id, start=start, end=end),
+            total=total,
+            threshold=max_points,
+        )
+        return WeightSeriesResponse(
+            total_points=total,
+            points=[
+                WeightSeriesPoint(measured_at=measured_at, weight_g=weight_g)
+                async for measured_at, weight_g in points
+            ],
+        )
+
+    def export_csv(
+        self,
+        *,
+        profile_id: int | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> AsyncIterator[bytes]:
+        """流式导出体重记录 CSV（COPY TO STDOUT）"""
+        if start is not None and end is not None and start >= end:
+            raise BadRequestException("start must be earlier than end")
+
+        return self.repository.stream_csv(profile_id=profile_id, start=start, end=end)
+
     async def create_record(self, record_data: WeightRecordCreate) -> WeightRecordResponse:
         data = record_data.model_dump()
         if data.get("measured_at") is None:
             data["measured_at"] = datetime.now(tz=timezone.utc)
         try:
             record = await self.repository.create(data)
+            plan_cache.invalidate_profile(record.profile_id)
+            nutrition_replanner.notify()
             return WeightRecordResponse.model_validate(record)
         except IntegrityError as e:
+            if _is_unique_violation(e):
+                raise AlreadyExistsException(
+                    "WeightRecord already exists at this measured_at"
+                ) from e
             raise NotFoundException("Profile not found") from e
 
     async def update_record(
         self,
         record_id: int,
         record_data: WeightRecordUpdate,
+        measured_at: datetime | None = None,
     ) -> WeightRecordResponse:
         update_data = record_data.model_dump(exclude_unset=True, exclude_none=True)
-        updated = await self.repository.update(record_id, update_data)
+        try:
+            updated = await self.repository.update(record_id, update_data, measured_at)
+        except IntegrityError as e:
+            raise AlreadyExistsException(
+                "WeightRecord already exists at this measured_at"
+            ) from e
         if not updated:
             raise NotFoundException("WeightRecord not found")
+        plan_cache.invalidate_profile(updated.profile_id)
+        nutrition_replanner.notify()
         return WeightRecordResponse.model_validate(updated)
 
-    async def delete_record(self, record_id: int) -> bool:
-        deleted = await self.repository.delete(record_id)
+    async def delete_record(
+        self, record_id: int, measured_at: datetime | None = None
+    ) -> bool:
+        record = await self.repository.get_by_id(record_id, measured_at)
+        if not record:
+            raise NotFoundException("WeightRecord not found")
+        profile_id = record.profile_id
+
+        deleted = await self.repository.delete(record_id, record.measured_at)
         if not deleted:
             raise NotFoundException("WeightRecord not found")
+        plan_cache.invalidate_profile(profile_id)
+        nutrition_replanner.notify()
         return True
+
+    async def ingest_records(
+        self, readings: Sequence[WeightRecordCreate]
+    ) -> list[WeightIngestResponse]:
+        """提交到微批写入缓冲区（由缓冲区用独立会话写入），按请求顺序返回确认"""
+        return await asyncio.gather(
+            *(
+                weight_ingest_buffer.submit(
+                    reading.profile_id, reading.weight_g, reading.measured_at
+                )
+                for reading in readings
+            )
+        )
+
+    async def import_records(
+        self,
+        chunks: AsyncIterator[bytes],
+        *,
+        fmt: str = "csv",
+    ) -> WeightImportResponse:
+        """批量导入体重记录（CSV / NDJSON），按 (profile_id, measured_at) 去重覆盖
+
+        请求体流式解析，校验通过的行每 WEIGHT_IMPORT_CHUNK_SIZE 行经 COPY 合并并提交一次；
+        重复导入同一文件结果相同，失败后可直接重试。全部完成后统一重算受影响宠物的汇总。
+        """
+        total = inserted = updated = failed = 0
+        errors: list[WeightImportError] = []
+        profile_ids: set[int] = set()
+        batch: list[ImportRecord] = []
+
+        def add_error(line: int, message: str) -> None:
+            nonlocal failed
+            failed += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append(WeightImportError(line=line, message=message))
+
+        async def flush() -> None:
+            nonlocal inserted, updated
+            if not batch:
+                return
+            (
+                chunk_inserted,
+                chunk_updated,
+                unknown,
+                affected,
+            ) = await self.repository.merge_import_chunk(batch)
+            inserted += chunk_inserted
+            updated += chunk_updated
+            profile_ids.update(affected)
+            for line, profile_id in unknown:
+                add_error(line, f"Profile not found: {profile_id}")
+            batch.clear()
+
+        async for line, record, error in iter_import_rows(chunks, fmt=fmt):
+            total += 1
+            if record is None:
+                add_error(line, error or "invalid row")
+                continue
+            batch.append(record)
+            if len(batch) >= settings.weight_import_chunk_size:
+                await flush()
+        await flush()
+
+        if profile_ids:
+            await self.repository.rebuild_summaries(sorted(profile_ids))
+            for profile_id in profile_ids:
+                plan_cache.invalidate_profile(profile_id)
+            nutrition_replanner.notify()
+
+        errors.sort(key=lambda item: item.line)
+        return WeightImportResponse(
+            total_rows=total,
+            inserted=inserted,
+            updated=updated,
+            failed=failed,
+            errors=errors,
+        )
@@ -0,0 +1,113 @@
+"""体重趋势的增量计算
+
+以最新测量时间为锚点，维护时间衰减加权回归的 5 个累加量：
+S0=Σw、S1=Σw·x、S2=Σw·x²、Sy=Σw·y、Sxy=Σw·x·y，
+其中 x 为距锚点的天数（≤0），y 为体重(克)，w=exp(λ·x)，λ=ln2/半衰期。
+新读数晚于锚点时先把锚点平移到新读数（整体乘以衰减因子并做坐标平移），
+因此插入、删除都是 O(1)，读取时由累加量直接得到：
+
+- 指数加权移动平均（连续时间 EWMA）：Sy / S0
+- 加权最小二乘斜率（克/天），近期读数权重更高，等效窗口约为半衰期的数倍
+- 按当前趋势到达目标体重的预计日期
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+_SECONDS_PER_DAY = 86_400.0
+# 斜率分母过小（读数过少或时间跨度过短）时不给出趋势
+_MIN_DENOMINATOR = 1e-9
+
+
+@dataclass
+class TrendSums:
+    s0: float = 0.0
+    s1: float = 0.0
+    s2: float = 0.0
+    sy: float = 0.0
+    sxy: float = 0.0
+
+
+@dataclass
+class TrendEstimate:
+    ewma_g: float | None
+    slope_g_per_day: float | None
+    fitted_g: float | None
+
+
+def decay_rate(half_life_days: float) -> float:
+    return math.log(2) / half_life_days
+
+
+def days_between(earlier: datetime, later: datetime) -> float:
+    return (later - earlier).total_seconds() / _SECONDS_PER_DAY
+
+
+def shift(sums: TrendSums, delta_days: float, half_life_days: float) -> TrendSums:
+    """锚点向后平移 delta_days 天（x' = x - Δ，w' = w·exp(-λΔ)）"""
+    if delta_days == 0:
+        return sums
+
+    f = math.exp(-decay_rate(half_life_days) * delta_days)
+    d = delta_days
+    return TrendSums(
+        s0=f * sums.s0,
+        s1=f * (sums.s1 - d * sums.s0),
+        s2=f * (sums.s2 - 2 * d * sums.s1 + d * d * sums.s0),
+        sy=f * sums.sy,
+        sxy=f * (sums.sxy - d * sums.sy),
+    )
+
+
+def add(
+    sums: TrendSums,
+    x_days: float,
+    weight_g: float,
+    half_life_days: float,
+    *,
+    sign: float = 1.0,
+) -> TrendSums:
+    """加入（sign=-1 时移除）一条距锚点 x_days 天的读数"""
+    w = sign * math.exp(decay_rate(half_life_days) * x_days)
+    return TrendSums(
+        s0=sums.s0 + w,
+        s1=sums.s1 + w * x_days,
+        s2=sums.s2 + w * x_days * x_days,
+        sy=sums.sy + w * weight_g,
+        sxy=sums.sxy + w * x_days * weight_g,
+    )
+
+
+def estimate(sums: TrendSums) -> TrendEstimate:
+    if sums.s0 <= _MIN_DENOMINATOR:
+        return TrendEstimate(ewma_g=None, slope_g_per_day=None, fitted_g=None)
+
+    ewma = sums.sy / sums.s0
+    denominator = sums.s0 * sums.s2 - sums.s1 * sums.s1
+    if denominator <= _MIN_DENOMINATOR * sums.s0 * sums.s0:
+        return TrendEstimate(ewma_g=ewma, slope_g_per_day=None, fitted_g=None)
+
+    slope = (sums.s0 * sums.sxy - sums.s1 * sums.sy) / denominator
+    # 回归直线在锚点（x=0）处的取值
+    fitted = (sums.sy - slope * sums.s1) / sums.s0
+    return TrendEstimate(ewma_g=ewma, slope_g_per_day=slope, fitted_g=fitted)
+
+
+def projected_at(
+    trend: TrendEstimate,
+    *,
+    anchor: datetime,
+    target_weight_g: float,
+    max_days: float = 3650,
+) -> datetime | None:
+    """按当前斜率到达目标体重的预计时间；趋势方向相反或过于平缓时为 None"""
+    if trend.slope_g_per_day is None or trend.fitted_g is None:
+        return None
+    if trend.slope_g_per_day == 0:
+        return None
+
+    days = (target_weight_g - trend.fitted_g) / trend.slope_g_per_day
+    if days < 0 or days > max_days:
+        return None
+    return anchor + timedelta(days=days)
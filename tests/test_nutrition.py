@@ -0,0 +1,493 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app.nutrition.service import NutritionService
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+async def _create_food(client, name: str, kcals_per_g: float, **extra) -> int:
+    params = {"name": name, "brand": "b-nutrition", "metabolic_energy": kcals_per_g}
+    r = await client.post("/foods/", params={**params, **extra})
+    assert r.status_code == 201
+    return r.json()["id"]
+
+
+async def test_plan_uses_latest_weight_and_all_foods(client, create_profile):
+    profile_id = await create_profile("nutri-latest", is_neutered=True)
+    for weight_g, measured_at in (
+        (9000, "2024-01-01T08:00:00+00:00"),
+        (10000, "2024-02-01T08:00:00+00:00"),
+    ):
+        r = await client.post(
+            "/weights/",
+            json={
+                "profile_id": profile_id,
+                "weight_g": weight_g,
+                "measured_at": measured_at,
+            },
+        )
+        assert r.status_code == 201
+
+    dry = await _create_food(client, "nutri-latest-dry", 3.5)
+    wet = await _create_food(client, "nutri-latest-wet", 1.0)
+
+    r = await client.post(
+        "/nutrition/plans",
+        json={
+            "profile_id": profile_id,
+            "foods": [{"food_id": dry, "ratio": 3}, {"food_id": wet, "ratio": 1}],
+            "goal": {},
+        },
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["weight_g"] == 10000
+    # 70 * 10^0.75 * 1.3(成年绝育犬)
+    assert abs(data["daily_kcals_target"] - 511.74) < 0.01
+    assert [item["food_id"] for item in data["foods"]] == [dry, wet]
+    assert abs(data["total_kcals"] - data["daily_kcals_target"]) < 0.05
+
+
+async def test_plan_inputs_prefetched_in_one_round_trip(client, engine, create_profile):
+    profile_id = await create_profile("nutri-one-trip")
+    foods = [await _create_food(client, f"nutri-one-trip-{i}", 3.0) for i in range(3)]
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        r = await client.post(
+            "/nutrition/plans",
+            json={
+                "profile_id": profile_id,
+                "foods": [{"food_id": food_id} for food_id in foods],
+                "goal": {"daily_kcals": 500},
+                "weight_g_override": 8000,
+            },
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert r.status_code == 200
+    assert [item["food_id"] for item in r.json()["foods"]] == foods
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+
+
+async def test_plan_reports_all_missing_foods(client, create_profile):
+    profile_id = await create_profile("nutri-missing")
+    food_id = await _create_food(client, "nutri-missing-food", 3.0)
+
+    r = await client.post(
+        "/nutrition/plans",
+        json={
+            "profile_id": profile_id,
+            "foods": [
+                {"food_id": 999_002},
+                {"food_id": food_id},
+                {"food_id": 999_001},
+            ],
+            "goal": {"daily_kcals": 500},
+            "weight_g_override": 8000,
+        },
+    )
+    assert r.status_code == 404
+    assert r.json()["detail"] == "Food not found: 999001, 999002"
+
+
+async def test_batch_plans_keep_request_order(client, create_profile):
+    first = await create_profile("nutri-batch-1")
+    second = await create_profile("nutri-batch-2", is_obese=True)
+    food_id = await _create_food(client, "nutri-batch-food", 4.0)
+
+    plans = [
+        {
+            "profile_id": profile_id,
+            "foods": [{"food_id": food_id}],
+            "goal": {},
+            "weight_g_override": weight_g,
+        }
+        for profile_id, weight_g in ((second, 16000), (first, 1000))
+    ]
+    r = await client.post("/nutrition/plans:batch", json={"plans": plans})
+    assert r.status_code == 200
+    data = r.json()
+    assert [item["profile_id"] for item in data] == [second, first]
+    assert [item["error"] for item in data] == [None, None]
+    # 肥胖犬系数 1.0：70 * 16^0.75 = 560
+    assert data[0]["plan"]["daily_kcals_target"] == 560.0
+    assert data[0]["plan"]["foods"][0]["grams"] == 140.0
+    # 未绝育成年犬中等活动量 1.5：70 * 1 * 1.5 = 105
+    assert data[1]["plan"]["daily_kcals_target"] == 105.0
+
+    # 单项失败只影响该项
+    no_weight = await create_profile("nutri-batch-no-weight")
+    plans = [
+        plans[0],
+        {**plans[1], "profile_id": 999_003},
+        {"profile_id": no_weight, "foods": [{"food_id": food_id}], "goal": {}},
+        {**plans[1], "foods": [{"food_id": 999_004}]},
+    ]
+    r = await client.post("/nutrition/plans:batch", json={"plans": plans})
+    assert r.status_code == 200
+    data = r.json()
+    assert data[0]["plan"]["daily_kcals_target"] == 560.0
+    assert [(item["plan"], item["error"]) for item in data[1:]] == [
+        (None, "Profile not found"),
+        (None, "Weight record not found for profile"),
+        (None, "Food not found: 999004"),
+    ]
+
+
+async def test_macro_mode_moves_towards_protein_target(client, create_profile):
+    profile_id = await create_profile("nutri-macro")
+    meat = await _create_food(client, "nutri-macro-meat", 1.2)
+    rice = await _create_food(client, "nutri-macro-rice", 1.3)
+    payload = {
+        "profile_id": profile_id,
+        "foods": [
+            {"food_id": meat, "protein_g_per_g": 0.25},
+            {"food_id": rice, "protein_g_per_g": 0.03},
+        ],
+        "goal": {"daily_kcals": 400, "protein_g": 60},
+        "weight_g_override": 8000,
+    }
+
+    r = await client.post("/nutrition/plans", json=payload)
+    assert r.status_code == 200
+    assert "protein target not fully reached" in r.json()["notes"]
+
+    r = await client.post("/nutrition/plans", json={**payload, "mode": "macro"})
+    assert r.status_code == 200
+    data = r.json()
+    assert abs(data["total_kcals"] - 400) < 0.05
+    assert data["achieved"]["protein_g"] >= 60 - 0.05
+
+    r = await client.post("/nutrition/plans", json={**payload, "mode": "bogus"})
+    assert r.status_code == 422
+
+
+async def test_cached_plan_invalidated_by_weight_write(client, create_profile):
+    profile_id = await create_profile("nutri-cache")
+    food_id = await _create_food(client, "nutri-cache-food", 2.0)
+    r = await client.post(
+        "/weights/", json={"profile_id": profile_id, "weight_g": 16000}
+    )
+    assert r.status_code == 201
+    payload = {"profile_id": profile_id, "foods": [{"food_id": food_id}], "goal": {}}
+
+    first = await client.post("/nutrition/plans", json=payload)
+    again = await client.post("/nutrition/plans", json=payload)
+    assert first.json() == again.json()
+    assert first.json()["weight_g"] == 16000
+
+    r = await client.post(
+        "/weights/", json={"profile_id": profile_id, "weight_g": 1000}
+    )
+    assert r.status_code == 201
+    after = await client.post("/nutrition/plans", json=payload)
+    assert after.json()["weight_g"] == 1000
+
+
+async def test_meal_schedule_streams_ndjson(client, create_profile):
+    profile_id = await create_profile("nutri-schedule", meals_per_day=3)
+    dry = await _create_food(client, "nutri-schedule-dry", 3.0)
+    wet = await _create_food(client, "nutri-schedule-wet", 1.0)
+    plan = {
+        "profile_id": profile_id,
+        "foods": [{"food_id": dry}, {"food_id": wet}],
+        "goal": {"daily_kcals": 400},
+        "weight_g_override": 5000,
+    }
+
+    r = await client.post(
+        "/nutrition/schedules",
+        json={"plan": plan, "days": 2, "start_date": "2025-01-30"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    meals = [json.loads(line) for line in r.text.splitlines()]
+    assert len(meals) == 6
+    assert meals[-1]["date"] == "2025-01-31"
+    day_grams = sum(m["total_grams"] for m in meals if m["day_index"] == 0)
+    assert abs(day_grams - (200 / 3 + 200)) < 0.01
+
+    r = await client.post(
+        "/nutrition/schedules",
+        json={
+            "plan": plan,
+            "days": 2,
+            "meals_per_day_override": 2,
+            "rotate_foods": True,
+        },
+    )
+    meals = [json.loads(line) for line in r.text.splitlines()]
+    served = [[f["food_id"] for f in m["foods"]] for m in meals]
+    assert served == [[dry], [dry], [wet], [wet]]
+    # 每天只供应一种食品，但当日热量与计划一致
+    for day_index in (0, 1):
+        day_kcals = sum(m["total_kcals"] for m in meals if m["day_index"] == day_index)
+        assert abs(day_kcals - 400) < 0.05
+
+
+def test_meal_split_never_negative():
+    portions = NutritionService._split_grams(0.05, 7)
+    assert min(portions) >= 0
+    assert round(sum(portions), 2) == 0.05
+    assert NutritionService._split_grams(100, 3) == [33.34, 33.33, 33.33]
+
+
+async def test_recommendations_return_cheapest_foods(client, create_profile):
+    profile_id = await create_profile("nutri-recommend")
+    cheap = await _create_food(
+        client, "nutri-recommend-cheap", 4.0, price=0.001, weight=10
+    )
+    pricey = await _create_food(
+        client, "nutri-recommend-pricey", 4.0, price=0.002, weight=10
+    )
+    payload = {
+        "profile_id": profile_id,
+        "goal": {"daily_kcals": 400},
+        "weight_g_override": 5000,
+        "top_k": 2,
+    }
+
+    r = await client.post("/nutrition/recommendations", json=payload)
+    assert r.status_code == 200
+    baskets = r.json()["baskets"]
+    assert [b["foods"][0]["food_id"] for b in baskets] == [cheap, pricey]
+    assert baskets[0]["foods"][0]["grams"] == 100.0
+
+    # 食品更新后目录增量维护，排序随之变化
+    r = await client.patch(f"/foods/{pricey}", json={"price": 0.0001})
+    assert r.status_code == 200
+    r = await client.post("/nutrition/recommendations", json=payload)
+    assert r.json()["baskets"][0]["foods"][0]["food_id"] == pricey
+
+
+async def test_plan_uses_food_nutrient_composition(client, create_profile):
+    profile_id = await create_profile("nutri-composition")
+    food_id = await _create_food(
+        client, "nutri-composition-food", 4.0, protein_g_per_g=0.3, fat_g_per_g=0.1
+    )
+    r = await client.get("/foods/nutri-composition-food")
+    assert r.json()["protein_g_per_g"] == 0.3
+
+    r = await client.post(
+        "/nutrition/plans",
+        json={
+            "profile_id": profile_id,
+            "foods": [{"food_id": food_id, "fat_g_per_g": 0.2}],
+            "goal": {"daily_kcals": 400},
+            "weight_g_override": 5000,
+        },
+    )
+    achieved = r.json()["achieved"]
+    assert achieved == {"protein_g": 30.0, "fat_g": 20.0, "carb_g": None}
+
+
+async def test_sweep_returns_columnar_grid(client, create_profile):
+    profile_id = await create_profile("nutri-sweep")
+    dry = await _create_food(client, "nutri-sweep-dry", 4.0)
+    wet = await _create_food(client, "nutri-sweep-wet", 1.0)
+    plan = {
+        "profile_id": profile_id,
+        "foods": [{"food_id": dry, "ratio": 3}, {"food_id": wet, "fixed_grams": 40}],
+        "goal": {},
+    }
+
+    r = await client.post(
+        "/nutrition/sweeps",
+        json={"plan": plan, "weights_g": [1000, 16000], "neutered": [False, True]},
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["food_ids"] == [dry, wet]
+    assert data["weight_g"] == [1000, 1000, 16000, 16000]
+    assert data["activity_factor"] == [1.5, 1.3, 1.5, 1.3]
+    assert data["daily_kcals_target"][2] == 840.0
+    # 湿粮固定 40g=40kcal，其余 800kcal 全部给干粮
+    assert data["grams"][0][2] == 200.0
+    assert data["grams"][1] == [40.0] * 4
+
+    # 网格中的体重与活动系数逐项校验：负体重、超出范围的系数返回 422 而不是 500
+    for grid in (
+        {"weights_g": [8000, -1000]},
+        {"activity_factors": [1.2, 0]},
+        {"activity_factors": [9.0]},
+    ):
+        r = await client.post("/nutrition/sweeps", json={"plan": plan, **grid})
+        assert r.status_code == 422
+
+
+async def test_sweep_runs_macro_solver_in_macro_mode(client, create_profile):
+    profile_id = await create_profile("nutri-sweep-macro")
+    meat = await _create_food(client, "nutri-sweep-meat", 1.2)
+    rice = await _create_food(client, "nutri-sweep-rice", 1.3)
+    plan = {
+        "profile_id": profile_id,
+        "foods": [
+            {"food_id": meat, "protein_g_per_g": 0.25},
+            {"food_id": rice, "protein_g_per_g": 0.03},
+        ],
+        "goal": {"protein_g": 60},
+        "mode": "macro",
+    }
+
+    r = await client.post(
+        "/nutrition/sweeps", json={"plan": plan, "weights_g": [8000, 16000]}
+    )
+    assert r.status_code == 200
+    data = r.json()
+    # 每个网格点与单独计算的 macro 计划一致（而不是按 ratio 平分）
+    for index, weight_g in enumerate([8000, 16000]):
+        r = await client.post(
+            "/nutrition/plans", json={**plan, "weight_g_override": weight_g}
+        )
+        expected = [food["grams"] for food in r.json()["foods"]]
+        assert [column[index] for column in data["grams"]] == expected
+
+
+async def test_saved_plan_replanned_after_weight_change(
+    client, session_factory, create_profile
+):
+    from app.nutrition.replanner import nutrition_replanner
+
+    food_id = await _create_food(client, "nutri-saved-food", 2.0)
+    profile_ids = []
+    for i in range(3):
+        profile_id = await create_profile(f"nutri-saved-{i}")
+        r = await client.post(
+            "/weights/", json={"profile_id": profile_id, "weight_g": 16000}
+        )
+        assert r.status_code == 201
+        r = await client.put(
+            f"/nutrition/profiles/{profile_id}/plan",
+            json={"profile_id": 0, "foods": [{"food_id": food_id}], "goal": {}},
+        )
+        assert r.status_code == 200
+        assert r.json()["plan"]["weight_g"] == 16000
+        profile_ids.append(profile_id)
+
+    # 覆盖体重的计划不受体重变化影响
+    r = await client.put(
+        f"/nutrition/profiles/{profile_ids[2]}/plan",
+        json={
+            "profile_id": profile_ids[2],
+            "foods": [{"food_id": food_id}],
+            "goal": {},
+            "weight_g_override": 5000,
+        },
+    )
+    assert r.status_code == 200
+
+    for profile_id in profile_ids:
+        r = await client.post(
+            "/weights/", json={"profile_id": profile_id, "weight_g": 1000}
+        )
+        assert r.status_code == 201
+
+    r = await client.get(f"/nutrition/profiles/{profile_ids[0]}/plan")
+    assert r.json()["plan"]["weight_g"] == 16000
+
+    nutrition_replanner.batch_size = 1
+    try:
+        assert await nutrition_replanner.run_once(session_factory) == 2
+        assert await nutrition_replanner.run_once(session_factory) == 0
+    finally:
+        nutrition_replanner.batch_size = 200
+
+    weights = []
+    for profile_id in profile_ids:
+        r = await client.get(f"/nutrition/profiles/{profile_id}/plan")
+        assert r.status_code == 200
+        weights.append(r.json()["plan"]["weight_g"])
+    assert weights == [1000, 1000, 5000]
+
+    r = await client.get("/nutrition/profiles/999004/plan")
+    assert r.status_code == 404
+
+
+async def test_saved_plan_tracks_profile_version_and_marks_failures(
+    client, session_factory, create_profile
+):
+    from app.nutrition.replanner import nutrition_replanner
+    from app.nutrition.repository import NutritionPlanRepository
+
+    food_id = await _create_food(client, "nutri-version-food", 2.0)
+    profile_id = await create_profile("nutri-version")
+    r = await client.post(
+        "/weights/", json={"profile_id": profile_id, "weight_g": 8000}
+    )
+    assert r.status_code == 201
+    payload = {"profile_id": profile_id, "foods": [{"food_id": food_id}], "goal": {}}
+    r = await client.put(f"/nutrition/profiles/{profile_id}/plan", json=payload)
+    assert r.status_code == 200
+    assert await nutrition_replanner.run_once(session_factory) == 0
+
+    # 档案每次修改版本号 +1，与计算时间无关
+    r = await client.patch(f"/profiles/{profile_id}", json={"is_neutered": True})
+    assert r.status_code == 200
+    assert await nutrition_replanner.run_once(session_factory) == 1
+    r = await client.get(f"/nutrition/profiles/{profile_id}/plan")
+    assert r.json()["plan"]["daily_kcals_target"] == 432.87  # 成年绝育犬 1.3
+    assert r.json()["error"] is None
+
+    # 食品被删除后无法重新计算：标记失败，之后不再重试
+    r = await client.delete(f"/foods/{food_id}")
+    assert r.status_code == 204
+    r = await client.patch(f"/profiles/{profile_id}", json={"is_obese": True})
+    assert r.status_code == 200
+    assert await nutrition_replanner.run_once(session_factory) == 0
+    r = await client.get(f"/nutrition/profiles/{profile_id}/plan")
+    assert r.json()["error"] == f"Food not found: {food_id}"
+    async with session_factory() as session:
+        assert await NutritionPlanRepository(session).get_stale() == []
+
+    # 重新保存后清除失败状态
+    other = await _create_food(client, "nutri-version-other", 2.0)
+    r = await client.put(
+        f"/nutrition/profiles/{profile_id}/plan",
+        json={**payload, "foods": [{"food_id": other}]},
+    )
+    assert r.status_code == 200
+    assert r.json()["error"] is None
+
+
+async def test_saved_plan_replanned_after_food_change(
+    client, session_factory, create_profile
+):
+    from app.nutrition.replanner import nutrition_replanner
+    from app.nutrition.repository import NutritionPlanRepository
+
+    food_id = await _create_food(client, "nutri-food-version", 2.0)
+    other_id = await _create_food(client, "nutri-food-version-other", 2.0)
+    profile_id = await create_profile("nutri-food-version")
+    r = await client.post(
+        "/weights/", json={"profile_id": profile_id, "weight_g": 8000}
+    )
+    assert r.status_code == 201
+    payload = {"profile_id": profile_id, "foods": [{"food_id": food_id}], "goal": {}}
+    r = await client.put(f"/nutrition/profiles/{profile_id}/plan", json=payload)
+    grams = r.json()["plan"]["foods"][0]["grams"]
+
+    # 只有计划用到的食品修改后才需要重新计算
+    r = await client.patch(f"/foods/{other_id}", json={"metabolic_energy": 3.0})
+    assert r.status_code == 200
+    assert await nutrition_replanner.run_once(session_factory) == 0
+
+    r = await client.patch(f"/foods/{food_id}", json={"metabolic_energy": 4.0})
+    assert r.status_code == 200
+    assert await nutrition_replanner.run_once(session_factory) == 1
+    r = await client.get(f"/nutrition/profiles/{profile_id}/plan")
+    assert abs(r.json()["plan"]["foods"][0]["grams"] - grams / 2) < 0.01
+
+    # 过期计划被一个实例读取后加锁，其它实例跳过，不会重复计算
+    r = await client.patch(f"/foods/{food_id}", json={"metabolic_energy": 2.0})
+    async with session_factory() as first, session_factory() as second:
+        assert len(await NutritionPlanRepository(first).get_stale()) == 1
+        assert await NutritionPlanRepository(second).get_stale() == []
+    assert await nutrition_replanner.run_once(session_factory) == 1
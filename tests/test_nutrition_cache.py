@@ -0,0 +1,79 @@
+from app.nutrition.cache import NutritionPlanCache
+from app.nutrition.schema import (
+    NutritionAchieved,
+    NutritionPlanCreate,
+    NutritionPlanResponse,
+)
+
+
+def _payload(profile_id: int, food_id: int = 1) -> NutritionPlanCreate:
+    return NutritionPlanCreate.model_validate(
+        {"profile_id": profile_id, "foods": [{"food_id": food_id}], "goal": {}}
+    )
+
+
+def _plan(profile_id: int) -> NutritionPlanResponse:
+    return NutritionPlanResponse(
+        profile_id=profile_id,
+        weight_g=1000,
+        daily_kcals_target=100,
+        total_grams=10,
+        total_kcals=100,
+        foods=[],
+        achieved=NutritionAchieved(),
+        notes=[],
+    )
+
+
+def test_lru_eviction_is_bounded():
+    cache = NutritionPlanCache(maxsize=2, ttl_seconds=60)
+    keys = [cache.key_for(_payload(pid)) for pid in (1, 2, 3)]
+    cache.put(keys[0], _payload(1), _plan(1))
+    cache.put(keys[1], _payload(2), _plan(2))
+    assert cache.get(keys[0]) is not None  # 1 变为最近使用
+
+    cache.put(keys[2], _payload(3), _plan(3))
+    assert len(cache) == 2
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+
+
+def test_invalidation_is_precise():
+    cache = NutritionPlanCache(maxsize=10, ttl_seconds=60)
+    a, b = _payload(1, food_id=7), _payload(2, food_id=8)
+    cache.put(cache.key_for(a), a, _plan(1))
+    cache.put(cache.key_for(b), b, _plan(2))
+
+    cache.invalidate_food(7)
+    assert cache.get(cache.key_for(a)) is None
+    assert cache.get(cache.key_for(b)) is not None
+
+    cache.invalidate_profile(2)
+    assert len(cache) == 0
+
+
+def test_stale_result_is_not_stored():
+    cache = NutritionPlanCache(maxsize=10, ttl_seconds=60)
+    payload = _payload(1)
+    key = cache.key_for(payload)
+    cache.invalidate_profile(1)  # 计算期间发生写入
+    cache.put(key, payload, _plan(1))
+    assert len(cache) == 0
+
+
+def test_version_memory_is_bounded():
+    cache = NutritionPlanCache(maxsize=10, ttl_seconds=60)
+    slots = len(cache._profile_versions)
+    for ref_id in range(50_000):
+        cache.invalidate_profile(ref_id)
+        cache.invalidate_food(ref_id)
+    assert len(cache._profile_versions) == len(cache._food_versions) == slots
+
+    # 同槽的 id 一并失效：不会返回旧结果，也不会残留无法命中的条目
+    a, b = _payload(1), _payload(1 + slots)
+    key_b = cache.key_for(b)
+    cache.put(cache.key_for(a), a, _plan(1))
+    cache.invalidate_profile(1 + slots)
+    assert len(cache) == 0
+    cache.put(key_b, b, _plan(1 + slots))
+    assert len(cache) == 0
@@ -0,0 +1,114 @@
+import random
+
+from app.foods.model import Food
+from app.nutrition.catalog import FoodCatalog
+
+
+def _food(food_id: int, price: float | None, kcals_per_g: float = 4.0) -> Food:
+    return Food(
+        id=food_id,
+        name=f"catalog-{food_id}",
+        brand="b",
+        metabolic_energy=kcals_per_g,
+        price=price,
+        weight=1.0,
+    )
+
+
+def _ranked(catalog: FoodCatalog, **targets) -> list[int]:
+    return [food.food_id for food in catalog.cheapest(daily_kcals=400, **targets)]
+
+
+def test_catalog_ranks_by_cost_per_kcal_and_updates_incrementally():
+    catalog = FoodCatalog(ttl_seconds=60)
+    # 每千卡成本：1 -> 0.0025，2 -> 0.005，3 -> 0.0025（热量密度翻倍），4 缺价格
+    catalog.load(
+        [_food(1, 10), _food(2, 20), _food(3, 20, kcals_per_g=8.0), _food(4, None)]
+    )
+    assert len(catalog) == 3
+    assert _ranked(catalog)[-1] == 2
+
+    version = catalog.version
+    catalog.upsert(_food(2, 1))
+    catalog.upsert(_food(5, 30))
+    catalog.remove(3)
+    assert _ranked(catalog) == [2, 1, 5]
+    assert catalog.version == version + 3
+
+
+def test_catalog_filters_by_macro_minimums():
+    catalog = FoodCatalog(ttl_seconds=60)
+    lean, fatty, unknown = _food(1, 20), _food(2, 10), _food(3, 5)
+    lean.protein_g_per_g = 0.4  # 400kcal -> 100g -> 40g 蛋白
+    fatty.protein_g_per_g = 0.1  # 400kcal -> 100g -> 10g 蛋白
+    catalog.load([lean, fatty, unknown])
+
+    assert _ranked(catalog) == [3, 2, 1]
+    assert _ranked(catalog, protein_g=30) == [1]
+    assert next(catalog.cheapest(daily_kcals=400, protein_g=30)).protein_g_per_g == 0.4
+
+
+def test_catalog_mixes_two_foods_to_meet_macro_minimums():
+    catalog = FoodCatalog(ttl_seconds=60)
+    lean, filler = _food(1, 40), _food(2, 10)
+    lean.protein_g_per_g = 0.4  # 每千卡 0.1g 蛋白
+    filler.protein_g_per_g = 0.0
+    catalog.load([lean, filler])
+
+    # 400kcal 需 20g 蛋白（每千卡 0.05g）：两者各提供一半热量比单独喂 lean 更省
+    baskets = catalog.cheapest_baskets(daily_kcals=400, limit=3, protein_g=20)
+    assert [[(f.food_id, share) for f, share in b.foods] for b in baskets] == [
+        [(2, 0.5), (1, 0.5)],
+        [(1, 1.0)],
+    ]
+    assert baskets[0].cost_per_kcal < baskets[1].cost_per_kcal
+
+    single = catalog.cheapest_baskets(
+        daily_kcals=400, limit=3, max_foods=1, protein_g=20
+    )
+    assert [[f.food_id for f, _ in b.foods] for b in single] == [[1]]
+    # 没有宏量下限时只返回单一食品
+    assert len(catalog.cheapest_baskets(daily_kcals=400, limit=3)) == 2
+
+
+def test_catalog_macro_index_matches_full_scan():
+    rng = random.Random(7)
+    foods = []
+    for food_id in range(1, 401):
+        food = _food(food_id, rng.uniform(1, 100), kcals_per_g=rng.uniform(1, 5))
+        food.protein_g_per_g = rng.choice([None, rng.uniform(0, 0.5)])
+        food.fat_g_per_g = rng.choice([None, rng.uniform(0, 0.3)])
+        foods.append(food)
+    catalog = FoodCatalog(ttl_seconds=60)
+    catalog.load(foods)
+    # 增量维护后索引与成本序保持一致
+    for food in foods[:40]:
+        food.price = rng.uniform(1, 100)
+        food.protein_g_per_g = rng.choice([None, rng.uniform(0, 0.5)])
+        catalog.upsert(food)
+    for food in foods[40:60]:
+        catalog.remove(food.id)
+    live = foods[:40] + foods[60:]
+
+    def brute_force(**targets) -> list[int]:
+        rows = []
+        for food in live:
+            row = FoodCatalog._row_of(food)
+            if all(
+                getattr(row, f"{macro}_per_g") is not None
+                and getattr(row, f"{macro}_per_g") / row.kcals_per_g >= target / 400
+                for macro, target in targets.items()
+            ):
+                rows.append(row)
+        return [row.food_id for row in sorted(rows, key=lambda r: r.cost_per_kcal)]
+
+    # 宽松（按成本扫描）、苛刻（走宏量索引）、不可行（直接结束）
+    for targets in (
+        {"protein_g": 5},
+        {"protein_g": 40},
+        {"protein_g": 30, "fat_g": 20},
+        {"fat_g": 29},
+        {"protein_g": 1000},
+    ):
+        assert _ranked(catalog, **targets) == brute_force(**targets)
+    assert _ranked(catalog, protein_g=1000) == []
@@ -0,0 +1,87 @@
+import random
+import time
+
+import pytest
+
+from app.nutrition.solver import _nnls, solve_macro_allocation
+
+KCALS_PER_G = [1.2, 1.3, 8.8]
+DENSITIES = [
+    [0.25, 0.03, None],  # 蛋白
+    [0.05, 0.003, 1.0],  # 脂肪
+    [0.0, 0.28, 0.0],  # 碳水
+]
+
+
+def _kcals(grams: list[float]) -> float:
+    return sum(g * k for g, k in zip(grams, KCALS_PER_G))
+
+
+def test_solver_hits_kcals_and_reachable_macros():
+    # 目标由 [160, 100, 10] 克精确构造，应被完整复现
+    grams = [160.0, 100.0, 10.0]
+    targets = [sum(g * (d or 0.0) for g, d in zip(grams, row)) for row in DENSITIES]
+    solution = solve_macro_allocation(
+        target_kcals=_kcals(grams),
+        kcals_per_g=KCALS_PER_G,
+        fixed_grams=[0, 0, 0],
+        ratios=[1, 1, 1],
+        densities=DENSITIES,
+        targets=targets,
+    )
+    assert solution.converged
+    assert all(abs(a - b) < 0.5 for a, b in zip(solution.grams, grams))
+
+
+def test_solver_respects_fixed_grams_and_non_negativity():
+    solution = solve_macro_allocation(
+        target_kcals=600,
+        kcals_per_g=KCALS_PER_G,
+        fixed_grams=[0, 50, 0],
+        ratios=[1, 1, 1],
+        densities=DENSITIES,
+        targets=[80, 5, 0],
+    )
+    assert solution.grams[1] == 50
+    assert all(g >= 0 for g in solution.grams)
+    assert abs(_kcals(solution.grams) - 600) < 1e-6
+
+
+@pytest.mark.benchmark
+def test_solver_benchmark():
+    """典型 3–8 个食品的篮子的平均单次求解耗时（目标低于 1ms）"""
+    rng = random.Random(42)
+    for n in (3, 5, 8):
+        cases = [
+            (
+                [rng.uniform(0.8, 5.0) for _ in range(n)],
+                [[rng.uniform(0.0, 0.4) for _ in range(n)] for _ in range(3)],
+            )
+            for _ in range(200)
+        ]
+        started = time.perf_counter()
+        for kcals_per_g, densities in cases:
+            solution = solve_macro_allocation(
+                target_kcals=800,
+                kcals_per_g=kcals_per_g,
+                fixed_grams=[0.0] * n,
+                ratios=[1.0] * n,
+                densities=densities,
+                targets=[60, 25, 50],
+            )
+            assert all(g >= 0 for g in solution.grams)
+        elapsed = (time.perf_counter() - started) / len(cases)
+        print(f"\n{n} foods: {elapsed * 1e6:.0f}us per solve")
+
+
+def test_nnls_reports_iteration_cap_as_not_converged():
+    # 最优解两个分量都为正，一轮迭代只能放入一个变量
+    rows = [[1.0, 0.0], [0.0, 1.0]]
+    deadline = time.perf_counter() + 10
+    x, converged = _nnls(rows, [1.0, 2.0], deadline=deadline, max_iter=1)
+    assert not converged
+    x, converged = _nnls(rows, [1.0, 2.0], deadline=deadline)
+    assert converged
+    assert x == pytest.approx([1.0, 2.0])
+    # 单变量问题一轮即到最优，达到上限时仍按 KKT 条件判定为收敛
+    assert _nnls([[2.0]], [4.0], deadline=deadline) == ([2.0], True)
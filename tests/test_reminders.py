@@ -0,0 +1,482 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.reminders.dispatcher import ReminderDispatcher
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+async def _create_reminder(client, profile_id: int, title: str, due_in: timedelta):
+    due_date = datetime.now(tz=timezone.utc) + due_in
+    r = await client.post(
+        "/reminders/",
+        params={
+            "title": title,
+            "type": "vaccine",
+            "due_date": due_date.isoformat(),
+            "profile_id": profile_id,
+        },
+    )
+    assert r.status_code == 201
+    return r.json()["id"]
+
+
+def _dispatcher(dispatched: list[int], *, delay: float = 0.0) -> ReminderDispatcher:
+    async def collect(reminder):
+        await asyncio.sleep(delay)
+        dispatched.append(reminder.id)
+
+    dispatcher = ReminderDispatcher(window_seconds=60, batch_size=3)
+    dispatcher.handlers = [collect]
+    return dispatcher
+
+
+async def test_due_reminders_dispatched_once(client, session_factory, create_profile):
+    profile_id = await create_profile("reminders-dispatch")
+    overdue = await _create_reminder(
+        client, profile_id, "dispatch-overdue", timedelta(minutes=-5)
+    )
+    await _create_reminder(client, profile_id, "dispatch-later", timedelta(hours=1))
+    done = await _create_reminder(
+        client, profile_id, "dispatch-done", timedelta(minutes=-1)
+    )
+    r = await client.patch(f"/reminders/{done}", json={"is_done": True})
+    assert r.status_code == 200
+
+    dispatched: list[int] = []
+    dispatcher = _dispatcher(dispatched)
+    assert await dispatcher.run_once(session_factory) == 1
+    assert dispatched == [overdue]
+    # 下一次处理时间为窗口结束（1 小时后的提醒不在窗口内）
+    assert 0 < dispatcher.seconds_until_next() <= 60
+    assert await dispatcher.run_once(session_factory) == 0
+
+    r = await client.get("/reminders/dispatch-overdue")
+    assert r.json()["dispatched_at"] is not None
+
+    # 改期后清空派发时间，重新到期后再次派发
+    due_date = datetime.now(tz=timezone.utc) - timedelta(seconds=1)
+    r = await client.patch(
+        f"/reminders/{overdue}", json={"due_date": due_date.isoformat()}
+    )
+    assert r.json()["dispatched_at"] is None
+    dispatcher.notify()
+    assert await dispatcher.run_once(session_factory) == 1
+    assert dispatched == [overdue, overdue]
+
+
+async def test_concurrent_dispatchers_skip_locked_rows(
+    client, session_factory, create_profile
+):
+    profile_id = await create_profile("reminders-concurrent")
+    ids = [
+        await _create_reminder(
+            client, profile_id, f"concurrent-{i}", timedelta(seconds=-i - 1)
+        )
+        for i in range(8)
+    ]
+
+    dispatched: list[int] = []
+    workers = [_dispatcher(dispatched, delay=0.01) for _ in range(3)]
+    counts = await asyncio.gather(*(w.run_once(session_factory) for w in workers))
+    assert sum(counts) == 8
+    assert sorted(dispatched) == sorted(ids)
+
+
+async def test_failing_reminder_isolated_and_retried_with_backoff(
+    client, session_factory, engine, create_profile
+):
+    profile_id = await create_profile("reminders-failing")
+    ids = [
+        await _create_reminder(
+            client, profile_id, f"failing-{i}", timedelta(seconds=-i - 1)
+        )
+        for i in range(3)
+    ]
+    broken = ids[1]
+    dispatched: list[int] = []
+
+    async def collect(reminder):
+        if reminder.id == broken:
+            raise RuntimeError("push service unavailable")
+        dispatched.append(reminder.id)
+
+    dispatcher = ReminderDispatcher(
+        window_seconds=60, batch_size=3, retry_seconds=3600, max_attempts=2
+    )
+    dispatcher.handlers = [collect]
+    assert await dispatcher.run_once(session_factory) == 3
+    # 同批其它提醒照常派发，失败的一条记录次数与原因
+    assert sorted(dispatched) == sorted(set(ids) - {broken})
+    r = await client.get("/reminders/failing-1")
+    data = r.json()
+    assert data["dispatched_at"] is None
+    assert data["dispatch_attempts"] == 1
+    assert "push service unavailable" in data["dispatch_error"]
+
+    # 退避期间不重试
+    dispatcher.notify()
+    assert await dispatcher.run_once(session_factory) == 0
+
+    # 到达重试时间后重试，失败 max_attempts 次后不再派发
+    dispatcher.retry_seconds = 0
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("UPDATE reminders SET dispatch_retry_at = now() WHERE id = :id"),
+            {"id": broken},
+        )
+    dispatcher.notify()
+    assert await dispatcher.run_once(session_factory) == 1
+    dispatcher.notify()
+    assert await dispatcher.run_once(session_factory) == 0
+    r = await client.get("/reminders/failing-1")
+    assert r.json()["dispatch_attempts"] == 2
+
+    # 改期后清空失败记录，重新进入派发队列
+    due_date = datetime.now(tz=timezone.utc) - timedelta(seconds=1)
+    r = await client.patch(
+        f"/reminders/{broken}", json={"due_date": due_date.isoformat()}
+    )
+    assert (r.json()["dispatch_attempts"], r.json()["dispatch_error"]) == (0, None)
+    dispatcher.handlers = [lambda reminder: asyncio.sleep(0)]
+    dispatcher.notify()
+    assert await dispatcher.run_once(session_factory) == 1
+
+
+async def test_recurring_reminder_advances_on_complete(client, create_profile):
+    profile_id = await create_profile("reminders-recurring")
+    r = await client.post(
+        "/reminders/",
+        params={
+            "title": "recurring-deworm",
+            "type": "deworm",
+            "due_date": "2024-01-31T09:00:00+00:00",
+            "profile_id": profile_id,
+            "recurrence_rule": "FREQ=MONTHLY;COUNT=3",
+        },
+    )
+    assert r.status_code == 201
+    reminder_id = r.json()["id"]
+
+    r = await client.get(
+        "/reminders/occurrences",
+        params={
+            "start": "2024-02-01T00:00:00+00:00",
+            "end": "2025-01-01T00:00:00+00:00",
+            "profile_id": profile_id,
+        },
+    )
+    assert r.status_code == 200
+    assert [(o["occurrence_index"], o["due_date"][:10]) for o in r.json()] == [
+        (1, "2024-02-29"),
+        (2, "2024-03-31"),
+    ]
+
+    due_dates = []
+    for _ in range(3):
+        r = await client.post(f"/reminders/{reminder_id}/complete")
+        assert r.status_code == 200
+        due_dates.append((r.json()["due_date"][:10], r.json()["is_done"]))
+    # 数据库中按月推进的结果与展开结果一致（月末取整）；第 3 次完成后结束
+    assert due_dates == [
+        ("2024-02-29", False),
+        ("2024-03-31", False),
+        ("2024-03-31", True),
+    ]
+
+    r = await client.post(f"/reminders/{reminder_id}/complete")
+    assert r.json()["is_done"] is True
+    r = await client.post("/reminders/999006/complete")
+    assert r.status_code == 404
+
+
+async def test_rescheduled_recurring_reminder_keeps_remaining_count(
+    client, create_profile
+):
+    profile_id = await create_profile("reminders-reschedule-count")
+    r = await client.post(
+        "/reminders/",
+        params={
+            "title": "reschedule-count",
+            "type": "deworm",
+            "due_date": "2024-01-10T09:00:00+00:00",
+            "profile_id": profile_id,
+            "recurrence_rule": "FREQ=MONTHLY;COUNT=4",
+        },
+    )
+    reminder_id = r.json()["id"]
+    for _ in range(2):
+        await client.post(f"/reminders/{reminder_id}/complete")
+
+    # 完成 2 次后改期：只剩 2 次，而不是重新计 4 次
+    r = await client.patch(
+        f"/reminders/{reminder_id}", json={"due_date": "2024-06-01T09:00:00+00:00"}
+    )
+    assert r.status_code == 200
+    r = await client.get(
+        "/reminders/occurrences",
+        params={
+            "start": "2024-05-01T00:00:00+00:00",
+            "end": "2025-05-01T00:00:00+00:00",
+            "profile_id": profile_id,
+        },
+    )
+    assert [o["due_date"][:10] for o in r.json()] == ["2024-06-01", "2024-07-01"]
+    for expected in (False, True):
+        r = await client.post(f"/reminders/{reminder_id}/complete")
+        assert r.json()["is_done"] is expected
+
+
+async def test_occurrences_read_reminders_in_pages(client, monkeypatch, create_profile):
+    from app.reminders import service
+
+    monkeypatch.setattr(service, "_OCCURRENCE_PAGE_SIZE", 2)
+    profile_id = await create_profile("reminders-occurrence-pages")
+    for i, rule in enumerate(["FREQ=DAILY", None, "FREQ=WEEKLY", None, "FREQ=DAILY"]):
+        params = {
+            "title": f"occ-page-{i}",
+            "type": "grooming",
+            "due_date": f"2024-05-0{i + 1}T08:00:00+00:00",
+            "profile_id": profile_id,
+        }
+        if rule:
+            params["recurrence_rule"] = rule
+        r = await client.post("/reminders/", params=params)
+        assert r.status_code == 201
+
+    r = await client.get(
+        "/reminders/occurrences",
+        params={
+            "start": "2024-05-01T00:00:00+00:00",
+            "end": "2024-05-08T00:00:00+00:00",
+            "limit": 6,
+        },
+    )
+    assert [(o["title"][-1], o["due_date"][8:10]) for o in r.json()] == [
+        ("0", "01"),
+        ("0", "02"),
+        ("1", "02"),
+        ("0", "03"),
+        ("2", "03"),
+        ("0", "04"),
+    ]
+
+
+async def test_occurrences_merge_and_validate(client, create_profile):
+    profile_id = await create_profile("reminders-occurrences")
+    for title, due_date, rule in (
+        ("occ-weekly", "2024-05-01T08:00:00+00:00", "FREQ=WEEKLY"),
+        ("occ-once", "2024-05-10T08:00:00+00:00", None),
+        ("occ-until", "2024-05-02T08:00:00+00:00", "FREQ=DAILY;UNTIL=20240503"),
+    ):
+        params = {
+            "title": title,
+            "type": "grooming",
+            "due_date": due_date,
+            "profile_id": profile_id,
+        }
+        if rule:
+            params["recurrence_rule"] = rule
+        r = await client.post("/reminders/", params=params)
+        assert r.status_code == 201
+
+    r = await client.get(
+        "/reminders/occurrences",
+        params={
+            "start": "2024-05-01T00:00:00+00:00",
+            "end": "2024-05-16T00:00:00+00:00",
+        },
+    )
+    assert [(o["title"], o["due_date"][:10]) for o in r.json()] == [
+        ("occ-weekly", "2024-05-01"),
+        ("occ-until", "2024-05-02"),
+        ("occ-until", "2024-05-03"),
+        ("occ-weekly", "2024-05-08"),
+        ("occ-once", "2024-05-10"),
+        ("occ-weekly", "2024-05-15"),
+    ]
+
+    r = await client.post(
+        "/reminders/",
+        params={
+            "title": "occ-invalid",
+            "type": "grooming",
+            "due_date": "2024-05-01T08:00:00+00:00",
+            "profile_id": profile_id,
+            "recurrence_rule": "FREQ=HOURLY",
+        },
+    )
+    assert r.status_code == 400
+    r = await client.get(
+        "/reminders/occurrences",
+        params={
+            "start": "2024-01-01T00:00:00+00:00",
+            "end": "2026-01-01T00:00:00+00:00",
+        },
+    )
+    assert r.status_code == 400
+
+
+async def _collect_pages(client, path: str, params: dict) -> list[str]:
+    titles, after = [], {}
+    while True:
+        r = await client.get(path, params={**params, **after})
+        assert r.status_code == 200
+        page = r.json()
+        titles += [item["title"] for item in page["items"]]
+        if page["next_after_id"] is None:
+            assert page["next_after_due_date"] is None
+            return titles
+        after = {
+            "after_due_date": page["next_after_due_date"],
+            "after_id": page["next_after_id"],
+        }
+
+
+async def test_upcoming_and_overdue_keyset_pages(client, create_profile):
+    cat = await create_profile("reminders-home-cat")
+    dog = await create_profile("reminders-home-dog")
+    # 相同到期时间的提醒按 id 翻页，不重复、不遗漏
+    same_due = timedelta(days=2)
+    for i in range(3):
+        await _create_reminder(client, cat, f"home-upcoming-{i}", same_due)
+    await _create_reminder(client, cat, "home-tomorrow", timedelta(days=1))
+    await _create_reminder(client, cat, "home-next-month", timedelta(days=30))
+    await _create_reminder(client, dog, "home-dog-upcoming", timedelta(days=3))
+    await _create_reminder(client, cat, "home-overdue-old", timedelta(days=-3))
+    await _create_reminder(client, dog, "home-overdue-new", timedelta(hours=-1))
+    done = await _create_reminder(client, dog, "home-overdue-done", timedelta(days=-2))
+    r = await client.patch(f"/reminders/{done}", json={"is_done": True})
+    assert r.status_code == 200
+
+    assert await _collect_pages(
+        client, "/reminders/upcoming", {"profile_id": cat, "limit": 2}
+    ) == [
+        "home-tomorrow",
+        "home-upcoming-0",
+        "home-upcoming-1",
+        "home-upcoming-2",
+    ]
+    assert await _collect_pages(
+        client, "/reminders/upcoming", {"profile_id": [cat, dog], "days": 60}
+    ) == [
+        "home-tomorrow",
+        "home-upcoming-0",
+        "home-upcoming-1",
+        "home-upcoming-2",
+        "home-dog-upcoming",
+        "home-next-month",
+    ]
+    assert await _collect_pages(client, "/reminders/overdue", {"limit": 1}) == [
+        "home-overdue-old",
+        "home-overdue-new",
+    ]
+    assert await _collect_pages(client, "/reminders/overdue", {"profile_id": dog}) == [
+        "home-overdue-new"
+    ]
+
+    r = await client.get("/reminders/overdue", params={"after_id": 1})
+    assert r.status_code == 400
+
+
+async def test_pending_pages_use_partial_indexes(engine):
+    async with engine.begin() as conn:
+        await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for sql, index in [
+            (
+                "SELECT * FROM reminders WHERE NOT is_done AND profile_id = 1 "
+                "AND due_date < now() AND (due_date, id) > (now() - interval '1 day', 5) "
+                "ORDER BY due_date, id LIMIT 51",
+                "idx_reminders_pending_profile_due",
+            ),
+            (
+                "SELECT * FROM reminders WHERE NOT is_done AND due_date >= now() "
+                "AND due_date < now() + interval '7 days' ORDER BY due_date, id LIMIT 51",
+                "idx_reminders_pending_due",
+            ),
+        ]:
+            plan = (await conn.execute(text(f"EXPLAIN {sql}"))).scalars()
+            assert index in "\n".join(plan)
+
+
+async def test_bulk_complete_reschedule_delete(client, create_profile):
+    cat = await create_profile("reminders-bulk-cat")
+    dog = await create_profile("reminders-bulk-dog")
+    once = [
+        await _create_reminder(client, cat, f"bulk-once-{i}", timedelta(days=i + 1))
+        for i in range(3)
+    ]
+    r = await client.post(
+        "/reminders/",
+        params={
+            "title": "bulk-monthly",
+            "type": "vaccine",
+            "due_date": "2030-01-31T08:00:00+00:00",
+            "profile_id": cat,
+            "recurrence_rule": "FREQ=MONTHLY;COUNT=3",
+        },
+    )
+    monthly = r.json()["id"]
+    dog_reminder = await _create_reminder(client, dog, "bulk-dog", timedelta(days=1))
+
+    r = await client.post(
+        "/reminders/bulk/complete", json={"ids": [once[0], once[1], monthly]}
+    )
+    assert r.status_code == 200
+    completed = {item["id"]: item for item in r.json()}
+    assert set(completed) == {once[0], once[1], monthly}
+    assert completed[once[0]]["is_done"] is True
+    assert completed[monthly]["is_done"] is False
+    assert completed[monthly]["due_date"].startswith("2030-02-28T08:00:00")
+    # 已完成的提醒不再匹配
+    r = await client.post("/reminders/bulk/complete", json={"ids": [once[0]]})
+    assert r.json() == []
+
+    # 整体平移一只宠物未完成的提醒，重复提醒以新的到期时间重新计数
+    r = await client.post(
+        "/reminders/bulk/reschedule",
+        json={"profile_id": cat, "is_done": False, "shift_days": 7},
+    )
+    moved = {item["id"]: item for item in r.json()}
+    assert set(moved) == {once[2], monthly}
+    assert moved[monthly]["due_date"].startswith("2030-03-07T08:00:00")
+    assert moved[monthly]["occurrence_index"] == 0
+    # COUNT=3 已完成 1 次：改期后只剩 2 次
+    r = await client.get(
+        "/reminders/occurrences",
+        params={
+            "start": "2030-03-01T00:00:00+00:00",
+            "end": "2031-03-01T00:00:00+00:00",
+            "profile_id": cat,
+        },
+    )
+    assert [o["due_date"][:10] for o in r.json() if o["reminder_id"] == monthly] == [
+        "2030-03-07",
+        "2030-04-07",
+    ]
+    r = await client.post(
+        "/reminders/bulk/reschedule",
+        json={"ids": [dog_reminder], "due_date": "2031-01-01T00:00:00+00:00"},
+    )
+    assert r.json()[0]["due_date"].startswith("2031-01-01T00:00:00")
+
+    r = await client.post(
+        "/reminders/bulk/delete", json={"profile_id": cat, "is_done": True}
+    )
+    assert sorted(r.json()["deleted_ids"]) == sorted(once[:2])
+    r = await client.get("/reminders/bulk-once-0")
+    assert r.status_code == 404
+    r = await client.get("/reminders/bulk-dog")
+    assert r.status_code == 200
+
+    # 必须限定 ids 或 profile_id；改期目标二选一
+    r = await client.post("/reminders/bulk/delete", json={"is_done": True})
+    assert r.status_code == 422
+    r = await client.post(
+        "/reminders/bulk/reschedule",
+        json={"profile_id": cat, "shift_days": 1, "due_date": "2031-01-01T00:00:00Z"},
+    )
+    assert r.status_code == 422
@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.reminders.recurrence import (
+    RecurrenceRule,
+    iter_occurrences,
+    occurrence_at,
+    parse_rrule,
+)
+
+_START = datetime(2024, 1, 31, 9, tzinfo=timezone.utc)
+
+
+def test_parse_rrule_subset():
+    assert parse_rrule("RRULE:FREQ=WEEKLY;INTERVAL=2") == RecurrenceRule(0, 14)
+    assert parse_rrule("freq=yearly;count=3") == RecurrenceRule(12, 0, count=3)
+    rule = parse_rrule("FREQ=MONTHLY;UNTIL=20240430")
+    assert rule.until == datetime(2024, 4, 30, 23, 59, 59, 999999, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        "FREQ=HOURLY",
+        "FREQ=DAILY;BYDAY=MO",
+        "FREQ=DAILY;INTERVAL=0",
+        "FREQ=DAILY;COUNT=2;UNTIL=20240101",
+        "FREQ=DAILY;UNTIL=tomorrow",
+        "FREQ=DAILY;FREQ=WEEKLY",
+    ],
+)
+def test_parse_rrule_rejects_unsupported(rule):
+    with pytest.raises(ValueError):
+        parse_rrule(rule)
+
+
+def test_monthly_occurrences_clamp_to_month_end():
+    rule = RecurrenceRule(months=1, days=0)
+    assert [occurrence_at(_START, rule, k).date().isoformat() for k in range(4)] == [
+        "2024-01-31",
+        "2024-02-29",
+        "2024-03-31",
+        "2024-04-30",
+    ]
+
+
+def test_iter_occurrences_only_expands_window():
+    rule = RecurrenceRule(months=0, days=1)
+    window = list(
+        iter_occurrences(
+            _START,
+            rule,
+            window_start=datetime(2030, 1, 1, tzinfo=timezone.utc),
+            window_end=datetime(2030, 1, 3, tzinfo=timezone.utc),
+        )
+    )
+    assert [at.isoformat() for _, at in window] == [
+        "2030-01-01T09:00:00+00:00",
+        "2030-01-02T09:00:00+00:00",
+    ]
+    assert window[0][0] == (datetime(2030, 1, 1, tzinfo=timezone.utc) - _START).days + 1
+
+    limited = RecurrenceRule(months=12, days=0, count=2)
+    end = datetime(2100, 1, 1, tzinfo=timezone.utc)
+    assert [k for k, _ in iter_occurrences(_START, limited, window_end=end)] == [0, 1]
+    assert list(iter_occurrences(_START, limited, first_index=2, window_end=end)) == []
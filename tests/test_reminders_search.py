@@ -0,0 +1,179 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import col, or_, select
+
+from app.reminders import ngram
+from app.reminders.model import Reminder
+from app.reminders.repository import ReminderRepository
+from app.reminders.search import backfill_search_tokens
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+_BENCH_ROWS = 20_000
+
+
+def test_index_tokens_cover_query_tokens():
+    tokens = ngram.index_tokens("狂犬疫苗 第二针", "Rabies shot")
+    assert {"狂", "疫苗", "犬疫", "第二", "ra", "sh", "s"} <= set(tokens)
+    # 原文任意子串的查询 token 都包含在索引 token 中
+    for term in ["疫苗", "苗", "犬疫苗", "RABIES", "bies sh"]:
+        assert set(ngram.query_tokens([term])) <= set(tokens)
+    assert ngram.query_tokens(["驱虫"]) == ["驱虫"]
+    assert ngram.query_tokens(["ＡＢ"]) == ["ab"]
+
+
+def test_like_pattern_escapes_wildcards():
+    assert ngram.like_pattern("50%_off") == "%50\\%\\_off%"
+    assert ngram.split_terms(" 疫苗  驱虫 疫苗 ") == ["疫苗", "驱虫"]
+
+
+async def _create(client, profile_id: int, title: str, description: str | None = None):
+    params = {
+        "title": title,
+        "type": "vaccine",
+        "due_date": (datetime.now(tz=timezone.utc) + timedelta(days=1)).isoformat(),
+        "profile_id": profile_id,
+    }
+    if description:
+        params["description"] = description
+    r = await client.post("/reminders/", params=params)
+    assert r.status_code == 201
+    return r.json()["id"]
+
+
+async def test_ngram_search_ranks_title_matches(
+    client, session_factory, create_profile
+):
+    profile_id = await create_profile("reminders-search")
+    in_description = await _create(client, profile_id, "宠物医院复诊", "顺便打疫苗")
+    late_in_title = await _create(client, profile_id, "第二次狂犬疫苗")
+    early_in_title = await _create(client, profile_id, "疫苗加强针")
+    await _create(client, profile_id, "体内驱虫", "每月一次")
+    # 二字 token 都在，但不是连续子串：由 ILIKE 复核排除
+    await _create(client, profile_id, "疫情期间别忘了买猫苗条粮")
+
+    r = await client.get("/reminders/search", params={"keyword": "疫苗"})
+    assert r.status_code == 200
+    assert [item["id"] for item in r.json()] == [
+        early_in_title,
+        late_in_title,
+        in_description,
+    ]
+
+    # 单字、多词（需全部命中）
+    r = await client.get("/reminders/search", params={"keyword": "虫"})
+    assert [item["title"] for item in r.json()] == ["体内驱虫"]
+    r = await client.get("/reminders/search", params={"keyword": "疫苗 复诊"})
+    assert [item["id"] for item in r.json()] == [in_description]
+
+    # 修改描述后索引随之更新
+    r = await client.patch(f"/reminders/{in_description}", json={"description": "洗澡"})
+    assert r.status_code == 200
+    r = await client.get("/reminders/search", params={"keyword": "疫苗", "limit": 5})
+    assert in_description not in [item["id"] for item in r.json()]
+
+    # 列表搜索同样走 n-gram 索引
+    async with session_factory() as session:
+        reminders = await ReminderRepository(session).get_all(search="驱虫")
+    assert [reminder.title for reminder in reminders] == ["体内驱虫"]
+
+    # trgm 模式只搜索标题
+    r = await client.get(
+        "/reminders/search", params={"keyword": "每月", "mode": "trgm"}
+    )
+    assert r.json() == []
+    r = await client.get("/reminders/search", params={"keyword": "x", "mode": "bad"})
+    assert r.status_code == 422
+
+
+async def test_backfill_indexes_rows_without_tokens(
+    client, session_factory, engine, create_profile
+):
+    profile_id = await create_profile("reminders-search")
+    reminder_id = await _create(client, profile_id, "Deworming 驱虫")
+    async with engine.begin() as conn:
+        await conn.execute(text("UPDATE reminders SET search_tokens = '{}'"))
+
+    class _Database:
+        pass
+
+    database = _Database()
+    database.session_factory = session_factory
+    assert await backfill_search_tokens(database) == 1  # type: ignore[arg-type]
+    assert await backfill_search_tokens(database) == 0  # type: ignore[arg-type]
+
+    r = await client.get("/reminders/search", params={"keyword": "deworm"})
+    assert [item["id"] for item in r.json()] == [reminder_id]
+
+
+async def _ilike_title_or_description(repository: ReminderRepository, keyword: str):
+    """原 get_all 的搜索条件：标题或描述 ILIKE，描述上没有索引"""
+    pattern = f"%{keyword}%"
+    statement = select(Reminder).where(
+        or_(
+            col(Reminder.title).ilike(pattern), col(Reminder.description).ilike(pattern)
+        )
+    )
+    return list((await repository.session.exec(statement)).all())
+
+
+@pytest.mark.benchmark
+async def test_search_latency_benchmark(
+    client, session_factory, engine, create_profile
+):
+    """对比 ILIKE（trgm 仅标题 / 标题+描述）与 n-gram 索引的短词搜索延迟（-s 查看结果）"""
+    profile_id = await create_profile("reminders-search")
+    rng = random.Random(23)
+    words = ["疫苗", "洗澡", "体检", "复诊", "剪指甲", "买猫粮", "绝育", "狂犬"]
+    fillers = "的了在是我有和就不人都一上也很到说要去你会着没看好自己这"
+    rows = []
+    for _ in range(_BENCH_ROWS):
+        # 约 0.5% 的提醒与驱虫有关
+        word = "驱虫" if rng.random() < 0.005 else rng.choice(words)
+        title = word + "".join(rng.choices(fillers, k=6))
+        description = "".join(rng.choices(fillers, k=20)) + rng.choice(words)
+        rows.append(
+            {
+                "title": title,
+                "description": description,
+                "tokens": ngram.index_tokens(title, description),
+                "profile_id": profile_id,
+            }
+        )
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO reminders (title, type, due_date, is_done, description, "
+                "search_tokens, profile_id, occurrence_index, created_at, updated_at) "
+                "VALUES (:title, 'bench', now(), false, :description, :tokens, "
+                ":profile_id, 0, now(), now())"
+            ),
+            rows,
+        )
+        await conn.execute(text("ANALYZE reminders"))
+
+    async def timed(search) -> tuple[float, list[int]]:
+        async with session_factory() as session:
+            repository = ReminderRepository(session)
+            started = time.perf_counter()
+            for _ in range(5):
+                found = await search(repository)
+            return (time.perf_counter() - started) / 5, sorted(r.id for r in found)
+
+    trgm_s, _ = await timed(lambda repo: repo.search_by_title_trgm("驱虫", limit=500))
+    ilike_s, expected = await timed(
+        lambda repo: _ilike_title_or_description(repo, "驱虫")
+    )
+    ngram_s, found = await timed(lambda repo: repo.search_ngram("驱虫", limit=500))
+    print(
+        f"\n{len(expected)} matches in {_BENCH_ROWS} reminders"
+        f"\ntrgm title ILIKE: {trgm_s * 1e3:.2f}ms"
+        f"\ntitle+description ILIKE: {ilike_s * 1e3:.2f}ms"
+        f"\nngram GIN: {ngram_s * 1e3:.2f}ms"
+    )
+    assert 0 < len(found) < 500
+    assert found == expected
@@ -0,0 +1,414 @@
+import pytest
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+async def _create_weights(client, profile_id: int, readings) -> None:
+    for measured_at, weight_g in readings:
+        r = await client.post(
+            "/weights/",
+            json={
+                "profile_id": profile_id,
+                "weight_g": weight_g,
+                "measured_at": measured_at,
+            },
+        )
+        assert r.status_code == 201
+
+
+async def test_weight_buckets_aggregate_in_sql(client, create_profile):
+    profile_id = await create_profile("weights-buckets")
+    await _create_weights(
+        client,
+        profile_id,
+        [
+            ("2024-01-01T20:00:00+00:00", 5200),
+            ("2024-01-01T08:00:00+00:00", 5000),
+            ("2024-01-02T08:00:00+00:00", 5100),
+            ("2024-02-10T08:00:00+00:00", 5400),
+        ],
+    )
+
+    r = await client.get(
+        f"/weights/by-profile/{profile_id}/buckets", params={"interval": "month"}
+    )
+    assert r.status_code == 200
+    buckets = r.json()
+    assert [b["count"] for b in buckets] == [3, 1]
+    assert buckets[0]["bucket_start"].startswith("2024-01-01T00:00:00")
+    assert (buckets[0]["min_g"], buckets[0]["max_g"]) == (5000, 5200)
+    assert buckets[0]["avg_g"] == 5100.0
+    assert buckets[0]["last_g"] == 5100
+
+    # 按上海时区，UTC 20:00 属于次日
+    r = await client.get(
+        f"/weights/by-profile/{profile_id}/buckets",
+        params={
+            "interval": "day",
+            "tz": "Asia/Shanghai",
+            "start": "2024-01-01T00:00:00+00:00",
+            "end": "2024-02-01T00:00:00+00:00",
+        },
+    )
+    assert r.status_code == 200
+    assert [(b["count"], b["last_g"]) for b in r.json()] == [(1, 5000), (2, 5100)]
+
+
+async def test_weight_buckets_reject_invalid_params(client, create_profile):
+    profile_id = await create_profile("weights-buckets-invalid")
+    url = f"/weights/by-profile/{profile_id}/buckets"
+
+    r = await client.get(url, params={"interval": "hour"})
+    assert r.status_code == 422
+    for tz in ("Mars/Base", "../etc/localtime"):
+        r = await client.get(url, params={"tz": tz})
+        assert r.status_code == 400
+    r = await client.get(url)
+    assert r.json() == []
+
+
+async def test_weight_series_downsampled_with_lttb(client, create_profile):
+    profile_id = await create_profile("weights-series")
+    # 平稳读数中间夹一个尖峰，按时间桶取平均会被抹平，LTTB 应保留
+    readings = [
+        (f"2024-03-{day:02d}T08:00:00+00:00", 9000 if day == 11 else 5000 + day)
+        for day in range(1, 31)
+    ]
+    await _create_weights(client, profile_id, readings)
+    url = f"/weights/by-profile/{profile_id}/series"
+
+    r = await client.get(url, params={"max_points": 5})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total_points"] == 30
+    weights = [p["weight_g"] for p in data["points"]]
+    assert len(weights) == 5
+    assert weights[0] == 5001 and weights[-1] == 5030
+    assert 9000 in weights
+
+    r = await client.get(
+        url,
+        params={
+            "start": "2024-03-05T00:00:00+00:00",
+            "end": "2024-03-08T00:00:00+00:00",
+        },
+    )
+    assert [p["weight_g"] for p in r.json()["points"]] == [5005, 5006, 5007]
+
+    r = await client.get(url, params={"max_points": 2})
+    assert r.status_code == 422
+
+
+async def test_weight_summary_tracks_backdated_updates_and_deletes(
+    client, create_profile
+):
+    profile_id = await create_profile("weights-summary")
+    url = f"/weights/by-profile/{profile_id}/summary"
+    r = await client.get(url)
+    assert r.status_code == 404
+
+    await _create_weights(
+        client,
+        profile_id,
+        [
+            ("2024-03-01T08:00:00+00:00", 5000),
+            ("2024-03-05T08:00:00+00:00", 5300),
+            # 补录的历史读数不影响最新值
+            ("2024-02-01T08:00:00+00:00", 4800),
+        ],
+    )
+    summary = (await client.get(url)).json()
+    assert summary["latest_weight_g"] == 5300
+    assert summary["latest_measured_at"].startswith("2024-03-05")
+    assert (summary["min_weight_g"], summary["max_weight_g"]) == (4800, 5300)
+    assert summary["record_count"] == 3
+    assert abs(summary["mean_weight_g"] - 5033.33) < 0.01
+
+    # 删除非极值、非最新的读数：增量更新
+    await _create_weights(client, profile_id, [("2024-02-15T08:00:00+00:00", 4900)])
+    records = (await client.get(f"/weights/by-profile/{profile_id}")).json()
+    middle = next(record["id"] for record in records if record["weight_g"] == 4900)
+    r = await client.delete(f"/weights/{middle}")
+    assert r.status_code == 204
+    summary = (await client.get(url)).json()
+    assert summary["record_count"] == 3
+    assert abs(summary["mean_weight_g"] - 5033.33) < 0.01
+
+    records = (
+        await client.get(
+            f"/weights/by-profile/{profile_id}", params={"direction": "asc"}
+        )
+    ).json()
+    by_weight = {record["weight_g"]: record["id"] for record in records}
+
+    # 删除最新读数：回退到上一条
+    r = await client.delete(f"/weights/{by_weight[5300]}")
+    assert r.status_code == 204
+    summary = (await client.get(url)).json()
+    assert (summary["latest_weight_g"], summary["max_weight_g"]) == (5000, 5000)
+    assert summary["record_count"] == 2
+
+    # 将历史读数改到最新之后
+    r = await client.patch(
+        f"/weights/{by_weight[4800]}",
+        json={"weight_g": 5100, "measured_at": "2024-04-01T08:00:00+00:00"},
+    )
+    assert r.status_code == 200
+    summary = (await client.get(url)).json()
+    assert summary["latest_weight_g"] == 5100
+    assert (summary["min_weight_g"], summary["max_weight_g"]) == (5000, 5100)
+    assert summary["mean_weight_g"] == 5050.0
+
+    for record_id in (by_weight[5000], by_weight[4800]):
+        r = await client.delete(f"/weights/{record_id}")
+        assert r.status_code == 204
+    r = await client.get(url)
+    assert r.status_code == 404
+
+
+async def test_weight_trend_is_maintained_incrementally(client, create_profile):
+    profile_id = await create_profile("weights-trend")
+    url = f"/weights/by-profile/{profile_id}/trend"
+    # 乱序写入（包含补录），每天增加 20 克
+    days = [5, 0, 3, 1, 4, 2]
+    await _create_weights(
+        client,
+        profile_id,
+        [(f"2024-05-{day + 1:02d}T08:00:00+00:00", 6000 + 20 * day) for day in days],
+    )
+
+    r = await client.get(url, params={"target_weight_g": 6200})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["as_of"].startswith("2024-05-06")
+    assert data["latest_weight_g"] == 6100
+    assert data["slope_g_per_day"] == 20.0
+    assert data["projected_at"].startswith("2024-05-11")
+
+    # 删除最新读数后回退到上一条作为锚点
+    records = (await client.get(f"/weights/by-profile/{profile_id}")).json()
+    r = await client.delete(f"/weights/{records[0]['id']}")
+    assert r.status_code == 204
+    data = (await client.get(url, params={"target_weight_g": 5000})).json()
+    assert data["as_of"].startswith("2024-05-05")
+    assert data["slope_g_per_day"] == 20.0
+    assert data["projected_at"] is None
+
+
+async def test_export_streams_csv_with_filters(client, create_profile):
+    profile_id = await create_profile("weights-export")
+    other_id = await create_profile("weights-export-other")
+    await _create_weights(
+        client,
+        profile_id,
+        [
+            ("2024-01-02T08:00:00+00:00", 5100),
+            ("2024-01-01T08:00:00+00:00", 5000),
+            ("2024-03-01T08:00:00+00:00", 5300),
+        ],
+    )
+    await _create_weights(client, other_id, [("2024-01-01T09:00:00+00:00", 9000)])
+
+    r = await client.get(
+        "/weights/export",
+        params={"profile_id": profile_id, "end": "2024-02-01T00:00:00+00:00"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    lines = r.text.splitlines()
+    assert lines[0] == (
+        "id,profile_id,weight_g,measured_at,"
+        "is_anomaly,sample_count,min_weight_g,max_weight_g"
+    )
+    assert lines[1].split(",")[3:] == ["2024-01-01T08:00:00.000000Z", "f", "1", "", ""]
+    assert [line.split(",")[2] for line in lines[1:]] == ["5000", "5100"]
+
+    r = await client.get("/weights/export")
+    assert len(r.text.splitlines()) == 5
+
+    r = await client.get(
+        "/weights/export",
+        params={
+            "start": "2024-02-01T00:00:00+00:00",
+            "end": "2024-01-01T00:00:00+00:00",
+        },
+    )
+    assert r.status_code == 400
+
+
+async def test_bulk_import_upserts_and_reports_errors(client, create_profile):
+    profile_id = await create_profile("weights-import")
+    await _create_weights(client, profile_id, [("2024-01-01T08:00:00+00:00", 4000)])
+
+    body = "\n".join(
+        [
+            "profile_id,weight_g,measured_at",
+            f"{profile_id},5000,2024-01-01T08:00:00+00:00",
+            f"{profile_id},5100,2024-01-02T08:00:00",
+            f"{profile_id},abc,2024-01-03T08:00:00+00:00",
+            "999005,5000,2024-01-03T08:00:00+00:00",
+            f"{profile_id},5200,2024-01-02T08:00:00+00:00",
+            f"{profile_id},5300",
+        ]
+    )
+    r = await client.post(
+        "/weights/import", params={"format": "csv"}, content=body.encode()
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert (data["total_rows"], data["inserted"], data["updated"]) == (6, 1, 1)
+    assert [error["line"] for error in data["errors"]] == [4, 5, 7]
+    assert data["errors"][1]["message"] == "Profile not found: 999005"
+
+    summary = (await client.get(f"/weights/by-profile/{profile_id}/summary")).json()
+    # 同一时刻的重复行以后出现的为准
+    assert summary["latest_weight_g"] == 5200
+    assert summary["record_count"] == 2
+
+    ndjson = "\n".join(
+        [
+            f'{{"profile_id": {profile_id}, "weight_g": 5400, '
+            '"measured_at": "2024-01-05T08:00:00+00:00"}',
+            "not json",
+        ]
+    )
+    r = await client.post(
+        "/weights/import", params={"format": "ndjson"}, content=ndjson.encode()
+    )
+    data = r.json()
+    assert (data["inserted"], data["failed"]) == (1, 1)
+
+    r = await client.post(
+        "/weights/",
+        json={
+            "profile_id": profile_id,
+            "weight_g": 1,
+            "measured_at": "2024-01-05T08:00:00+00:00",
+        },
+    )
+    assert r.status_code == 409
+
+
+async def test_anomalous_reading_flagged_and_optionally_excluded(
+    client, monkeypatch, create_profile
+):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "weight_anomaly_exclude", True)
+    profile_id = await create_profile("weights-anomaly")
+    await _create_weights(
+        client,
+        profile_id,
+        [(f"2024-06-0{day}T08:00:00+00:00", 5000 + 10 * day) for day in range(1, 7)],
+    )
+
+    # 另一只宠物踩上体重秤
+    r = await client.post(
+        "/weights/",
+        json={
+            "profile_id": profile_id,
+            "weight_g": 25000,
+            "measured_at": "2024-06-07T08:00:00+00:00",
+        },
+    )
+    assert r.status_code == 201
+    assert r.json()["is_anomaly"] is True
+    outlier_id = r.json()["id"]
+
+    r = await client.post(
+        "/weights/",
+        json={
+            "profile_id": profile_id,
+            "weight_g": 5080,
+            "measured_at": "2024-06-08T08:00:00+00:00",
+        },
+    )
+    assert r.json()["is_anomaly"] is False
+
+    url = f"/weights/by-profile/{profile_id}/summary"
+    summary = (await client.get(url)).json()
+    assert (summary["max_weight_g"], summary["record_count"]) == (5080, 7)
+
+    # 手动取消异常标记后计入汇总
+    r = await client.patch(f"/weights/{outlier_id}", json={"is_anomaly": False})
+    assert r.status_code == 200
+    summary = (await client.get(url)).json()
+    assert (summary["max_weight_g"], summary["record_count"]) == (25000, 8)
+    assert summary["latest_weight_g"] == 5080
+
+
+@pytest.mark.parametrize("exclude", [False, True])
+async def test_sustained_level_shift_rebaselines_anomaly_window(
+    client, monkeypatch, create_profile, exclude
+):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "weight_anomaly_exclude", exclude)
+    profile_id = await create_profile("weights-level-shift")
+    await _create_weights(
+        client,
+        profile_id,
+        [(f"2024-07-{day:02d}T08:00:00+00:00", 10000) for day in range(1, 16)],
+    )
+
+    # 换秤后体重稳定在新水平：前几条被标记，新水平占到窗口一半后不再标记
+    flags = []
+    for day in range(16, 28):
+        r = await client.post(
+            "/weights/",
+            json={
+                "profile_id": profile_id,
+                "weight_g": 11000,
+                "measured_at": f"2024-07-{day:02d}T08:00:00+00:00",
+            },
+        )
+        assert r.status_code == 201
+        flags.append(r.json()["is_anomaly"])
+    assert flags == [True] * 8 + [False] * 4
+
+    summary = (await client.get(f"/weights/by-profile/{profile_id}/summary")).json()
+    assert summary["latest_weight_g"] == 11000
+
+
+async def test_naive_measured_at_is_treated_as_utc(client, create_profile):
+    profile_id = await create_profile("weights-naive-create")
+    await _create_weights(client, profile_id, [("2024-05-01T08:00:00+00:00", 5000)])
+
+    # 已有汇总行的宠物写入无时区的测量时间：按 UTC 处理，而不是比较时出错
+    r = await client.post(
+        "/weights/",
+        json={
+            "profile_id": profile_id,
+            "weight_g": 5010,
+            "measured_at": "2024-05-02T08:00:00",
+        },
+    )
+    assert r.status_code == 201
+    assert r.json()["measured_at"].startswith("2024-05-02T08:00:00")
+    summary = (await client.get(f"/weights/by-profile/{profile_id}/summary")).json()
+    assert summary["latest_weight_g"] == 5010
+    assert summary["latest_measured_at"].startswith("2024-05-02T08:00:00")
+
+
+async def test_naive_measured_at_accepted_on_update(client, create_profile):
+    profile_id = await create_profile("weights-naive-update")
+    await _create_weights(
+        client,
+        profile_id,
+        [
+            ("2024-05-01T08:00:00+00:00", 5000),
+            ("2024-05-02T08:00:00+00:00", 5010),
+            ("2024-05-04T08:00:00+00:00", 5020),
+        ],
+    )
+    records = (await client.get(f"/weights/by-profile/{profile_id}")).json()
+    record = next(r for r in records if r["weight_g"] == 5010)
+
+    # 既非极值也非最新读数：汇总走增量更新，无时区的时间按 UTC 处理后不报错
+    r = await client.patch(
+        f"/weights/{record['id']}", json={"measured_at": "2024-05-03T08:00:00"}
+    )
+    assert r.status_code == 200
+    assert r.json()["measured_at"].startswith("2024-05-03T08:00:00")
+    summary = (await client.get(f"/weights/by-profile/{profile_id}/summary")).json()
+    assert (summary["latest_weight_g"], summary["record_count"]) == (5020, 3)
@@ -0,0 +1,18 @@
+from app.weights.anomaly import is_outlier, push
+
+
+def test_outlier_detection_uses_median_and_mad():
+    window = [5000, 5020, 4990, 5010, 5005]
+    kwargs = {"threshold": 3.5, "min_samples": 5}
+    assert is_outlier(window, 5040, **kwargs) is False
+    # 克/千克录入错误
+    assert is_outlier(window, 5, **kwargs) is True
+    assert is_outlier(window, 5600, **kwargs) is True
+    # 样本不足时不判断
+    assert is_outlier(window[:4], 5, **kwargs) is False
+    # 完全相同的读数（MAD=0）使用相对下限
+    assert is_outlier([5000] * 5, 5100, **kwargs) is False
+
+
+def test_push_keeps_newest_first():
+    assert push([3, 2, 1], 4, size=3) == [4, 3, 2]
@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.weights.compaction import compact_weight_records, compaction_horizon
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+_BEFORE = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+
+async def _create_weight(client, profile_id: int, measured_at: str, weight_g: int):
+    r = await client.post(
+        "/weights/",
+        json={
+            "profile_id": profile_id,
+            "weight_g": weight_g,
+            "measured_at": measured_at,
+        },
+    )
+    assert r.status_code == 201
+    return r.json()["id"]
+
+
+def test_horizon_is_utc_midnight():
+    now = datetime(2024, 5, 10, 1, 30, tzinfo=timezone.utc)
+    assert compaction_horizon(now, retention_days=9) == datetime(
+        2024, 5, 1, tzinfo=timezone.utc
+    )
+
+
+async def test_old_readings_compacted_into_daily_rollups(
+    client, session_factory, create_profile
+):
+    profile_id = await create_profile("compaction-1")
+    other_id = await create_profile("compaction-2")
+    for measured_at, weight_g in (
+        ("2024-01-10T06:00:00+00:00", 5000),
+        ("2024-01-10T12:00:00+00:00", 5300),
+        ("2024-01-10T23:00:00+00:00", 5200),
+        ("2024-01-11T08:00:00+00:00", 5400),
+        ("2024-01-12T08:00:00+00:00", 5100),
+        ("2024-01-12T20:00:00+00:00", 5300),
+        ("2024-02-05T08:00:00+00:00", 5500),
+        ("2024-02-05T09:00:00+00:00", 5600),
+    ):
+        await _create_weight(client, profile_id, measured_at, weight_g)
+    await _create_weight(client, other_id, "2024-01-20T08:00:00+00:00", 7000)
+    await _create_weight(client, other_id, "2024-01-20T09:00:00+00:00", 7100)
+
+    summary_url = f"/weights/by-profile/{profile_id}/summary"
+    buckets_url = f"/weights/by-profile/{profile_id}/buckets"
+    before_summary = (await client.get(summary_url)).json()
+    before_buckets = (
+        await client.get(buckets_url, params={"interval": "month"})
+    ).json()
+
+    result = await compact_weight_records(
+        session_factory, before=_BEFORE, chunk_profiles=1, throttle_s=0
+    )
+    assert (result.profiles, result.removed, result.rollups) == (2, 7, 3)
+
+    r = await client.get(
+        f"/weights/by-profile/{profile_id}",
+        params={"direction": "asc", "limit": 100},
+    )
+    rows = [
+        (row["measured_at"][:19], row["weight_g"], row["sample_count"])
+        for row in r.json()
+    ]
+    assert rows == [
+        ("2024-01-10T23:00:00", 5167, 3),
+        ("2024-01-11T08:00:00", 5400, 1),
+        ("2024-01-12T20:00:00", 5200, 2),
+        ("2024-02-05T08:00:00", 5500, 1),
+        ("2024-02-05T09:00:00", 5600, 1),
+    ]
+
+    # 汇总与按月聚合按 sample_count 加权，结果与压缩前一致（均值仅有取整误差）
+    after_summary = (await client.get(summary_url)).json()
+    for key in ("record_count", "min_weight_g", "max_weight_g", "latest_weight_g"):
+        assert after_summary[key] == before_summary[key]
+    assert abs(after_summary["mean_weight_g"] - before_summary["mean_weight_g"]) < 0.2
+    after_buckets = (await client.get(buckets_url, params={"interval": "month"})).json()
+    for before_bucket, after_bucket in zip(before_buckets, after_buckets):
+        for key in ("count", "min_g", "max_g"):
+            assert after_bucket[key] == before_bucket[key]
+        assert abs(after_bucket["avg_g"] - before_bucket["avg_g"]) < 0.2
+
+    # 再次执行不重写已压缩的日期；迟到的旧读数与日汇总行合并
+    result = await compact_weight_records(session_factory, before=_BEFORE, throttle_s=0)
+    assert result.removed == 0
+    await _create_weight(client, profile_id, "2024-01-10T08:00:00+00:00", 4900)
+    result = await compact_weight_records(session_factory, before=_BEFORE, throttle_s=0)
+    assert (result.removed, result.rollups) == (2, 1)
+    r = await client.get(
+        f"/weights/by-profile/{profile_id}", params={"direction": "asc", "limit": 1}
+    )
+    rollup = r.json()[0]
+    assert (rollup["sample_count"], rollup["min_weight_g"]) == (4, 4900)
+    assert rollup["weight_g"] == 5100
+
+    # 导入与日汇总行同一时刻的读数：并入汇总，而不是覆盖成单条读数
+    body = f"profile_id,weight_g,measured_at\n{profile_id},5600,{rollup['measured_at']}"
+    r = await client.post(
+        "/weights/import", params={"format": "csv"}, content=body.encode()
+    )
+    assert r.json()["updated"] == 1
+    r = await client.get(f"/weights/{rollup['id']}")
+    merged = r.json()
+    assert (merged["sample_count"], merged["weight_g"]) == (5, 5200)
+    assert (merged["min_weight_g"], merged["max_weight_g"]) == (4900, 5600)
+    summary = (await client.get(summary_url)).json()
+    assert summary["record_count"] == 10
+
+    # 导出文件原样导回：日汇总行的条数与极值不丢失，重复导入结果不变
+    r = await client.get("/weights/export", params={"profile_id": profile_id})
+    exported = r.content
+    for _ in range(2):
+        r = await client.post(
+            "/weights/import", params={"format": "csv"}, content=exported
+        )
+        data = r.json()
+        assert (data["inserted"], data["updated"], data["failed"]) == (0, 5, 0)
+    r = await client.get(f"/weights/{rollup['id']}")
+    assert r.json()["sample_count"] == 5
+    assert (r.json()["min_weight_g"], r.json()["max_weight_g"]) == (4900, 5600)
+    assert (await client.get(summary_url)).json() == summary
+
+    # 删除日汇总行时汇总整体重算
+    r = await client.delete(f"/weights/{rollup['id']}")
+    assert r.status_code == 204
+    summary = (await client.get(summary_url)).json()
+    assert summary["record_count"] == 5
+    assert summary["min_weight_g"] == 5100
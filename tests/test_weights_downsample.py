@@ -0,0 +1,76 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.weights.downsample import lttb
+
+_T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _series(n: int, seed: int = 0) -> list[tuple[datetime, int]]:
+    rng = random.Random(seed)
+    return [
+        (
+            _T0 + timedelta(hours=i, minutes=rng.randint(0, 59)),
+            5000 + int(300 * math.sin(i / 7)) + rng.randint(-40, 40),
+        )
+        for i in range(n)
+    ]
+
+
+async def _stream(points):
+    for point in points:
+        yield point
+
+
+async def _downsample(points, *, total: int, threshold: int):
+    return [p async for p in lttb(_stream(points), total=total, threshold=threshold)]
+
+
+def _reference(points, threshold: int):
+    """不考虑内存的 LTTB 参考实现（整段序列在内存中）"""
+    xy = [(t.timestamp(), float(w)) for t, w in points]
+    every = (len(points) - 2) / (threshold - 2)
+    chosen = [0]
+    for b in range(threshold - 2):
+        lo, hi = int(b * every) + 1, int((b + 1) * every) + 1
+        nlo, nhi = hi, min(int((b + 2) * every) + 1, len(points) - 1)
+        if b == threshold - 3:
+            nlo, nhi = len(points) - 1, len(points)
+        cx = sum(x for x, _ in xy[nlo:nhi]) / (nhi - nlo)
+        cy = sum(y for _, y in xy[nlo:nhi]) / (nhi - nlo)
+        ax, ay = xy[chosen[-1]]
+        chosen.append(
+            max(
+                range(lo, hi),
+                key=lambda j: abs(
+                    (ax - cx) * (xy[j][1] - ay) - (ax - xy[j][0]) * (cy - ay)
+                ),
+            )
+        )
+    chosen.append(len(points) - 1)
+    return [points[j] for j in chosen]
+
+
+@pytest.mark.parametrize(("n", "threshold"), [(10, 3), (1000, 50), (997, 100)])
+async def test_streaming_matches_reference(n, threshold):
+    points = _series(n, seed=n)
+    result = await _downsample(points, total=n, threshold=threshold)
+    assert result == _reference(points, threshold)
+
+
+async def test_short_series_returned_unchanged():
+    points = _series(5)
+    assert await _downsample(points, total=5, threshold=10) == points
+    assert await _downsample([], total=0, threshold=10) == []
+
+
+async def test_stale_total_still_keeps_first_and_last():
+    points = _series(300)
+    for total in (200, 400):
+        result = await _downsample(points, total=total, threshold=20)
+        assert result[0] == points[0] and result[-1] == points[-1]
+        assert len(result) <= 20
+        assert result == sorted(result)
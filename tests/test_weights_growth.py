@@ -0,0 +1,79 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.weights.growth import age_in_months, place
+from app.weights.repository import WeightRecordRepository
+
+_CURVE = [1000.0, 1100.0, 1200.0, 1300.0, 1400.0, 1500.0, 1600.0]
+
+
+def test_age_in_months_counts_completed_months():
+    at = datetime(2024, 3, 1, 8, tzinfo=timezone.utc)
+    assert age_in_months(date(2024, 1, 31), at) == 1
+    assert age_in_months(date(2024, 1, 1), at) == 2
+    assert age_in_months(date(2023, 3, 2), at) == 11
+
+
+def test_place_interpolates_between_knots():
+    assert place(_CURVE, 1300) == (50.0, "P25–P50")
+    assert place(_CURVE, 1350) == (62.5, "P50–P75")
+    assert place(_CURVE, 1050) == (7.5, "P5–P10")
+    assert place(_CURVE, 999) == (None, "<P5")
+    assert place(_CURVE, 1601) == (None, ">P95")
+    assert place([1000.0] * 7, 1000) == (7.5, "P5–P10")
+
+
+@pytest.mark.usefixtures("clean_db")
+async def test_pet_placed_on_precomputed_breed_curve(client, session_factory):
+    profile_ids = []
+    for i, weight_g in enumerate((3000, 3100, 3200, 3300, 3400, 3500)):
+        r = await client.post(
+            "/profiles/",
+            json={
+                "name": f"growth-{i}",
+                "gender": "female",
+                "variety": "v-growth",
+                "birthday": "2024-01-15",
+            },
+        )
+        profile_id = r.json()["id"]
+        profile_ids.append(profile_id)
+        # 同一月龄内多次测量按均值计入
+        for measured_at, g in (
+            ("2024-04-20T08:00:00+00:00", weight_g - 50),
+            ("2024-04-25T08:00:00+00:00", weight_g + 50),
+            ("2024-02-01T08:00:00+00:00", 2000),
+        ):
+            r = await client.post(
+                "/weights/",
+                json={
+                    "profile_id": profile_id,
+                    "weight_g": g,
+                    "measured_at": measured_at,
+                },
+            )
+            assert r.status_code == 201
+
+    url = f"/weights/by-profile/{profile_ids[0]}/percentile"
+    r = await client.get(url)
+    assert r.status_code == 404
+
+    async with session_factory() as session:
+        assert await WeightRecordRepository(session).refresh_growth_percentiles() == 2
+
+    r = await client.get("/weights/growth-curves/v-growth")
+    assert r.status_code == 200
+    curve = r.json()
+    assert [(c["age_month"], c["sample_count"]) for c in curve] == [(0, 6), (3, 6)]
+    assert curve[1]["p50"] == 3250.0
+    assert curve[1]["p5"] == 3025.0
+
+    r = await client.get(url)
+    assert r.status_code == 200
+    data = r.json()
+    assert (data["weight_g"], data["band"]) == (3050, "P5–P10")
+    assert data["curve"]["age_month"] == 3
+
+    r = await client.get(f"/weights/by-profile/{profile_ids[-1]}/percentile")
+    assert r.json()["band"] == ">P95" and r.json()["percentile"] is None
@@ -0,0 +1,52 @@
+from app.weights.importer import iter_import_rows
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+async def _collect(data: bytes, *, fmt: str, size: int = 7):
+    return [item async for item in iter_import_rows(_chunks(data, size), fmt=fmt)]
+
+
+async def test_csv_rows_split_across_chunks():
+    data = (
+        "﻿measured_at,profile_id,weight_g\r\n"
+        "2024-01-01T08:00:00Z,1,5000\r\n"
+        "\r\n"
+        '"2024-01-02T08:00:00+08:00",2,-1\r\n'
+    ).encode()
+    results = await _collect(data, fmt="csv")
+    assert [line for line, _, _ in results] == [2, 4]
+    line, record, error = results[0]
+    assert error is None
+    assert record[1:3] == (1, 5000)
+    assert record[3].isoformat() == "2024-01-01T08:00:00+00:00"
+    assert results[1][2].startswith("weight_g:")
+
+
+async def test_csv_missing_columns_stops():
+    results = await _collect(b"profile_id,weight\n1,2\n", fmt="csv")
+    assert results == [(1, None, "missing columns: weight_g, measured_at")]
+
+
+async def test_ndjson_rows_without_trailing_newline():
+    data = b'{"profile_id": 1, "weight_g": 10, "measured_at": "2024-01-01"}\n[1]'
+    results = await _collect(data, fmt="ndjson", size=5)
+    assert results[0][1] is not None
+    assert results[1] == (2, None, "expected a JSON object")
+
+
+async def test_csv_optional_rollup_columns():
+    data = (
+        "profile_id,weight_g,measured_at,is_anomaly,sample_count,"
+        "min_weight_g,max_weight_g\n"
+        "1,5000,2024-01-01T08:00:00Z,f,3,4900,5100\n"
+        "1,5000,2024-01-02T08:00:00Z,t,1,,\n"
+        "1,5000,2024-01-03T08:00:00Z,f,2,5100,5200\n"
+    ).encode()
+    results = await _collect(data, fmt="csv")
+    assert results[0][1][4:] == (False, 3, 4900, 5100)
+    assert results[1][1][4:] == (True, 1, None, None)
+    assert results[2][1] is None
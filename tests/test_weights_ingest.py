@@ -0,0 +1,177 @@
+import asyncio
+import time
+
+import pytest
+
+from app.weights.ingest import weight_ingest_buffer
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+@pytest.fixture(autouse=True)
+def ingest_session_factory(monkeypatch, session_factory):
+    monkeypatch.setattr(weight_ingest_buffer, "session_factory", session_factory)
+
+
+def _reading(profile_id: int, weight_g: int, minute: int) -> dict:
+    return {
+        "profile_id": profile_id,
+        "weight_g": weight_g,
+        "measured_at": f"2024-03-01T08:{minute:02d}:00+00:00",
+    }
+
+
+async def test_concurrent_ingests_share_batches(client, monkeypatch, create_profile):
+    first = await create_profile("ingest-1")
+    second = await create_profile("ingest-2")
+    monkeypatch.setattr(weight_ingest_buffer, "max_batch", 4)
+    monkeypatch.setattr(weight_ingest_buffer, "max_delay_s", 0.05)
+
+    responses = await asyncio.gather(
+        *(
+            client.post(
+                "/weights/ingest",
+                json={"readings": [_reading(profile_id, 5000 + minute, minute)]},
+            )
+            for minute in range(5)
+            for profile_id in (first, second)
+        )
+    )
+    assert all(r.status_code == 200 for r in responses)
+    acks = [r.json()[0] for r in responses]
+    assert {ack["status"] for ack in acks} == {"created"}
+    assert len({ack["id"] for ack in acks}) == 10
+
+    r = await client.get(f"/weights/by-profile/{first}/summary")
+    summary = r.json()
+    assert summary["record_count"] == 5
+    assert summary["latest_weight_g"] == 5004
+    assert summary["min_weight_g"] == 5000
+
+    r = await client.post(
+        "/weights/ingest",
+        json={
+            "readings": [
+                _reading(first, 5010, 10),
+                _reading(first, 6000, 0),
+                _reading(999_005, 5000, 0),
+            ]
+        },
+    )
+    assert r.status_code == 200
+    assert [ack["status"] for ack in r.json()] == [
+        "created",
+        "duplicate",
+        "profile_not_found",
+    ]
+    r = await client.get(f"/weights/by-profile/{first}/summary")
+    assert r.json()["latest_weight_g"] == 5010
+
+
+async def test_ingest_batch_follows_sustained_level_shift(
+    client, monkeypatch, create_profile
+):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "weight_anomaly_exclude", True)
+    profile_id = await create_profile("ingest-level-shift")
+    readings = [_reading(profile_id, 10000, minute) for minute in range(15)]
+    readings += [_reading(profile_id, 11000, minute) for minute in range(15, 27)]
+    r = await client.post("/weights/ingest", json={"readings": readings})
+    assert r.status_code == 200
+
+    # 批内同样把被标记的读数放入窗口，新水平持续出现后最新体重随之更新
+    r = await client.get(f"/weights/by-profile/{profile_id}/summary")
+    summary = r.json()
+    assert summary["latest_weight_g"] == 11000
+    assert summary["record_count"] == 15 + 4
+
+
+async def test_bad_reading_does_not_fail_its_batch(client, monkeypatch, create_profile):
+    from app.weights.repository import WeightRecordRepository
+
+    profile_id = await create_profile("ingest-poison")
+    monkeypatch.setattr(weight_ingest_buffer, "max_batch", 3)
+    monkeypatch.setattr(weight_ingest_buffer, "max_delay_s", 60)
+    create_many = WeightRecordRepository.create_many
+
+    async def failing_create_many(self, readings):
+        if any(weight_g == 4242 for _, weight_g, _ in readings):
+            raise RuntimeError("poisoned reading")
+        return await create_many(self, readings)
+
+    monkeypatch.setattr(WeightRecordRepository, "create_many", failing_create_many)
+    results = await asyncio.gather(
+        *(
+            weight_ingest_buffer.submit(profile_id, weight_g, None)
+            for weight_g in (5000, 4242, 5010)
+        ),
+        return_exceptions=True,
+    )
+    # 同批其它读数逐条重试后写入，只有出错的那条失败
+    assert [getattr(result, "status", None) for result in results] == [
+        "created",
+        None,
+        "created",
+    ]
+    assert isinstance(results[1], RuntimeError)
+
+    # 超出 int4 范围的数值在校验阶段拒绝，不进入共享批次
+    r = await client.post(
+        "/weights/ingest",
+        json={"readings": [{"profile_id": profile_id, "weight_g": 2**31}]},
+    )
+    assert r.status_code == 422
+
+
+async def test_ingest_drain_flushes_pending(client, monkeypatch, create_profile):
+    profile_id = await create_profile("ingest-drain")
+    monkeypatch.setattr(weight_ingest_buffer, "max_delay_s", 60)
+
+    pending = asyncio.create_task(weight_ingest_buffer.submit(profile_id, 4000, None))
+    await asyncio.sleep(0)
+    await weight_ingest_buffer.drain()
+    ack = await pending
+    assert ack.status == "created"
+    assert ack.measured_at.tzinfo is not None
+
+
+@pytest.mark.benchmark
+async def test_ingest_throughput_vs_single_writes(client, create_profile):
+    """相同并发下对比逐条 POST /weights/ 与微批写入的吞吐（-s 查看结果）"""
+    profile_ids = [await create_profile(f"ingest-bench-{i}") for i in range(4)]
+    rows = 200
+
+    async def single(n: int):
+        r = await client.post(
+            "/weights/",
+            json=_reading(profile_ids[n % 4], 5000, 0)
+            | {"measured_at": f"2024-04-01T00:00:{n % 60:02d}.{n:06d}+00:00"},
+        )
+        assert r.status_code == 201
+
+    async def ingest(n: int):
+        r = await client.post(
+            "/weights/ingest",
+            json={
+                "readings": [
+                    _reading(profile_ids[n % 4], 5000, 0)
+                    | {"measured_at": f"2024-05-01T00:00:{n % 60:02d}.{n:06d}+00:00"}
+                ]
+            },
+        )
+        assert r.json()[0]["status"] == "created"
+
+    started = time.perf_counter()
+    await asyncio.gather(*(single(n) for n in range(rows)))
+    single_rate = rows / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(ingest(n) for n in range(rows)))
+    ingest_rate = rows / (time.perf_counter() - started)
+
+    print(
+        f"\nsingle: {single_rate:,.0f} rows/s\nmicro-batched: {ingest_rate:,.0f} rows/s"
+    )
+    r = await client.get(f"/weights/by-profile/{profile_ids[0]}/summary")
+    assert r.json()["record_count"] == rows // 2
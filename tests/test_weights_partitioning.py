@@ -0,0 +1,221 @@
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from app.weights.partitions import ensure_partitions, month_starts, partition_name
+
+_ROWS = 60_000
+_MONTHS = month_starts(date(2023, 1, 1), 13)
+
+
+def test_month_starts_roll_over_year():
+    assert month_starts(date(2024, 11, 15), 3) == [
+        date(2024, 11, 1),
+        date(2024, 12, 1),
+        date(2025, 1, 1),
+    ]
+    assert partition_name(date(2025, 1, 1)) == "weight_records_p2025_01"
+
+
+async def test_partitions_created_ahead_and_pruned(engine):
+    async with engine.begin() as conn:
+        created = await conn.run_sync(
+            lambda c: ensure_partitions(c, months_ahead=2, today=date(2031, 5, 20))
+        )
+        assert created == [
+            "weight_records_p2031_05",
+            "weight_records_p2031_06",
+            "weight_records_p2031_07",
+        ]
+        # 再次执行为幂等操作
+        again = await conn.run_sync(
+            lambda c: ensure_partitions(c, months_ahead=2, today=date(2031, 5, 20))
+        )
+        assert again == []
+
+        plan = (
+            await conn.execute(
+                text(
+                    "EXPLAIN SELECT * FROM weight_records WHERE profile_id = 1 "
+                    "AND measured_at >= '2031-06-01T00:00:00+00' "
+                    "AND measured_at < '2031-06-15T00:00:00+00'"
+                )
+            )
+        ).scalars()
+        plan_text = "\n".join(plan)
+        assert "weight_records_p2031_06" in plan_text
+        assert "weight_records_p2031_05" not in plan_text
+        assert "weight_records_default" not in plan_text
+
+        for name in created:
+            await conn.execute(text(f"DROP TABLE {name}"))
+
+
+async def _default_count(conn, lower: str, upper: str) -> int:
+    return (
+        await conn.execute(
+            text(
+                "SELECT count(*) FROM weight_records_default "
+                "WHERE measured_at >= :lower AND measured_at < :upper"
+            ),
+            {"lower": date.fromisoformat(lower), "upper": date.fromisoformat(upper)},
+        )
+    ).scalar_one()
+
+
+async def test_default_rows_moved_into_new_partition(
+    engine, client, create_profile, clean_db
+):
+    profile_id = await create_profile("partition-adopt")
+    ids = []
+    for measured_at in ("2019-03-10T08:00:00+00:00", "2019-03-20T08:00:00+00:00"):
+        r = await client.post(
+            "/weights/",
+            json={
+                "profile_id": profile_id,
+                "weight_g": 5000,
+                "measured_at": measured_at,
+            },
+        )
+        assert r.status_code == 201
+        ids.append(r.json()["id"])
+
+    try:
+        async with engine.begin() as conn:
+            assert await _default_count(conn, "2019-03-01", "2019-04-01") == 2
+            # DEFAULT 中已有该月数据：建分区并迁出，而不是每次维护都失败
+            created = await conn.run_sync(
+                lambda c: ensure_partitions(c, months_ahead=0)
+            )
+            assert created == ["weight_records_p2019_03"]
+            assert await _default_count(conn, "2019-03-01", "2019-04-01") == 0
+            again = await conn.run_sync(lambda c: ensure_partitions(c, months_ahead=0))
+            assert again == []
+
+        r = await client.get(
+            f"/weights/{ids[0]}", params={"measured_at": "2019-03-10T08:00:00+00:00"}
+        )
+        assert r.status_code == 200
+        assert r.json()["weight_g"] == 5000
+        # 给出的 measured_at 与记录不符时只查询对应分区，查不到
+        r = await client.get(
+            f"/weights/{ids[0]}", params={"measured_at": "2019-03-20T08:00:00+00:00"}
+        )
+        assert r.status_code == 404
+        summary = (await client.get(f"/weights/by-profile/{profile_id}/summary")).json()
+        assert summary["record_count"] == 2
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE IF EXISTS weight_records_p2019_03"))
+
+
+async def test_import_creates_partitions_for_history(
+    engine, client, create_profile, clean_db
+):
+    profile_id = await create_profile("partition-import")
+    body = "\n".join(
+        [
+            "profile_id,weight_g,measured_at",
+            f"{profile_id},5000,2018-07-01T08:00:00+00:00",
+            f"{profile_id},5100,2018-08-31T23:30:00+00:00",
+        ]
+    )
+    try:
+        r = await client.post(
+            "/weights/import", params={"format": "csv"}, content=body.encode()
+        )
+        assert r.status_code == 200
+        assert r.json()["inserted"] == 2
+
+        async with engine.begin() as conn:
+            assert await _default_count(conn, "2018-07-01", "2018-09-01") == 0
+            counts = [
+                (await conn.execute(text(f"SELECT count(*) FROM {name}"))).scalar_one()
+                for name in ("weight_records_p2018_07", "weight_records_p2018_08")
+            ]
+            assert counts == [1, 1]
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(
+                    "DROP TABLE IF EXISTS weight_records_p2018_07, "
+                    "weight_records_p2018_08"
+                )
+            )
+
+
+async def _bench(conn, table: str) -> tuple[float, float]:
+    started = time.perf_counter()
+    await conn.execute(
+        text(
+            f"INSERT INTO {table} (profile_id, weight_g, measured_at) "
+            "SELECT n % 500, 5000 + n % 700, "
+            "TIMESTAMPTZ '2023-01-01 00:00:00+00' + n * INTERVAL '8 minutes' "
+            f"FROM generate_series(1, {_ROWS}) AS n"
+        )
+    )
+    insert_s = time.perf_counter() - started
+    await conn.execute(text(f"ANALYZE {table}"))
+
+    started = time.perf_counter()
+    for month in _MONTHS[:-1]:
+        await conn.execute(
+            text(
+                f"SELECT count(*), avg(weight_g) FROM {table} "
+                "WHERE measured_at >= :lower AND measured_at < :lower + INTERVAL '1 month'"
+            ),
+            {"lower": month},
+        )
+    query_s = (time.perf_counter() - started) / (len(_MONTHS) - 1)
+    return _ROWS / insert_s, query_s
+
+
+@pytest.mark.benchmark
+async def test_partitioning_benchmark(engine):
+    """对比普通堆表（旧索引）与月度分区 + BRIN 的写入吞吐与范围查询延迟（-s 查看结果）"""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE bench_heap (id serial PRIMARY KEY, profile_id int, "
+                "weight_g int, measured_at timestamptz)"
+            )
+        )
+        await conn.execute(text("CREATE INDEX ON bench_heap (profile_id)"))
+        await conn.execute(text("CREATE INDEX ON bench_heap (profile_id, measured_at)"))
+        await conn.execute(text("CREATE INDEX ON bench_heap (measured_at DESC)"))
+
+        await conn.execute(
+            text(
+                "CREATE TABLE bench_part (id serial, profile_id int, weight_g int, "
+                "measured_at timestamptz, PRIMARY KEY (id, measured_at)) "
+                "PARTITION BY RANGE (measured_at)"
+            )
+        )
+        await conn.execute(text("CREATE INDEX ON bench_part (profile_id, measured_at)"))
+        await conn.execute(text("CREATE INDEX ON bench_part USING brin (measured_at)"))
+        await conn.execute(
+            text("CREATE TABLE bench_part_default PARTITION OF bench_part DEFAULT")
+        )
+        for lower, upper in zip(_MONTHS, _MONTHS[1:]):
+            await conn.execute(
+                text(
+                    f"CREATE TABLE bench_part_{lower:%Y_%m} PARTITION OF bench_part "
+                    f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+                )
+            )
+
+        try:
+            heap = await _bench(conn, "bench_heap")
+            part = await _bench(conn, "bench_part")
+            print(
+                f"\nheap: {heap[0]:,.0f} rows/s, range {heap[1] * 1e3:.2f}ms"
+                f"\npartitioned: {part[0]:,.0f} rows/s, range {part[1] * 1e3:.2f}ms"
+            )
+            count = (
+                await conn.execute(text("SELECT count(*) FROM bench_part_default"))
+            ).scalar_one()
+            assert count == 0
+        finally:
+            await conn.execute(text("DROP TABLE bench_heap, bench_part"))
@@ -0,0 +1,76 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.weights import trend
+
+_HALF_LIFE = 14.0
+_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _direct(readings, anchor):
+    sums = trend.TrendSums()
+    for measured_at, weight_g in readings:
+        sums = trend.add(
+            sums, trend.days_between(anchor, measured_at), weight_g, _HALF_LIFE
+        )
+    return sums
+
+
+def _incremental(readings):
+    sums, anchor = trend.TrendSums(), None
+    for measured_at, weight_g in readings:
+        if anchor is None or measured_at > anchor:
+            if anchor is not None:
+                sums = trend.shift(
+                    sums, trend.days_between(anchor, measured_at), _HALF_LIFE
+                )
+            anchor = measured_at
+        sums = trend.add(
+            sums, trend.days_between(anchor, measured_at), weight_g, _HALF_LIFE
+        )
+    return sums, anchor
+
+
+def test_incremental_sums_match_direct_computation():
+    rng = random.Random(7)
+    readings = [
+        (_START + timedelta(hours=rng.uniform(0, 24 * 120)), rng.randint(4000, 6000))
+        for _ in range(200)
+    ]
+    sums, anchor = _incremental(readings)
+    expected = _direct(readings, anchor)
+    for name in ("s0", "s1", "s2", "sy", "sxy"):
+        got, want = getattr(sums, name), getattr(expected, name)
+        assert abs(got - want) <= 1e-6 * max(1.0, abs(want)), name
+
+
+def test_linear_trend_slope_and_projection():
+    readings = [(_START + timedelta(days=d), 5000 + 10 * d) for d in range(30)]
+    sums, anchor = _incremental(readings)
+    estimate = trend.estimate(sums)
+    assert abs(estimate.slope_g_per_day - 10) < 1e-6
+    assert abs(estimate.fitted_g - 5290) < 1e-6
+    # EWMA 偏向近期读数
+    assert 5145 < estimate.ewma_g < 5290
+
+    projected = trend.projected_at(estimate, anchor=anchor, target_weight_g=5390)
+    assert projected == anchor + timedelta(days=10)
+    assert trend.projected_at(estimate, anchor=anchor, target_weight_g=5000) is None
+
+
+def test_remove_reading_restores_sums():
+    readings = [(_START + timedelta(days=d), 5000 + d) for d in range(10)]
+    sums, anchor = _incremental(readings)
+    extra = (_START + timedelta(days=3, hours=6), 7000)
+    with_extra = trend.add(
+        sums, trend.days_between(anchor, extra[0]), extra[1], _HALF_LIFE
+    )
+    removed = trend.add(
+        with_extra,
+        trend.days_between(anchor, extra[0]),
+        extra[1],
+        _HALF_LIFE,
+        sign=-1.0,
+    )
+    assert abs(removed.sxy - sums.sxy) < 1e-6
+    assert trend.estimate(trend.TrendSums()).ewma_g is None